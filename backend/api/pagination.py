@@ -0,0 +1,61 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor carries the sort key of the last row on a page; the next page is the
+rows strictly after it, so every page costs one index range scan no matter
+how deep it is.
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, func
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor holding ``size`` sort-key values, or raise 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def after(columns, values, descending=()):
+    """Row-value comparison ``columns > values`` expanded for portability.
+
+    ``descending`` lists the positions sorted in descending order.
+    """
+    clauses = []
+    for i, (col, value) in enumerate(zip(columns, values)):
+        step = col < value if i in descending else col > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+def page_result(rows, limit: int, key) -> tuple[list, str | None]:
+    """Trim a ``limit + 1`` fetch to the page and build the next cursor."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+async def listing_total(db, column, filters, cursor: str | None, with_total: bool) -> int | None:
+    """Count the listing's rows for a first page, or any page with ``with_total``.
+
+    Counting scans every matching row, so cursor pages skip it (``None``)
+    unless asked.
+    """
+    if cursor and not with_total:
+        return None
+    return (await db.execute(select(func.count(column)).where(*filters))).scalar() or 0
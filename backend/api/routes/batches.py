@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_project_db
+from models import IngestBatch
+from engine.ingest import batch_summary, rollback_batch
+from engine.ingest_jobs import ingest_jobs, cancel_ingest_job, job_stats
+
+router = APIRouter()
+
+
+@router.get("/{project_id}/batches")
+async def list_batches(
+    project_id: str,
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_project_db),
+):
+    """Ingest history, newest first: what was loaded, from where, and how fast."""
+    result = await db.execute(
+        select(IngestBatch)
+        .where(IngestBatch.project_id == project_id)
+        .order_by(IngestBatch.started_at.desc())
+        .limit(limit)
+    )
+    return [batch_summary(b) for b in result.scalars()]
+
+
+@router.get("/{project_id}/batches/{batch_id}")
+async def get_batch(project_id: str, batch_id: str, db: AsyncSession = Depends(get_project_db)):
+    batch = (await db.execute(
+        select(IngestBatch).where(IngestBatch.id == batch_id, IngestBatch.project_id == project_id)
+    )).scalar_one_or_none()
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch_summary(batch)
+
+
+@router.post("/{project_id}/batches/{batch_id}/rollback")
+async def rollback(project_id: str, batch_id: str):
+    """Delete every row an upload or scan stage created."""
+    deleted = await rollback_batch(project_id, batch_id)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {"message": f"Rolled back {sum(deleted.values())} rows", "deleted": deleted}
+
+
+@router.get("/{project_id}/ingest-jobs")
+async def list_ingest_jobs(project_id: str):
+    """Background ingest jobs started since the server came up, newest first."""
+    jobs = [j for j in ingest_jobs.values() if j["project_id"] == project_id]
+    return sorted(jobs, key=lambda j: j["started_at"], reverse=True)
+
+
+def _get_job(project_id: str, job_id: str) -> dict:
+    job = ingest_jobs.get(job_id)
+    if not job or job["project_id"] != project_id:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return job
+
+
+@router.get("/{project_id}/ingest-jobs/{job_id}")
+async def get_ingest_job(project_id: str, job_id: str):
+    job = _get_job(project_id, job_id)
+    return {**job, "stats": job_stats(job)}
+
+
+@router.post("/{project_id}/ingest-jobs/{job_id}/cancel")
+async def cancel_ingest(project_id: str, job_id: str):
+    _get_job(project_id, job_id)
+    if not cancel_ingest_job(job_id):
+        raise HTTPException(status_code=400, detail="Ingest job is not active")
+    return {"message": "Ingest cancelled. Rows loaded so far will be rolled back."}
+
+
+@router.get("/{project_id}/ingest-jobs/{job_id}/stream")
+async def stream_ingest_job(project_id: str, job_id: str):
+    """Live progress as SSE: the same log/stats/status/done events as a scan's stream."""
+    job = _get_job(project_id, job_id)
+
+    async def event_generator():
+        last_index = 0
+        while True:
+            log_lines = job["log_lines"]
+            while last_index < len(log_lines):
+                yield f"data: {json.dumps({'type': 'log', 'line': log_lines[last_index]})}\n\n"
+                last_index += 1
+
+            yield f"data: {json.dumps({'type': 'stats', 'data': job_stats(job)})}\n\n"
+            yield f"data: {json.dumps({'type': 'status', 'status': job['status']})}\n\n"
+
+            if job["completed_at"]:
+                done = {"type": "done", "status": job["status"], "batch_id": job["batch_id"], "error": job["error"]}
+                yield f"data: {json.dumps(done)}\n\n"
+                break
+
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -1,96 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import run_write
 from models import Subdomain, URL, Parameter, NucleiFinding
+from models.param_name import names_with_attack_type
+from engine.classifier import normalize_attack_type
+from engine.purge import start_purge
+from engine.ingest import forget_ingested
 
 router = APIRouter()
 
 
-@router.delete("/{project_id}/subdomains/{subdomain_id}")
-async def delete_subdomain(project_id: str, subdomain_id: str, db: AsyncSession = Depends(get_db)):
+async def _delete_one(db: AsyncSession, model, project_id: str, row_id: str) -> bool:
+    # Children are removed by ON DELETE CASCADE, without loading them
     result = await db.execute(
-        select(Subdomain).where(Subdomain.id == subdomain_id, Subdomain.project_id == project_id)
+        delete(model).where(model.uuid == row_id, model.project_id == project_id)
     )
-    sub = result.scalar_one_or_none()
-    if not sub:
+    if result.rowcount:
+        await forget_ingested(db, project_id)
+    return result.rowcount > 0
+
+
+@router.delete("/{project_id}/subdomains/{subdomain_id}")
+async def delete_subdomain(project_id: str, subdomain_id: str):
+    if not await run_write(_delete_one, Subdomain, project_id, subdomain_id, project_id=project_id):
         raise HTTPException(status_code=404, detail="Subdomain not found")
-    await db.delete(sub)
-    await db.commit()
     return {"message": "Subdomain deleted", "id": subdomain_id}
 
 
 @router.delete("/{project_id}/urls/{url_id}")
-async def delete_url(project_id: str, url_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(URL).where(URL.id == url_id, URL.project_id == project_id)
-    )
-    url = result.scalar_one_or_none()
-    if not url:
+async def delete_url(project_id: str, url_id: str):
+    if not await run_write(_delete_one, URL, project_id, url_id, project_id=project_id):
         raise HTTPException(status_code=404, detail="URL not found")
-    await db.delete(url)
-    await db.commit()
     return {"message": "URL deleted", "id": url_id}
 
 
 @router.delete("/{project_id}/parameters/{param_id}")
-async def delete_parameter(project_id: str, param_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Parameter).where(Parameter.id == param_id, Parameter.project_id == project_id)
-    )
-    param = result.scalar_one_or_none()
-    if not param:
+async def delete_parameter(project_id: str, param_id: str):
+    if not await run_write(_delete_one, Parameter, project_id, param_id, project_id=project_id):
         raise HTTPException(status_code=404, detail="Parameter not found")
-    await db.delete(param)
-    await db.commit()
     return {"message": "Parameter deleted", "id": param_id}
 
 
 @router.delete("/{project_id}/findings/{finding_id}")
-async def delete_finding(project_id: str, finding_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(NucleiFinding).where(NucleiFinding.id == finding_id, NucleiFinding.project_id == project_id)
-    )
-    finding = result.scalar_one_or_none()
-    if not finding:
+async def delete_finding(project_id: str, finding_id: str):
+    if not await run_write(_delete_one, NucleiFinding, project_id, finding_id, project_id=project_id):
         raise HTTPException(status_code=404, detail="Finding not found")
-    await db.delete(finding)
-    await db.commit()
     return {"message": "Finding deleted", "id": finding_id}
 
 
 @router.delete("/{project_id}/clear")
-async def clear_project_data(project_id: str, db: AsyncSession = Depends(get_db)):
-    await db.execute(delete(Parameter).where(Parameter.project_id == project_id))
-    await db.execute(delete(NucleiFinding).where(NucleiFinding.project_id == project_id))
-    await db.execute(delete(URL).where(URL.project_id == project_id))
-    await db.execute(delete(Subdomain).where(Subdomain.project_id == project_id))
-    await db.commit()
+async def clear_project_data(project_id: str):
+    job = await start_purge(project_id, keep_project=True)
+    if job["status"] == "running":
+        return JSONResponse(status_code=202, content={"message": "Clearing project data", "purge": job})
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Clearing project data failed: {job['error']}")
     return {"message": "All project data cleared"}
 
 
+async def _delete_urls_by_attack(db: AsyncSession, project_id: str, attack_type: str) -> int:
+    matching = select(Parameter.url_id).where(
+        Parameter.project_id == project_id,
+        Parameter.name_id.in_(names_with_attack_type(project_id, normalize_attack_type(attack_type))),
+    )
+    result = await db.execute(
+        delete(URL).where(URL.project_id == project_id, URL.id.in_(matching))
+    )
+    if result.rowcount:
+        await forget_ingested(db, project_id)
+    return result.rowcount
+
+
 @router.delete("/{project_id}/urls-by-attack")
 async def delete_urls_by_attack(
     project_id: str,
     attack_type: str = Query(...),
-    db: AsyncSession = Depends(get_db),
 ):
-    params = (await db.execute(
-        select(Parameter).where(Parameter.project_id == project_id)
-    )).scalars().all()
-
-    url_ids_to_delete = set()
-    for p in params:
-        if attack_type.upper() in [a.upper() for a in (p.attack_types or [])]:
-            url_ids_to_delete.add(p.url_id)
-
-    deleted_count = 0
-    for url_id in url_ids_to_delete:
-        url = (await db.execute(select(URL).where(URL.id == url_id))).scalar_one_or_none()
-        if url:
-            await db.delete(url)
-            deleted_count += 1
-
-    await db.commit()
+    deleted_count = await run_write(_delete_urls_by_attack, project_id, attack_type, project_id=project_id)
     return {"message": f"Deleted {deleted_count} URLs", "deleted_count": deleted_count}
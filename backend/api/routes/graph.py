@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_project_db
 from schemas.graph import GraphData
 from schemas.mindmap import MindmapData
 from engine.graph_builder import build_graph
@@ -17,15 +17,19 @@ async def get_graph_data(
     attack_type: str | None = Query(default=None),
     limit: int = Query(default=500, ge=10, le=5000),
     min_risk: int = Query(default=0, ge=0, le=10),
-    db: AsyncSession = Depends(get_db),
+    endpoints: bool = Query(default=False),
+    db: AsyncSession = Depends(get_project_db),
 ):
-    return await build_graph(project_id, db, depth=depth, attack_type=attack_type, limit=limit, min_risk=min_risk)
+    return await build_graph(
+        project_id, db, depth=depth, attack_type=attack_type, limit=limit, min_risk=min_risk, endpoints=endpoints,
+    )
 
 
 @router.get("/{project_id}/mindmap", response_model=MindmapData)
 async def get_mindmap_data(
     project_id: str,
     attack_type: str | None = Query(default=None),
-    db: AsyncSession = Depends(get_db),
+    endpoints: bool = Query(default=False),
+    db: AsyncSession = Depends(get_project_db),
 ):
-    return await build_mindmap(project_id, db, attack_type=attack_type)
+    return await build_mindmap(project_id, db, attack_type=attack_type, endpoints=endpoints)
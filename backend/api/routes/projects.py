@@ -1,20 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, func
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Project, Subdomain, URL, Parameter, NucleiFinding
+from database import get_db, run_write, project_session, drop_shard, SHARDED
+from models import Project, Subdomain, URL, ParamName, NucleiFinding
 from schemas.project import ProjectCreate, ProjectResponse
+from engine.purge import start_purge, purge_jobs
+from engine.reclassify import start_reclassify, reclassify_jobs
 
 router = APIRouter()
 
 
-@router.post("/", response_model=ProjectResponse)
-async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_db)):
+async def _create_project(db: AsyncSession, data: ProjectCreate) -> Project:
     project = Project(name=data.name, root_domain=data.root_domain)
     db.add(project)
-    await db.commit()
-    await db.refresh(project)
+    await db.flush()
+    return project
+
+
+@router.post("/", response_model=ProjectResponse)
+async def create_project(data: ProjectCreate):
+    project = await run_write(_create_project, data)
     return ProjectResponse(
         id=project.id,
         name=project.name,
@@ -23,6 +30,16 @@ async def create_project(data: ProjectCreate, db: AsyncSession = Depends(get_db)
     )
 
 
+async def _project_counts(project_id: str) -> dict:
+    async with project_session(project_id) as db:
+        return {
+            "subdomain_count": (await db.execute(select(func.count(Subdomain.id)).where(Subdomain.project_id == project_id))).scalar() or 0,
+            "url_count": (await db.execute(select(func.count(URL.id)).where(URL.project_id == project_id))).scalar() or 0,
+            "param_count": (await db.execute(select(func.sum(ParamName.occurrences)).where(ParamName.project_id == project_id))).scalar() or 0,
+            "finding_count": (await db.execute(select(func.count(NucleiFinding.id)).where(NucleiFinding.project_id == project_id))).scalar() or 0,
+        }
+
+
 @router.get("/", response_model=list[ProjectResponse])
 async def list_projects(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Project).order_by(Project.created_at.desc()))
@@ -30,13 +47,9 @@ async def list_projects(db: AsyncSession = Depends(get_db)):
 
     responses = []
     for p in projects:
-        sub_count = (await db.execute(select(func.count(Subdomain.id)).where(Subdomain.project_id == p.id))).scalar() or 0
-        url_count = (await db.execute(select(func.count(URL.id)).where(URL.project_id == p.id))).scalar() or 0
-        param_count = (await db.execute(select(func.count(Parameter.id)).where(Parameter.project_id == p.id))).scalar() or 0
-        finding_count = (await db.execute(select(func.count(NucleiFinding.id)).where(NucleiFinding.project_id == p.id))).scalar() or 0
+        counts = await _project_counts(p.id)
         responses.append(ProjectResponse(
-            id=p.id, name=p.name, root_domain=p.root_domain, created_at=p.created_at,
-            subdomain_count=sub_count, url_count=url_count, param_count=param_count, finding_count=finding_count,
+            id=p.id, name=p.name, root_domain=p.root_domain, created_at=p.created_at, **counts,
         ))
     return responses
 
@@ -48,23 +61,56 @@ async def get_project(project_id: str, db: AsyncSession = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    sub_count = (await db.execute(select(func.count(Subdomain.id)).where(Subdomain.project_id == project_id))).scalar() or 0
-    url_count = (await db.execute(select(func.count(URL.id)).where(URL.project_id == project_id))).scalar() or 0
-    param_count = (await db.execute(select(func.count(Parameter.id)).where(Parameter.project_id == project_id))).scalar() or 0
-    finding_count = (await db.execute(select(func.count(NucleiFinding.id)).where(NucleiFinding.project_id == project_id))).scalar() or 0
-
+    counts = await _project_counts(project_id)
     return ProjectResponse(
-        id=project.id, name=project.name, root_domain=project.root_domain, created_at=project.created_at,
-        subdomain_count=sub_count, url_count=url_count, param_count=param_count, finding_count=finding_count,
+        id=project.id, name=project.name, root_domain=project.root_domain, created_at=project.created_at, **counts,
     )
 
 
+async def _delete_project(db: AsyncSession, project_id: str) -> bool:
+    result = await db.execute(delete(Project).where(Project.id == project_id))
+    return result.rowcount > 0
+
+
 @router.delete("/{project_id}")
 async def delete_project(project_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Project).where(Project.id == project_id))
-    project = result.scalar_one_or_none()
+    project = (await db.execute(select(Project.id).where(Project.id == project_id))).scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    await db.delete(project)
-    await db.commit()
+
+    if SHARDED:
+        # All of the project's data lives in its shard file
+        await run_write(_delete_project, project_id)
+        await drop_shard(project_id)
+        return {"message": "Project deleted"}
+
+    job = await start_purge(project_id)
+    if job["status"] == "running":
+        return JSONResponse(status_code=202, content={"message": "Project deletion started", "purge": job})
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Project deletion failed: {job['error']}")
     return {"message": "Project deleted"}
+
+
+@router.get("/{project_id}/purge")
+async def get_purge_status(project_id: str):
+    job = purge_jobs.get(project_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No purge for this project")
+    return job
+
+
+@router.post("/{project_id}/reclassify", status_code=202)
+async def reclassify_project(project_id: str, db: AsyncSession = Depends(get_db)):
+    project = (await db.execute(select(Project.id).where(Project.id == project_id))).scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return start_reclassify(project_id)
+
+
+@router.get("/{project_id}/reclassify")
+async def get_reclassify_status(project_id: str):
+    job = reclassify_jobs.get(project_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No reclassification for this project")
+    return job
@@ -6,7 +6,7 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_db, run_write
 from models import ScanJob, Project
 from schemas.scan import ScanRequest, ScanJobResponse, ToolStatus
 from engine.tool_manager import check_all_tools, check_tool, install_tool, check_go_installed
@@ -38,8 +38,7 @@ async def install_recon_tool(tool_name: str):
 
 # --- Scan Management ---
 
-@router.post("/start", response_model=ScanJobResponse)
-async def start_scan_endpoint(request: ScanRequest, db: AsyncSession = Depends(get_db)):
+async def _create_scan_job(db: AsyncSession, request: ScanRequest) -> ScanJob:
     if request.project_id:
         project = (await db.execute(
             select(Project).where(Project.id == request.project_id)
@@ -67,11 +66,16 @@ async def start_scan_endpoint(request: ScanRequest, db: AsyncSession = Depends(g
         target=request.target_domain,
     )
     db.add(job)
-    await db.commit()
-    await db.refresh(job)
+    await db.flush()
+    return job
+
+
+@router.post("/start", response_model=ScanJobResponse)
+async def start_scan_endpoint(request: ScanRequest):
+    job = await run_write(_create_scan_job, request)
 
     # Launch scan as background task
-    asyncio.create_task(run_scan(job.id, project.id, request.scan_type, request.target_domain))
+    asyncio.create_task(run_scan(job.id, job.project_id, request.scan_type, request.target_domain))
 
     return job
 
@@ -119,17 +123,19 @@ async def get_scan_details_endpoint(scan_id: str, db: AsyncSession = Depends(get
     }
 
 
-@router.post("/jobs/{scan_id}/cancel")
-async def cancel_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
+async def _transition_job(db: AsyncSession, scan_id: str, allowed: tuple[str, ...], new_status: str, error: str):
     result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
     job = result.scalar_one_or_none()
     if not job:
         raise HTTPException(status_code=404, detail="Scan job not found")
-    if job.status not in ("running", "paused"):
-        raise HTTPException(status_code=400, detail="Scan is not active")
+    if job.status not in allowed:
+        raise HTTPException(status_code=400, detail=error)
+    job.status = new_status
 
-    job.status = "cancelled"
-    await db.commit()
+
+@router.post("/jobs/{scan_id}/cancel")
+async def cancel_scan(scan_id: str):
+    await run_write(_transition_job, scan_id, ("running", "paused"), "cancelled", "Scan is not active")
 
     if scan_id in active_scans:
         active_scans[scan_id]["status"] = "cancelled"
@@ -146,16 +152,8 @@ async def cancel_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/jobs/{scan_id}/pause")
-async def pause_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
-    job = result.scalar_one_or_none()
-    if not job:
-        raise HTTPException(status_code=404, detail="Scan job not found")
-    if job.status != "running":
-        raise HTTPException(status_code=400, detail="Scan is not running")
-
-    job.status = "paused"
-    await db.commit()
+async def pause_scan(scan_id: str):
+    await run_write(_transition_job, scan_id, ("running",), "paused", "Scan is not running")
 
     if scan_id in active_scans:
         active_scans[scan_id]["status"] = "paused"
@@ -167,16 +165,8 @@ async def pause_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/jobs/{scan_id}/resume")
-async def resume_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
-    job = result.scalar_one_or_none()
-    if not job:
-        raise HTTPException(status_code=404, detail="Scan job not found")
-    if job.status != "paused":
-        raise HTTPException(status_code=400, detail="Scan is not paused")
-
-    job.status = "running"
-    await db.commit()
+async def resume_scan(scan_id: str):
+    await run_write(_transition_job, scan_id, ("paused",), "running", "Scan is not paused")
 
     if scan_id in active_scans:
         active_scans[scan_id]["status"] = "running"
@@ -188,16 +178,8 @@ async def resume_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/jobs/{scan_id}/stop")
-async def stop_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
-    job = result.scalar_one_or_none()
-    if not job:
-        raise HTTPException(status_code=404, detail="Scan job not found")
-    if job.status not in ("running", "paused"):
-        raise HTTPException(status_code=400, detail="Scan is not active")
-
-    job.status = "stopped"
-    await db.commit()
+async def stop_scan(scan_id: str):
+    await run_write(_transition_job, scan_id, ("running", "paused"), "stopped", "Scan is not active")
 
     if scan_id in active_scans:
         active_scans[scan_id]["status"] = "stopped"
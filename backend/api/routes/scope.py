@@ -0,0 +1,97 @@
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db, get_project_db, run_write
+from models import Project, ScopeRule
+from schemas.scope import ScopeRuleCreate, ScopeRuleResponse
+from engine import scope
+from engine.ingest import forget_ingested
+
+router = APIRouter()
+
+
+def _rule_response(rule: ScopeRule) -> ScopeRuleResponse:
+    return ScopeRuleResponse(
+        id=rule.uuid,
+        action=rule.action,
+        kind=rule.kind,
+        pattern=rule.pattern,
+        hits=rule.hits or 0,
+        created_at=rule.created_at,
+    )
+
+
+async def _add_rule(db: AsyncSession, project_id: str, data: ScopeRuleCreate, pattern: str) -> ScopeRule:
+    rule = ScopeRule(project_id=project_id, action=data.action, kind=data.kind, pattern=pattern, hits=0)
+    db.add(rule)
+    await db.flush()
+    # Files ingested under the old rules may now yield different rows
+    await forget_ingested(db, project_id)
+    return rule
+
+
+async def _delete_rule(db: AsyncSession, project_id: str, rule_id: str) -> bool:
+    result = await db.execute(
+        delete(ScopeRule).where(ScopeRule.uuid == rule_id, ScopeRule.project_id == project_id)
+    )
+    if result.rowcount:
+        await forget_ingested(db, project_id)
+    return result.rowcount > 0
+
+
+@router.get("/{project_id}/scope", response_model=list[ScopeRuleResponse])
+async def list_scope_rules(project_id: str, db: AsyncSession = Depends(get_project_db)):
+    result = await db.execute(
+        select(ScopeRule).where(ScopeRule.project_id == project_id).order_by(ScopeRule.id)
+    )
+    return [_rule_response(rule) for rule in result.scalars()]
+
+
+@router.post("/{project_id}/scope", response_model=ScopeRuleResponse)
+async def add_scope_rule(project_id: str, data: ScopeRuleCreate, db: AsyncSession = Depends(get_db)):
+    """Add an include or exclude rule; it applies to data uploaded from now on."""
+    if data.action not in scope.RULE_ACTIONS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown action: {data.action}. Use one of: {', '.join(scope.RULE_ACTIONS)}",
+        )
+    try:
+        pattern = scope.validate_rule(data.kind, data.pattern)
+    except scope.ScopeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    project = (await db.execute(select(Project.id).where(Project.id == project_id))).scalar_one_or_none()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    rule = await run_write(_add_rule, project_id, data, pattern, project_id=project_id)
+    scope.invalidate(project_id)
+    return _rule_response(rule)
+
+
+@router.get("/{project_id}/scope/check")
+async def check_scope(
+    project_id: str,
+    target: str = Query(..., description="Hostname, IP address or URL"),
+    db: AsyncSession = Depends(get_project_db),
+):
+    """Whether an upload containing ``target`` would keep it, and which rule decided."""
+    url = target if "://" in target else None
+    host = (urlsplit(target).hostname if url else target.strip().lower()) or ""
+    matcher = await scope.project_matcher(db, project_id)
+    in_scope, rule_id = matcher.match(host, url) if matcher else (True, None)
+    rule = await db.get(ScopeRule, rule_id) if rule_id is not None else None
+    return {
+        "target": target,
+        "in_scope": in_scope,
+        "rule": _rule_response(rule) if rule else None,
+    }
+
+
+@router.delete("/{project_id}/scope/{rule_id}")
+async def delete_scope_rule(project_id: str, rule_id: str):
+    if not await run_write(_delete_rule, project_id, rule_id, project_id=project_id):
+        raise HTTPException(status_code=404, detail="Scope rule not found")
+    scope.invalidate(project_id)
+    return {"message": "Scope rule deleted", "id": rule_id}
@@ -1,14 +1,17 @@
-import csv
-import io
-import json
-
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Subdomain, URL, Parameter
+from database import get_project_db, store_for
+from api.pagination import after, decode_cursor, listing_total, page_result
+from models import Subdomain, URL, Endpoint, ParamName, Parameter
+from models.param_name import has_attack_type, names_with_attack_type
+from engine.classifier import normalize_attack_type
+from engine.search_index import search_rows, match_offsets
+from engine.export import EXPORT_FORMATS, ENCODERS, stream_urls, gzip_stream
+from engine import columnar
+from engine.columnar import COLUMNAR_FORMATS, COLUMNAR_TABLES
 
 router = APIRouter()
 
@@ -18,41 +21,42 @@ async def search_project(
     project_id: str,
     q: str = Query(..., min_length=1),
     type: str = Query(default="all"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_project_db),
 ):
     results = {"subdomains": [], "urls": [], "params": []}
 
     if type in ("all", "subdomain"):
-        subs = await db.execute(
-            select(Subdomain)
-            .where(Subdomain.project_id == project_id, Subdomain.subdomain.contains(q))
-            .limit(50)
-        )
+        subs = await search_rows(db, Subdomain, Subdomain.subdomain, project_id, q)
         results["subdomains"] = [
-            {"id": s.id, "subdomain": s.subdomain, "status_code": s.status_code, "ip": s.ip_address}
-            for s in subs.scalars()
+            {"id": s.uuid, "subdomain": s.subdomain, "status_code": s.status_code, "ip": s.ip_address,
+             "highlights": match_offsets(s.subdomain, q)}
+            for s in subs
         ]
 
     if type in ("all", "url"):
-        urls = await db.execute(
-            select(URL)
-            .where(URL.project_id == project_id, URL.full_url.contains(q))
-            .limit(50)
-        )
+        urls = await search_rows(db, URL, URL.full_url, project_id, q)
         results["urls"] = [
-            {"id": u.id, "url": u.full_url, "path": u.path, "source": u.source}
-            for u in urls.scalars()
+            {"id": u.uuid, "url": u.full_url, "path": u.path, "source": u.source,
+             "highlights": match_offsets(u.full_url, q)}
+            for u in urls
         ]
 
     if type in ("all", "param"):
-        params = await db.execute(
-            select(Parameter)
-            .where(Parameter.project_id == project_id, Parameter.name.contains(q))
-            .limit(50)
+        params = await search_rows(db, ParamName, ParamName.name, project_id, q)
+        # A hit is a name; its id is the public id of the name's first occurrence
+        first = (
+            select(Parameter.name_id, func.min(Parameter.id).label("id"))
+            .where(Parameter.name_id.in_([p.id for p in params]))
+            .group_by(Parameter.name_id)
+            .subquery()
         )
+        uuids = dict((await db.execute(
+            select(first.c.name_id, Parameter.uuid).join(Parameter, Parameter.id == first.c.id)
+        )).all()) if params else {}
         results["params"] = [
-            {"id": p.id, "name": p.name, "attack_types": p.attack_types, "sample_value": p.sample_value}
-            for p in params.scalars()
+            {"id": uuids.get(p.id), "name": p.name, "attack_types": p.attack_types, "sample_value": p.sample_value,
+             "count": p.occurrences, "highlights": match_offsets(p.name, q)}
+            for p in params
         ]
 
     return results
@@ -63,30 +67,42 @@ async def list_params(
     project_id: str,
     attack_type: str | None = Query(default=None),
     sort: str = Query(default="count"),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=50, ge=1, le=200),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_project_db),
 ):
-    query = select(Parameter).where(Parameter.project_id == project_id)
-    result = await db.execute(query)
-    params = result.scalars().all()
-
+    filters = [ParamName.project_id == project_id]
     if attack_type:
-        params = [p for p in params if attack_type.upper() in [a.upper() for a in (p.attack_types or [])]]
+        filters.append(has_attack_type(normalize_attack_type(attack_type)))
+
+    # One dictionary row per name; cut the page on (count desc, name) or name
+    query = select(ParamName).where(*filters)
+    if sort == "name":
+        if cursor:
+            (name,) = decode_cursor(cursor, 1)
+            query = query.where(ParamName.name > name)
+        query = query.order_by(ParamName.name)
+        key = lambda p: (p.name,)
+    else:
+        if cursor:
+            query = query.where(after([ParamName.occurrences, ParamName.name], decode_cursor(cursor, 2), descending={0}))
+        query = query.order_by(ParamName.occurrences.desc(), ParamName.name)
+        key = lambda p: (p.occurrences, p.name)
+    if not cursor:
+        query = query.offset((page - 1) * limit)
 
-    # Group by name
-    grouped: dict[str, dict] = {}
-    for p in params:
-        if p.name not in grouped:
-            grouped[p.name] = {"name": p.name, "count": 0, "attack_types": set(), "sample_value": p.sample_value}
-        grouped[p.name]["count"] += 1
-        grouped[p.name]["attack_types"].update(p.attack_types or [])
+    names, next_cursor = page_result((await db.execute(query.limit(limit + 1))).scalars(), limit, key)
 
-    items = [{"name": v["name"], "count": v["count"], "attack_types": list(v["attack_types"]), "sample_value": v["sample_value"]} for v in grouped.values()]
-    items.sort(key=lambda x: -x["count"])
+    total = await listing_total(db, ParamName.id, filters, cursor, with_total)
 
-    start = (page - 1) * limit
-    return {"total": len(items), "page": page, "items": items[start:start + limit]}
+    items = [
+        {"name": p.name, "count": p.occurrences, "attack_types": p.attack_types, "sample_value": p.sample_value,
+         "risk_score": p.risk_score}
+        for p in names
+    ]
+    return {"total": total, "page": page, "items": items, "next_cursor": next_cursor}
 
 
 @router.get("/{project_id}/subdomains")
@@ -94,34 +110,49 @@ async def list_subdomains(
     project_id: str,
     status_code: int | None = Query(default=None),
     has_params: bool | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=50, ge=1, le=200),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_project_db),
 ):
-    query = select(Subdomain).where(Subdomain.project_id == project_id)
+    filters = [Subdomain.project_id == project_id]
     if status_code:
-        query = query.where(Subdomain.status_code == status_code)
-    query = query.order_by(Subdomain.subdomain).offset((page - 1) * limit).limit(limit)
+        filters.append(Subdomain.status_code == status_code)
+    if has_params is not None:
+        with_params = exists().where(URL.subdomain_id == Subdomain.id, Parameter.url_id == URL.id)
+        filters.append(with_params if has_params else ~with_params)
+
+    query = select(Subdomain).where(*filters)
+    if cursor:
+        query = query.where(after([Subdomain.subdomain, Subdomain.id], decode_cursor(cursor, 2)))
+    else:
+        query = query.offset((page - 1) * limit)
+    query = query.order_by(Subdomain.subdomain, Subdomain.id).limit(limit + 1)
 
     result = await db.execute(query)
-    subs = result.scalars().all()
-
-    total = (await db.execute(
-        select(func.count(Subdomain.id)).where(Subdomain.project_id == project_id)
-    )).scalar() or 0
-
-    items = []
-    for s in subs:
-        url_count = (await db.execute(
-            select(func.count(URL.id)).where(URL.subdomain_id == s.id)
-        )).scalar() or 0
-        items.append({
-            "id": s.id, "subdomain": s.subdomain, "ip_address": s.ip_address,
+    subs, next_cursor = page_result(result.scalars(), limit, lambda s: (s.subdomain, s.id))
+
+    total = await listing_total(db, Subdomain.id, filters, cursor, with_total)
+
+    url_counts = {}
+    if subs:
+        url_counts = dict((await db.execute(
+            select(URL.subdomain_id, func.count(URL.id))
+            .where(URL.subdomain_id.in_([s.id for s in subs]))
+            .group_by(URL.subdomain_id)
+        )).all())
+
+    items = [
+        {
+            "id": s.uuid, "subdomain": s.subdomain, "ip_address": s.ip_address,
             "status_code": s.status_code, "title": s.title,
-            "technologies": s.technologies, "url_count": url_count, "source": s.source,
-        })
+            "technologies": s.technologies, "url_count": url_counts.get(s.id, 0), "source": s.source,
+        }
+        for s in subs
+    ]
 
-    return {"total": total, "page": page, "items": items}
+    return {"total": total, "page": page, "items": items, "next_cursor": next_cursor}
 
 
 @router.get("/{project_id}/urls")
@@ -129,100 +160,122 @@ async def list_urls(
     project_id: str,
     attack_type: str | None = Query(default=None),
     subdomain: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=50, ge=1, le=200),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_project_db),
 ):
-    query = select(URL).where(URL.project_id == project_id)
-
+    filters = [URL.project_id == project_id]
     if subdomain:
-        sub_result = await db.execute(
+        filters.append(URL.subdomain_id.in_(
             select(Subdomain.id).where(Subdomain.project_id == project_id, Subdomain.subdomain == subdomain)
-        )
-        sub_id = sub_result.scalar_one_or_none()
-        if sub_id:
-            query = query.where(URL.subdomain_id == sub_id)
+        ))
+    if attack_type:
+        filters.append(exists().where(
+            Parameter.url_id == URL.id,
+            Parameter.name_id.in_(names_with_attack_type(project_id, normalize_attack_type(attack_type))),
+        ))
+
+    query = select(URL).where(*filters)
+    if cursor:
+        query = query.where(after([URL.full_url, URL.id], decode_cursor(cursor, 2)))
+    else:
+        query = query.offset((page - 1) * limit)
+    query = query.order_by(URL.full_url, URL.id).limit(limit + 1)
 
-    query = query.offset((page - 1) * limit).limit(limit)
     result = await db.execute(query)
-    urls = result.scalars().all()
+    urls, next_cursor = page_result(result.scalars(), limit, lambda u: (u.full_url, u.id))
 
-    items = []
-    for u in urls:
+    params_by_url: dict[int, list] = {u.id: [] for u in urls}
+    if urls:
         param_result = await db.execute(
-            select(Parameter).where(Parameter.url_id == u.id)
+            select(Parameter.url_id, ParamName.name, ParamName.attack_types)
+            .join(ParamName, ParamName.id == Parameter.name_id)
+            .where(Parameter.url_id.in_(list(params_by_url)))
         )
-        params = param_result.scalars().all()
+        for url_id, name, types in param_result:
+            params_by_url[url_id].append({"name": name, "attack_types": types})
 
-        if attack_type and not any(attack_type.upper() in [a.upper() for a in (p.attack_types or [])] for p in params):
-            continue
+    items = [
+        {"id": u.uuid, "url": u.full_url, "path": u.path, "source": u.source, "params": params_by_url[u.id]}
+        for u in urls
+    ]
+
+    total = await listing_total(db, URL.id, filters, cursor, with_total)
+
+    return {"total": total, "page": page, "items": items, "next_cursor": next_cursor}
+
+
+@router.get("/{project_id}/endpoints")
+async def list_endpoints(
+    project_id: str,
+    subdomain: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    with_total: bool = Query(default=False),
+    page: int = Query(default=1, ge=1),
+    limit: int = Query(default=50, ge=1, le=200),
+    db: AsyncSession = Depends(get_project_db),
+):
+    filters = [Endpoint.project_id == project_id]
+    if subdomain:
+        filters.append(Endpoint.subdomain_id.in_(
+            select(Subdomain.id).where(Subdomain.project_id == project_id, Subdomain.subdomain == subdomain)
+        ))
 
-        items.append({
-            "id": u.id, "url": u.full_url, "path": u.path, "source": u.source,
-            "params": [{"name": p.name, "attack_types": p.attack_types} for p in params],
-        })
+    # Biggest groups first
+    query = select(Endpoint, Subdomain.subdomain).join(Subdomain, Subdomain.id == Endpoint.subdomain_id).where(*filters)
+    if cursor:
+        query = query.where(after([Endpoint.url_count, Endpoint.id], decode_cursor(cursor, 2), descending={0}))
+    else:
+        query = query.offset((page - 1) * limit)
+    query = query.order_by(Endpoint.url_count.desc(), Endpoint.id).limit(limit + 1)
+
+    rows, next_cursor = page_result((await db.execute(query)).all(), limit, lambda r: (r[0].url_count, r[0].id))
+
+    items = [
+        {"id": e.uuid, "subdomain": host, "template": e.template, "url_count": e.url_count, "sample_url": e.sample_url}
+        for e, host in rows
+    ]
 
-    total = (await db.execute(
-        select(func.count(URL.id)).where(URL.project_id == project_id)
-    )).scalar() or 0
+    total = await listing_total(db, Endpoint.id, filters, cursor, with_total)
 
-    return {"total": total, "page": page, "items": items}
+    return {"total": total, "page": page, "items": items, "next_cursor": next_cursor}
 
 
 @router.get("/{project_id}/attack-urls")
 async def get_attack_urls(
     project_id: str,
     attack_type: str | None = Query(default=None),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_project_db),
 ):
     """Get all URLs grouped by attack type with full URL and vulnerable parameters."""
-    all_params = (await db.execute(
-        select(Parameter).where(Parameter.project_id == project_id)
-    )).scalars().all()
-
-    # Group by attack type
-    attack_map: dict[str, list[dict]] = {}
-    url_cache: dict[str, str] = {}
-
-    for p in all_params:
-        if not p.attack_types:
-            continue
+    query = (
+        select(URL.full_url, ParamName.name, Parameter.sample_value, ParamName.attack_types)
+        .join(URL, URL.id == Parameter.url_id)
+        .join(ParamName, ParamName.id == Parameter.name_id)
+        .where(Parameter.project_id == project_id, ParamName.risk_score > 0)
+    )
+    if attack_type:
+        query = query.where(has_attack_type(normalize_attack_type(attack_type)))
+    rows = await db.execute(query)
 
-        # Get URL
-        if p.url_id not in url_cache:
-            url_obj = (await db.execute(select(URL).where(URL.id == p.url_id))).scalar_one_or_none()
-            url_cache[p.url_id] = url_obj.full_url if url_obj else ""
-        full_url = url_cache[p.url_id]
-        if not full_url:
+    # Group by attack type, deduplicating on (url, param)
+    attack_map: dict[str, dict[tuple, dict]] = {}
+    for full_url, name, value, attack_types in rows:
+        if not attack_types or not full_url:
             continue
-
-        for at in p.attack_types:
+        for at in attack_types:
             if attack_type and at.upper() != attack_type.upper():
                 continue
-            if at not in attack_map:
-                attack_map[at] = []
-            attack_map[at].append({
-                "url": full_url,
-                "param": p.name,
-                "value": p.sample_value,
-            })
-
-    # Deduplicate and count
-    result = {}
-    for at, entries in sorted(attack_map.items()):
-        seen = set()
-        unique = []
-        for e in entries:
-            key = f"{e['url']}|{e['param']}"
-            if key not in seen:
-                seen.add(key)
-                unique.append(e)
-        result[at] = {
-            "count": len(unique),
-            "urls": unique,
-        }
+            entries = attack_map.setdefault(at, {})
+            if (full_url, name) not in entries:
+                entries[(full_url, name)] = {"url": full_url, "param": name, "value": value}
 
-    return result
+    return {
+        at: {"count": len(entries), "urls": list(entries.values())}
+        for at, entries in sorted(attack_map.items())
+    }
 
 
 @router.get("/{project_id}/export")
@@ -230,43 +283,54 @@ async def export_data(
     project_id: str,
     attack_type: str | None = Query(default=None),
     format: str = Query(default="txt"),
-    db: AsyncSession = Depends(get_db),
+    compress: bool = Query(default=False),
+    endpoints: bool = Query(default=False),
 ):
-    query = select(URL).where(URL.project_id == project_id)
-    result = await db.execute(query)
-    urls = result.scalars().all()
-
-    filtered_urls = []
-    for u in urls:
-        if attack_type:
-            param_result = await db.execute(select(Parameter).where(Parameter.url_id == u.id))
-            params = param_result.scalars().all()
-            if any(attack_type.upper() in [a.upper() for a in (p.attack_types or [])] for p in params):
-                filtered_urls.append(u.full_url)
-        else:
-            filtered_urls.append(u.full_url)
-
-    if format == "json":
-        return StreamingResponse(
-            io.BytesIO(json.dumps(filtered_urls, indent=2).encode()),
-            media_type="application/json",
-            headers={"Content-Disposition": "attachment; filename=export.json"},
-        )
-    elif format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["url"])
-        for url in filtered_urls:
-            writer.writerow([url])
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode()),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=export.csv"},
-        )
+    if format not in EXPORT_FORMATS:
+        format = "txt"
+    media_type, ext = EXPORT_FORMATS[format]
+    filename = f"export.{ext}"
+    # Resolve the shard now so an unknown project is a 404, not a broken stream
+    await store_for(project_id)
+
+    body = ENCODERS[format](stream_urls(project_id, attack_type, endpoints))
+    if compress:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@router.get("/{project_id}/export/columnar")
+async def export_columnar(
+    project_id: str,
+    format: str = Query(default="parquet"),
+    table: str | None = Query(default=None),
+):
+    """Parquet / Arrow export: one table, or a zip of all of them."""
+    if columnar.pa is None:
+        raise HTTPException(status_code=501, detail="Columnar export requires pyarrow")
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format. Use one of: {', '.join(COLUMNAR_FORMATS)}")
+    if table and table not in COLUMNAR_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown table. Use one of: {', '.join(COLUMNAR_TABLES)}")
+    await store_for(project_id)
+
+    media_type, ext = COLUMNAR_FORMATS[format]
+    if table:
+        body = columnar.stream_table(project_id, table, format)
+        filename = f"{table}.{ext}"
     else:
-        content = "\n".join(filtered_urls)
-        return StreamingResponse(
-            io.BytesIO(content.encode()),
-            media_type="text/plain",
-            headers={"Content-Disposition": "attachment; filename=export.txt"},
-        )
+        body = columnar.stream_snapshot(project_id, format)
+        media_type, filename = "application/zip", f"recon-{format}.zip"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -0,0 +1,49 @@
+import asyncio
+import shutil
+import uuid
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from config import settings
+from engine.snapshot import SnapshotError, snapshot_project, restore_project
+
+router = APIRouter()
+
+
+@router.get("/{project_id}/snapshot")
+async def download_snapshot(project_id: str):
+    """Download one project as a standalone SQLite file."""
+    path = settings.SNAPSHOT_DIR / f"{project_id}-{uuid.uuid4().hex[:8]}.db"
+    try:
+        await snapshot_project(project_id, path)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return FileResponse(
+        path,
+        media_type="application/vnd.sqlite3",
+        filename=f"recongraph-{project_id}.db",
+        background=BackgroundTask(path.unlink, missing_ok=True),
+    )
+
+
+@router.post("/restore")
+async def restore_snapshot(
+    file: UploadFile = File(...),
+    name: str | None = Form(default=None),
+):
+    """Restore a snapshot file as a new project."""
+    path = settings.SNAPSHOT_DIR / f"restore-{uuid.uuid4().hex}.db"
+    def save():
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+    try:
+        # Off the event loop: snapshots can be gigabytes
+        await asyncio.to_thread(save)
+        return await restore_project(path, name)
+    except SnapshotError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        path.unlink(missing_ok=True)
@@ -2,15 +2,15 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Subdomain, URL, Parameter, NucleiFinding
+from database import get_project_db
+from models import Subdomain, URL, ParamName, NucleiFinding
 from schemas.stats import DashboardStats
 
 router = APIRouter()
 
 
 @router.get("/{project_id}/stats", response_model=DashboardStats)
-async def get_project_stats(project_id: str, db: AsyncSession = Depends(get_db)):
+async def get_project_stats(project_id: str, db: AsyncSession = Depends(get_project_db)):
     total_subs = (await db.execute(
         select(func.count(Subdomain.id)).where(Subdomain.project_id == project_id)
     )).scalar() or 0
@@ -20,22 +20,22 @@ async def get_project_stats(project_id: str, db: AsyncSession = Depends(get_db))
     )).scalar() or 0
 
     total_params = (await db.execute(
-        select(func.count(Parameter.id)).where(Parameter.project_id == project_id)
+        select(func.sum(ParamName.occurrences)).where(ParamName.project_id == project_id)
     )).scalar() or 0
 
     total_findings = (await db.execute(
         select(func.count(NucleiFinding.id)).where(NucleiFinding.project_id == project_id)
     )).scalar() or 0
 
-    # Params by attack type
+    # Params by attack type, from the name dictionary
     params_result = await db.execute(
-        select(Parameter.attack_types).where(Parameter.project_id == project_id)
+        select(ParamName.attack_types, ParamName.occurrences)
+        .where(ParamName.project_id == project_id, ParamName.risk_score > 0)
     )
     attack_counts: dict[str, int] = {}
-    for (attack_types_json,) in params_result:
-        if attack_types_json:
-            for at in attack_types_json:
-                attack_counts[at] = attack_counts.get(at, 0) + 1
+    for attack_types_json, occurrences in params_result:
+        for at in attack_types_json or []:
+            attack_counts[at] = attack_counts.get(at, 0) + occurrences
 
     # Status codes
     status_result = await db.execute(
@@ -47,10 +47,9 @@ async def get_project_stats(project_id: str, db: AsyncSession = Depends(get_db))
 
     # Top params
     param_names_result = await db.execute(
-        select(Parameter.name, func.count(Parameter.id).label("cnt"))
-        .where(Parameter.project_id == project_id)
-        .group_by(Parameter.name)
-        .order_by(func.count(Parameter.id).desc())
+        select(ParamName.name, ParamName.occurrences)
+        .where(ParamName.project_id == project_id)
+        .order_by(ParamName.occurrences.desc(), ParamName.name)
         .limit(10)
     )
     top_params = [{"name": name, "count": cnt} for name, cnt in param_names_result]
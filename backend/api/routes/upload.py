@@ -1,16 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import shutil
+import uuid
 
-from database import get_db
-from schemas.upload import UploadResponse, AutoUploadResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+
+from database import async_session
+from models import Project
+from schemas.upload import UploadResponse, AutoUploadResponse, ChunkedUploadCreate, ChunkedUploadComplete
 from parsers.subfinder import parse_subfinder
 from parsers.waybackurls import parse_waybackurls
 from parsers.httpx_parser import parse_httpx
 from parsers.nuclei import parse_nuclei
 from parsers.auto_detect import parse_auto_detect
+from config import settings
+from engine.ingest import ingest_lines, STREAM_FLUSH_SECONDS
+from engine.ingest_jobs import start_ingest_job
+from engine import uploads
+from parsers.stream import LineReader, UploadTooLarge, UnsupportedCompression, CorruptInput, InputInterrupted, hash_file
 
 router = APIRouter()
 
+
+async def _require_project(project_id: str):
+    async with async_session() as db:
+        found = (await db.execute(select(Project.id).where(Project.id == project_id))).scalar_one_or_none()
+    if not found:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+
+async def _ingest_upload(parser, project_id: str, file: UploadFile, tool: str) -> dict:
+    """Stream an upload (plain or compressed) through a parser as one ingest batch."""
+    digest = await asyncio.to_thread(hash_file, file.file)
+    try:
+        reader = LineReader.from_file(file.file, limit=settings.MAX_UPLOAD_SIZE)
+        return await ingest_lines(parser, project_id, reader, tool, source=file.filename, digest=digest)
+    except UnsupportedCompression as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except CorruptInput as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload exceeds {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB once decompressed",
+        )
+
+
+async def _queue_upload(parser, project_id: str, file: UploadFile, tool: str) -> JSONResponse:
+    """Keep the upload on disk and parse it as a background ingest job."""
+    job_dir = settings.UPLOAD_DIR / "jobs" / uuid.uuid4().hex
+    path = job_dir / "upload.bin"
+
+    def save():
+        job_dir.mkdir(parents=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+    await asyncio.to_thread(save)
+    job = start_ingest_job(
+        parser, project_id, path, tool, source=file.filename, cleanup=job_dir, limit=settings.MAX_UPLOAD_SIZE,
+    )
+    return JSONResponse(status_code=202, content={"message": f"Ingesting {tool} upload in the background", "job": job})
+
+
+def _auto_message(breakdown: dict) -> str:
+    parts = []
+    if breakdown["subdomains"]:
+        parts.append(f"{breakdown['subdomains']} subdomains")
+    if breakdown["urls_with_params"]:
+        parts.append(f"{breakdown['urls_with_params']} URLs with params")
+    if breakdown["urls_no_params"]:
+        parts.append(f"{breakdown['urls_no_params']} URLs")
+    if breakdown["httpx_entries"]:
+        parts.append(f"{breakdown['httpx_entries']} httpx entries")
+    if breakdown["nuclei_findings"]:
+        parts.append(f"{breakdown['nuclei_findings']} nuclei findings")
+    if breakdown["skipped"]:
+        parts.append(f"{breakdown['skipped']} skipped")
+    return f"Auto-detected: {', '.join(parts)}" if parts else "No data detected"
+
+
 TOOL_PARSERS = {
     "subfinder": parse_subfinder,
     "amass": parse_subfinder,
@@ -22,31 +92,48 @@ TOOL_PARSERS = {
 }
 
 
+def _parser_for(tool_type: str):
+    if tool_type == "auto":
+        return parse_auto_detect
+    if tool_type not in TOOL_PARSERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported tool type: {tool_type}. Supported: {list(TOOL_PARSERS.keys()) + ['auto']}",
+        )
+    return TOOL_PARSERS[tool_type]
+
+
 @router.post("/{project_id}/upload", response_model=UploadResponse)
 async def upload_recon_file(
     project_id: str,
     tool_type: str = Form(...),
     file: UploadFile = File(...),
-    db: AsyncSession = Depends(get_db),
+    background: bool = Form(default=False),
 ):
+    """Parse an upload. With ``background=true``, return 202 and an ingest job instead."""
     if tool_type not in TOOL_PARSERS:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported tool type: {tool_type}. Supported: {list(TOOL_PARSERS.keys())}",
         )
 
-    content = await file.read()
-    text = content.decode("utf-8", errors="ignore")
-
-    parser = TOOL_PARSERS[tool_type]
-    result = await parser(project_id, text, db)
+    await _require_project(project_id)
+    if background:
+        return await _queue_upload(TOOL_PARSERS[tool_type], project_id, file, tool_type)
+    result = await _ingest_upload(TOOL_PARSERS[tool_type], project_id, file, tool_type)
 
+    if result.get("skipped"):
+        message = f"Identical {tool_type} file was already ingested; nothing to do"
+    else:
+        message = f"Parsed {result['new_count']} new entries from {tool_type} output"
     return UploadResponse(
         tool_type=tool_type,
         parsed_count=result["parsed_count"],
         new_count=result["new_count"],
         duplicate_count=result["duplicate_count"],
-        message=f"Parsed {result['new_count']} new entries from {tool_type} output",
+        out_of_scope_count=result.get("out_of_scope_count", 0),
+        message=message,
+        batch_id=result["batch_id"],
     )
 
 
@@ -54,36 +141,161 @@ async def upload_recon_file(
 async def upload_auto_detect(
     project_id: str,
     file: UploadFile = File(...),
-    db: AsyncSession = Depends(get_db),
+    background: bool = Form(default=False),
 ):
     """Upload a combined recon file - auto-detects subdomains, URLs, httpx JSON, nuclei JSON."""
-    content = await file.read()
-    text = content.decode("utf-8", errors="ignore")
-
-    result = await parse_auto_detect(project_id, text, db)
+    await _require_project(project_id)
+    if background:
+        return await _queue_upload(parse_auto_detect, project_id, file, "auto")
+    result = await _ingest_upload(parse_auto_detect, project_id, file, "auto")
+    if result.get("skipped"):
+        return AutoUploadResponse(
+            tool_type="auto",
+            parsed_count=result["parsed_count"],
+            new_count=0,
+            duplicate_count=result["duplicate_count"],
+            message="Identical file was already ingested; nothing to do",
+            batch_id=result["batch_id"],
+        )
 
     breakdown = result["breakdown"]
-    parts = []
-    if breakdown["subdomains"]:
-        parts.append(f"{breakdown['subdomains']} subdomains")
-    if breakdown["urls_with_params"]:
-        parts.append(f"{breakdown['urls_with_params']} URLs with params")
-    if breakdown["urls_no_params"]:
-        parts.append(f"{breakdown['urls_no_params']} URLs")
-    if breakdown["httpx_entries"]:
-        parts.append(f"{breakdown['httpx_entries']} httpx entries")
-    if breakdown["nuclei_findings"]:
-        parts.append(f"{breakdown['nuclei_findings']} nuclei findings")
-    if breakdown["skipped"]:
-        parts.append(f"{breakdown['skipped']} skipped")
-
-    msg = f"Auto-detected: {', '.join(parts)}" if parts else "No data detected"
+    msg = _auto_message(breakdown)
 
     return AutoUploadResponse(
         tool_type="auto",
         parsed_count=result["parsed_count"],
         new_count=result["new_count"],
         duplicate_count=result["duplicate_count"],
+        out_of_scope_count=result.get("out_of_scope_count", 0),
         message=msg,
         breakdown=breakdown,
+        batch_id=result["batch_id"],
     )
+
+
+# --- Piped ingest ---
+
+@router.api_route("/{project_id}/ingest", methods=["POST", "PUT"], response_model=AutoUploadResponse)
+async def ingest_stream(
+    project_id: str,
+    request: Request,
+    tool: str = Query(default="auto"),
+    source: str | None = Query(default=None),
+):
+    """Parse a raw request body line by line while it is still arriving.
+
+    Meant for pipes: ``subfinder -d x | curl -T - '.../ingest?tool=subfinder'``.
+    Rows are committed at least every second, and the summary comes back
+    once the body ends.
+    """
+    parser = _parser_for(tool)
+    await _require_project(project_id)
+    reader = LineReader.from_stream(request.stream(), limit=settings.MAX_CHUNKED_UPLOAD_SIZE)
+    try:
+        result = await ingest_lines(
+            parser, project_id, reader, tool, source=source or "stream", flush_interval=STREAM_FLUSH_SECONDS,
+        )
+    except UnsupportedCompression as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except (CorruptInput, InputInterrupted) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Stream exceeds {settings.MAX_CHUNKED_UPLOAD_SIZE} bytes")
+
+    breakdown = result.get("breakdown", {})
+    if tool == "auto":
+        message = _auto_message(breakdown)
+    else:
+        message = f"Parsed {result['new_count']} new entries from {tool} output"
+    return AutoUploadResponse(
+        tool_type=tool,
+        parsed_count=result["parsed_count"],
+        new_count=result["new_count"],
+        duplicate_count=result["duplicate_count"],
+        out_of_scope_count=result.get("out_of_scope_count", 0),
+        message=message,
+        breakdown=breakdown,
+        batch_id=result["batch_id"],
+    )
+
+
+# --- Resumable chunked uploads ---
+
+def _get_session(project_id: str, upload_id: str) -> dict:
+    manifest = uploads.get_session(project_id, upload_id)
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return manifest
+
+
+@router.post("/{project_id}/uploads", status_code=201)
+async def create_chunked_upload(project_id: str, body: ChunkedUploadCreate):
+    """Start a resumable upload. Send chunks with PUT, then POST .../complete."""
+    _parser_for(body.tool_type)
+    await _require_project(project_id)
+    try:
+        manifest = await asyncio.to_thread(
+            uploads.create_session, project_id, body.tool_type, body.filename, body.total_size, body.total_chunks,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {**uploads.session_info(manifest), "max_chunk_size": settings.UPLOAD_CHUNK_MAX_SIZE}
+
+
+@router.get("/{project_id}/uploads/{upload_id}")
+async def get_chunked_upload(project_id: str, upload_id: str):
+    """Which chunks the server already has (``received``, and ``missing`` when the count is known)."""
+    return uploads.session_info(_get_session(project_id, upload_id))
+
+
+@router.put("/{project_id}/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    project_id: str,
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="sha256 (hex) of this chunk's bytes"),
+):
+    manifest = _get_session(project_id, upload_id)
+    try:
+        size = await uploads.write_chunk(manifest, index, x_chunk_sha256, request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except uploads.UploadSessionError as e:
+        raise HTTPException(status_code=409 if manifest["status"] != "open" else 400, detail=str(e))
+    return {"index": index, "size": size}
+
+
+@router.post("/{project_id}/uploads/{upload_id}/complete", status_code=202)
+async def complete_chunked_upload(project_id: str, upload_id: str, body: ChunkedUploadComplete | None = None):
+    """Assemble the chunks and ingest the file as a background job."""
+    body = body or ChunkedUploadComplete()
+    manifest = _get_session(project_id, upload_id)
+    if manifest["status"] != "open":
+        raise HTTPException(status_code=409, detail="Upload is already finished")
+    try:
+        total = await asyncio.to_thread(uploads.check_complete, manifest, body.total_chunks)
+    except uploads.UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    job = start_ingest_job(
+        _parser_for(manifest["tool"]),
+        project_id,
+        uploads.assembled_path(manifest),
+        manifest["tool"],
+        source=manifest["filename"],
+        prepare=lambda: uploads.assemble(manifest, total, body.sha256),
+        cleanup=uploads.session_dir(manifest),
+        limit=settings.MAX_CHUNKED_UPLOAD_SIZE,
+    )
+    await asyncio.to_thread(uploads.finish_session, manifest, total, job["id"])
+    return {"upload_id": upload_id, "job": job}
+
+
+@router.delete("/{project_id}/uploads/{upload_id}")
+async def abort_chunked_upload(project_id: str, upload_id: str):
+    manifest = _get_session(project_id, upload_id)
+    if manifest["status"] != "open":
+        raise HTTPException(status_code=409, detail="Upload is already finished")
+    await asyncio.to_thread(uploads.discard_session, manifest)
+    return {"message": "Upload discarded"}
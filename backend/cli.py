@@ -0,0 +1,62 @@
+"""ReconGraph maintenance commands.
+
+    python cli.py snapshot <project_id> [-o project.db]
+    python cli.py restore <snapshot.db> [--name NAME]
+    python cli.py backup <recongraph-backup.db>
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from database import init_db, close_db, ProjectNotFound
+from engine.snapshot import SnapshotError, snapshot_project, restore_project, backup_database
+
+
+async def _run(args) -> int:
+    await init_db()
+    try:
+        if args.command == "snapshot":
+            out = await snapshot_project(args.project_id, Path(args.output or f"{args.project_id}.db"))
+            print(f"Snapshot written to {out}")
+        elif args.command == "restore":
+            result = await restore_project(Path(args.file), args.name)
+            rows = ", ".join(f"{n} {t}" for t, n in result["rows"].items())
+            print(f"Restored as project {result['project_id']} ({rows})")
+        elif args.command == "backup":
+            for path in await backup_database(Path(args.output)):
+                print(f"Backed up to {path}")
+    except ProjectNotFound as e:
+        print(f"Project not found: {e}", file=sys.stderr)
+        return 1
+    except (SnapshotError, NotImplementedError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        await close_db()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="cli.py", description="ReconGraph maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snap = commands.add_parser("snapshot", help="Copy one project into a standalone SQLite file")
+    snap.add_argument("project_id")
+    snap.add_argument("-o", "--output", help="Output file (default: <project_id>.db)")
+
+    restore = commands.add_parser("restore", help="Load a snapshot as a new project")
+    restore.add_argument("file")
+    restore.add_argument("--name", help="Name for the restored project")
+
+    backup = commands.add_parser("backup", help="Online backup of the whole database")
+    backup.add_argument("output")
+
+    return asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
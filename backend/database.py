@@ -1,21 +1,490 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from sqlalchemy import JSON, event, inspect, select, delete, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateColumn
 
 from config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+IS_POSTGRES = settings.DATABASE_URL.startswith("postgresql")
+# Sharded mode keeps each project's data in its own SQLite file
+SHARDED = IS_SQLITE and settings.STORAGE_MODE == "sharded"
+
+# JSON columns become JSONB on PostgreSQL so they can carry GIN indexes
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# PRAGMAs applied to every SQLite connection. WAL lets readers run while the
+# writer commits; NORMAL sync is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 10000,
+    "cache_size": -64000,  # 64MB
+    "temp_store": "MEMORY",
+    "mmap_size": 256 * 1024 * 1024,
+    "foreign_keys": "ON",
+}
+
+# Tables that stay in the catalog database when sharding
+CATALOG_ONLY_TABLES = {"scan_jobs"}
+
+# Per-project settings kept when a project's data is cleared
+PROJECT_SETTINGS_TABLES = {"scope_rules"}
+
+# Extra DDL run after create_all, e.g. SQLite virtual tables and triggers.
+# Each hook is called with a sync connection.
+schema_hooks: list = []
+
+# Data migrations for databases created by older versions, run after
+# create_all and before new columns are added. Each is called with a sync
+# connection and must do nothing on an up-to-date schema.
+migrations: list = []
+
+# Per-request statement counter, installed by the HTTP middleware in main.py
+query_counter: ContextVar[dict | None] = ContextVar("query_counter", default=None)
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class ProjectNotFound(LookupError):
+    """Raised when a project-scoped operation targets an unknown project."""
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = query_counter.get()
+    if counter is not None:
+        counter["queries"] += 1
+
+
+def _apply_pragmas(dbapi_connection, read_only: bool):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+class WriteQueue:
+    """Serializes all database writes through one task and one connection.
+
+    Producers submit ``fn(session, *args)`` coroutines; the writer runs them
+    one at a time, commits, and hands the return value back to the caller.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.stats = {"completed": 0, "failed": 0, "busy_seconds": 0.0}
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        if self._task and self._queue is not None:
+            # The writer died; whatever it left queued would never be answered
+            error = None if self._task.cancelled() else self._task.exception()
+            self._fail_pending(error or asyncio.CancelledError())
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def _fail_pending(self, error: BaseException):
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[2].done():
+                item[2].set_exception(RuntimeError(f"Database writer stopped: {error!r}"))
+
+    async def stop(self):
+        if not self._task:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, fn, *args):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, args, future))
+        return await future
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _run(self):
+        # The task may have been started from a request; don't count into it
+        query_counter.set(None)
+        loop = asyncio.get_running_loop()
+        try:
+            await self._serve(loop)
+        except BaseException as e:
+            self._fail_pending(e)
+            raise
+
+    async def _serve(self, loop):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            fn, args, future = item
+            if future.cancelled():
+                continue
+            started = loop.time()
+            async with self._session_factory() as session:
+                try:
+                    result = await fn(session, *args)
+                    await session.commit()
+                except BaseException as e:
+                    await session.rollback()
+                    self.stats["failed"] += 1
+                    if not future.cancelled():
+                        future.set_exception(e)
+                    if not isinstance(e, Exception):
+                        raise
+                else:
+                    self.stats["completed"] += 1
+                    if not future.cancelled():
+                        future.set_result(result)
+            self.stats["busy_seconds"] += loop.time() - started
+
+
+class Store:
+    """Engines, session factories and the writer for one database."""
+
+    def __init__(self, url: str, read_pool_size: int = 8):
+        if url.startswith("sqlite"):
+            # Read pool: many connections, never allowed to write.
+            self.engine = create_async_engine(
+                url, echo=settings.DEBUG,
+                poolclass=AsyncAdaptedQueuePool, pool_size=read_pool_size, max_overflow=read_pool_size,
+            )
+            # Write engine: exactly one connection, owned by the writer task.
+            self.write_engine = create_async_engine(
+                url, echo=settings.DEBUG,
+                poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0,
+            )
+
+            @event.listens_for(self.engine.sync_engine, "connect")
+            def _on_read_connect(dbapi_connection, connection_record):
+                _apply_pragmas(dbapi_connection, read_only=True)
+
+            @event.listens_for(self.write_engine.sync_engine, "connect")
+            def _on_write_connect(dbapi_connection, connection_record):
+                # Let SQLAlchemy emit BEGIN itself so we can take the write lock up front
+                dbapi_connection.isolation_level = None
+                _apply_pragmas(dbapi_connection, read_only=False)
+
+            @event.listens_for(self.write_engine.sync_engine, "begin")
+            def _on_write_begin(conn):
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            # PostgreSQL handles concurrent writers itself; one pool serves both roles.
+            self.engine = create_async_engine(
+                url, echo=settings.DEBUG,
+                pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_POOL_SIZE,
+            )
+            self.write_engine = self.engine
+
+        for eng in {self.engine, self.write_engine}:
+            event.listen(eng.sync_engine, "before_cursor_execute", _count_query)
+
+        self.session = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.write_session = async_sessionmaker(self.write_engine, class_=AsyncSession, expire_on_commit=False)
+        self.write_queue = WriteQueue(self.write_session)
+        # Sessions and writes in flight; a shard is only evicted when idle
+        self.users = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        # Set once the project is being deleted; no new users get in
+        self.dropping = False
+
+    async def run_write(self, fn, *args):
+        if not IS_SQLITE:
+            async with self.write_session() as session:
+                result = await fn(session, *args)
+                await session.commit()
+                return result
+        return await self.write_queue.submit(fn, *args)
+
+    async def close(self):
+        await self.write_queue.stop()
+        await self.engine.dispose()
+        if self.write_engine is not self.engine:
+            await self.write_engine.dispose()
+
+
+# The main database: everything in single mode, the project catalog when sharded
+catalog = Store(settings.DATABASE_URL)
+engine = catalog.engine
+write_engine = catalog.write_engine
+async_session = catalog.session
+write_session = catalog.write_session
+write_queue = catalog.write_queue
+
+
+def _add_missing_columns(sync_conn, tables):
+    # Only for new nullable columns without server defaults, which is all
+    # ADD COLUMN supports everywhere
+    inspector = inspect(sync_conn)
+    for table in tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+                sync_conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _deferred_tables(sync_conn, tables) -> set[str]:
+    """New tables whose foreign keys point at existing columns of another type.
+
+    A legacy key is converted by a migration; PostgreSQL refuses the foreign
+    key until then, so these tables are created after the migrations run.
+    """
+    inspector = inspect(sync_conn)
+    existing = set(inspector.get_table_names())
+    deferred = set()
+    for table in tables:
+        if table.name in existing:
+            continue
+        for fk in table.foreign_keys:
+            parent = fk.column.table.name
+            if parent == table.name or parent not in existing:
+                continue
+            found = {c["name"]: c["type"] for c in inspector.get_columns(parent)}.get(fk.column.name)
+            if found is not None and found._type_affinity is not fk.parent.type._type_affinity:
+                deferred.add(table.name)
+    return deferred
+
+
+def _create_schema(sync_conn, tables=None):
+    tables = tables or Base.metadata.sorted_tables
+    deferred = _deferred_tables(sync_conn, tables)
+    Base.metadata.create_all(sync_conn, tables=[t for t in tables if t.name not in deferred])
+    for migration in migrations:
+        migration(sync_conn)
+    if deferred:
+        Base.metadata.create_all(sync_conn, tables=tables)
+    _add_missing_columns(sync_conn, tables)
+    # create_all skips indexes on tables that already exist; add any new ones
+    for table in tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+    for hook in schema_hooks:
+        hook(sync_conn)
+
+
+# --- Project shards ---
+
+_shards: "OrderedDict[str, Store]" = OrderedDict()
+_shard_lock = asyncio.Lock()
+
+
+_SHARD_ID_RE = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def shard_path(project_id: str) -> Path:
+    # Project ids become file names; refuse anything that could escape SHARD_DIR
+    if not _SHARD_ID_RE.fullmatch(project_id):
+        raise ProjectNotFound(project_id)
+    # Shard files may be symlinks, so hot projects can live on faster disks
+    return settings.SHARD_DIR / f"{project_id}.db"
+
+
+def _shard_tables():
+    return [t for t in Base.metadata.sorted_tables if t.name not in CATALOG_ONLY_TABLES]
+
+
+async def _bootstrap_shard(store: Store, project_id: str):
+    """Create a shard's schema and pull the project's rows in from the catalog.
+
+    The catalog is ATTACHed to the shard's write connection so the copy runs
+    as INSERT ... SELECT inside SQLite. Rows left over from single mode are
+    moved too, so switching STORAGE_MODE on an existing install keeps data.
+    """
+    tables = _shard_tables()
+    catalog_path = settings.DATABASE_URL.split("///", 1)[1]
+
+    async with store.write_engine.begin() as conn:
+        await conn.run_sync(_create_schema, tables)
+    async with store.write_engine.connect() as conn:
+        # ATTACH/DETACH must run outside a transaction, so go through the driver
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.execute("ATTACH DATABASE ? AS catalog", (catalog_path,))
+        try:
+            async with conn.begin():
+                for table in tables:
+                    if table.name == "projects":
+                        key = "id"
+                    elif "project_id" in table.c:
+                        key = "project_id"
+                    else:
+                        continue
+                    cols = ", ".join(c.name for c in table.columns)
+                    # Trigger-maintained counters start at zero and count the rows copied after them
+                    values = ", ".join("0" if c.info.get("counter") else c.name for c in table.columns)
+                    await conn.execute(
+                        text(
+                            f"INSERT OR IGNORE INTO main.{table.name} ({cols}) "
+                            f"SELECT {values} FROM catalog.{table.name} WHERE {key} = :pid"
+                        ),
+                        {"pid": project_id},
+                    )
+        finally:
+            await raw.execute("DETACH DATABASE catalog")
+
+    # Data rows now live in the shard; drop the catalog copies
+    async def _purge(db: AsyncSession):
+        for table in reversed(tables):
+            if "project_id" in table.c:
+                await db.execute(delete(table).where(table.c.project_id == project_id))
+
+    await catalog.run_write(_purge)
+
+
+async def open_shard(project_id: str) -> Store:
+    """Return the Store for a project's shard, creating the file on first use."""
+    store = _shards.get(project_id)
+    if store:
+        _shards.move_to_end(project_id)
+        return store
+
+    async with _shard_lock:
+        store = _shards.get(project_id)
+        if store:
+            return store
+
+        path = shard_path(project_id)
+        is_new = not path.exists()
+        if is_new:
+            projects = Base.metadata.tables["projects"]
+            async with catalog.session() as db:
+                found = (await db.execute(
+                    select(projects.c.id).where(projects.c.id == project_id)
+                )).first()
+            if not found:
+                raise ProjectNotFound(project_id)
+
+        store = Store(f"sqlite+aiosqlite:///{path}", read_pool_size=settings.SHARD_READ_POOL_SIZE)
+        if is_new:
+            await _bootstrap_shard(store, project_id)
+        _shards[project_id] = store
+        await _evict_idle_shards(keep=project_id)
+        return store
+
+
+async def _evict_idle_shards(keep: str | None = None):
+    """Close least recently used shards past ``SHARD_CACHE_SIZE``; hold ``_shard_lock``.
+
+    Shards in use stay open, and the cache runs over size until they are
+    released: closing one under a request and reopening it would give the
+    file a second writer.
+    """
+    excess = len(_shards) - settings.SHARD_CACHE_SIZE
+    for key in [k for k in _shards if k != keep]:
+        if excess <= 0:
+            break
+        candidate = _shards.get(key)
+        if candidate is not None and not candidate.users:
+            del _shards[key]
+            excess -= 1
+            await candidate.close()
+
+
+async def drop_shard(project_id: str):
+    """Close a project's shard and delete its files.
+
+    New sessions and writes are refused at once; the ones in flight finish
+    before the engines close.
+    """
+    store = _shards.get(project_id)
+    if store:
+        store.dropping = True
+        await store.idle.wait()
+    async with _shard_lock:
+        # Still cached unless eviction already closed it while idle
+        if store and _shards.get(project_id) is store:
+            del _shards[project_id]
+            await store.close()
+    path = shard_path(project_id)
+    real = Path(os.path.realpath(path))
+    for suffix in ("-wal", "-shm", ""):
+        Path(f"{real}{suffix}").unlink(missing_ok=True)
+    path.unlink(missing_ok=True)
+
+
+async def store_for(project_id: str | None = None) -> Store:
+    if SHARDED and project_id:
+        return await open_shard(project_id)
+    return catalog
+
+
+@asynccontextmanager
+async def _using_store(project_id: str | None):
+    # Pinned until the caller is done, so shard eviction leaves it open
+    store = await store_for(project_id)
+    if store.dropping:
+        raise ProjectNotFound(project_id)
+    store.users += 1
+    store.idle.clear()
+    try:
+        yield store
+    finally:
+        store.users -= 1
+        if not store.users:
+            store.idle.set()
+        if not store.users and len(_shards) > settings.SHARD_CACHE_SIZE:
+            async with _shard_lock:
+                await _evict_idle_shards()
+
+
+async def run_write(fn, *args, project_id: str | None = None):
+    """Run ``fn(session, *args)`` as one write transaction and return its result.
+
+    Pass ``project_id`` for writes to project data so they reach the right shard.
+    """
+    async with _using_store(project_id) as store:
+        return await store.run_write(fn, *args)
+
+
+@asynccontextmanager
+async def project_session(project_id: str):
+    """Read session for a project's data."""
+    async with _using_store(project_id) as store:
+        async with store.session() as session:
+            yield session
+
+
 async def get_db():
     async with async_session() as session:
         yield session
 
 
+async def get_project_db(project_id: str):
+    async with project_session(project_id) as session:
+        yield session
+
+
+async def close_db():
+    for store in list(_shards.values()):
+        await store.close()
+    _shards.clear()
+    await write_queue.stop()
+
+
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if SHARDED:
+        settings.SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    async with write_engine.begin() as conn:
+        await conn.run_sync(_create_schema)
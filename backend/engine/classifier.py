@@ -1,3 +1,8 @@
+import hashlib
+import json
+import re
+from functools import lru_cache
+
 ATTACK_SIGNATURES: dict[str, dict] = {
     "LFI": {
         "params": {
@@ -65,14 +70,143 @@ ATTACK_SIGNATURES: dict[str, dict] = {
 }
 
 
+# Bump when the matching logic below changes without the signatures changing
+_RULES_REVISION = 2
+
+
+def _rules_version() -> str:
+    rules = {"revision": _RULES_REVISION, **{at: sorted(info["params"]) for at, info in ATTACK_SIGNATURES.items()}}
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:12]
+
+
+# Recorded on every parameter row; rows with another version are reclassified
+# by engine.reclassify
+CLASSIFIER_VERSION = _rules_version()
+
+# Results kept per worker process; parameter names repeat heavily across URLs
+CLASSIFIER_CACHE_SIZE = 100_000
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+_TRAILING_DIGITS = re.compile(r"\d+$")
+
+
+def _build_index() -> dict[str, tuple[str, ...]]:
+    """Signature name -> attack types, in ATTACK_SIGNATURES order."""
+    index: dict[str, list[str]] = {}
+    for attack_type, info in ATTACK_SIGNATURES.items():
+        for name in info["params"]:
+            index.setdefault(name, []).append(attack_type)
+    return {name: tuple(types) for name, types in index.items()}
+
+
+_INDEX = _build_index()
+
+# Tokens too generic to classify a compound name on their own
+# (utm_source, content_type, page_size, csrf_token, api_key...)
+GENERIC_TOKENS = frozenset({"source", "type", "page", "code", "key", "token", "size"})
+# Leading tokens of tracking, session and protection parameters, which are
+# not user input (utm_campaign, csrf_token, session_id)
+GENERIC_PREFIXES = frozenset({"utm", "csrf", "xsrf", "session", "sess", "nonce"})
+_ORDER = {attack_type: i for i, attack_type in enumerate(ATTACK_SIGNATURES)}
+
+
+def tokenize_parameter(param_name: str) -> list[str]:
+    """Split camelCase, snake_case and kebab-case into lowercase tokens, without numeric suffixes.
+
+    ``redirectURL2`` -> ``["redirect", "url"]``, ``user[id]`` -> ``["user", "id"]``.
+    """
+    words = _SEPARATORS.split(_CAMEL_BOUNDARY.sub("_", param_name).lower())
+    tokens = (_TRAILING_DIGITS.sub("", word) for word in words)
+    return [token for token in tokens if token]
+
+
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def _classify(param_name: str) -> tuple[str, ...]:
+    name_lower = param_name.lower().strip()
+    if name_lower in _INDEX:
+        return _INDEX[name_lower]
+    tokens = tokenize_parameter(param_name)
+    # Whole-name forms first: userId -> user_id, redirect-url2 -> redirect_url / redirecturl
+    for candidate in ("_".join(tokens), "".join(tokens)):
+        if candidate in _INDEX:
+            return _INDEX[candidate]
+    # Then the last token, which names what the value is: file-path -> path, user_email -> email
+    if len(tokens) < 2 or tokens[0] in GENERIC_PREFIXES or tokens[-1] in GENERIC_TOKENS:
+        return ()
+    return _INDEX.get(tokens[-1], ())
+
+
 def classify_parameter(param_name: str) -> list[str]:
     """Classify a URL parameter name into potential attack types."""
-    name_lower = param_name.lower().strip()
-    matched = []
-    for attack_type, info in ATTACK_SIGNATURES.items():
-        if name_lower in info["params"]:
-            matched.append(attack_type)
-    return matched
+    return list(_classify(param_name))
+
+
+def classify_parameters(param_names) -> dict[str, list[str]]:
+    """Classify many names at once, each distinct name once. Returns {param_name: [attack_types]}."""
+    return {name: list(_classify(name)) for name in set(param_names)}
+
+
+# Shapes of parameter values, in priority order. Compiled into one pattern and
+# matched against the whole value; the first alternative that fits wins.
+VALUE_DETECTORS: dict[str, str] = {
+    "url": r"(?:[a-z][a-z0-9+.-]*:)?//[^\s/?#]+\S*",
+    "uuid": r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
+    "numeric": r"-?\d{1,19}",
+    "email": r"[^@\s/]+@[^@\s/]+\.[a-z]{2,}",
+    "hash": r"[0-9a-f]{32}|[0-9a-f]{40}|[0-9a-f]{64}",
+    "path": (
+        r"(?:[a-z]:[\\/]|\.{0,2}[\\/]|~[\\/])\S+|\S*\.\.[\\/]\S*"
+        r"|[\w.-]+\.(?:php\d?|aspx?|jspx?|html?|txt|xml|json|ya?ml|ini|conf|cfg|log|env|bak|sql|sh|pdf|docx?|xlsx?|csv|zip)"
+    ),
+}
+
+# What a value's shape suggests, whatever the parameter is called
+VALUE_ATTACK_TYPES: dict[str, tuple[str, ...]] = {
+    "url": ("SSRF", "Open Redirect"),
+    "path": ("LFI",),
+    "uuid": ("IDOR",),
+    "numeric": ("IDOR",),
+}
+
+# A value's shape is weaker evidence than the name: it scores this much
+# below the same attack type matched by name
+VALUE_RISK_DISCOUNT = 2
+
+# Pagination, format and date parameters, whose numeric or path-like values
+# say nothing about the attack surface (page=1, limit=50, year=2024)
+VALUE_NEUTRAL_PARAMS = frozenset({
+    "p", "pg", "page", "page_no", "page_num", "page_size", "pagesize", "per_page", "perpage",
+    "limit", "offset", "start", "end", "count", "size", "max", "min",
+    "year", "month", "day", "date", "time", "timestamp", "ts",
+    "v", "ver", "version", "rev", "format", "fmt", "lang", "locale",
+    "width", "height", "w", "h", "zoom", "lat", "lng", "lon", "_",
+})
+
+_VALUE_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in VALUE_DETECTORS.items()), re.IGNORECASE,
+)
+
+
+def classify_value(value: str | None) -> str | None:
+    """The shape of a parameter value (``url``, ``path``, ``numeric``...), or None."""
+    if not value:
+        return None
+    match = _VALUE_PATTERN.fullmatch(value.strip())
+    return match.lastgroup if match else None
+
+
+def classify_values(values) -> dict[str, str | None]:
+    """Classify many values at once, each distinct value once. Returns {value: value_type}."""
+    return {value: classify_value(value) for value in set(values)}
+
+
+_ATTACK_TYPE_NAMES = {name.upper(): name for name in ATTACK_SIGNATURES}
+
+
+def normalize_attack_type(attack_type: str) -> str:
+    """Map a user-supplied attack type (any case) to its canonical name."""
+    return _ATTACK_TYPE_NAMES.get(attack_type.strip().upper(), attack_type)
 
 
 def get_attack_color(attack_type: str) -> str:
@@ -82,7 +216,7 @@ def get_attack_color(attack_type: str) -> str:
 
 def classify_all_params(param_names: list[str]) -> dict[str, list[str]]:
     """Classify a list of parameter names. Returns {param_name: [attack_types]}."""
-    return {name: classify_parameter(name) for name in param_names}
+    return classify_parameters(param_names)
 
 
 RISK_LABELS: dict[str, str] = {
@@ -106,11 +240,21 @@ RISK_SEVERITY: dict[str, int] = {
 }
 
 
-def get_risk_score(attack_types: list[str]) -> int:
-    """Calculate a risk score (0-10) based on attack types."""
-    if not attack_types:
-        return 0
-    return max(RISK_SEVERITY.get(at, 1) for at in attack_types)
+def _value_neutral(param_name: str) -> bool:
+    name = param_name.lower().strip()
+    return name in VALUE_NEUTRAL_PARAMS or "_".join(tokenize_parameter(param_name)) in VALUE_NEUTRAL_PARAMS
+
+
+def get_risk_score(attack_types: list[str], value_type: str | None = None, param_name: str | None = None) -> int:
+    """Calculate a risk score (0-10) based on attack types and, if known, the value's shape.
+
+    The value's shape counts for less than the name, and not at all for
+    pagination and format parameters (see ``VALUE_NEUTRAL_PARAMS``).
+    """
+    scores = [RISK_SEVERITY.get(at, 1) for at in attack_types]
+    if value_type and not (param_name and _value_neutral(param_name)):
+        scores += [RISK_SEVERITY.get(at, 1) - VALUE_RISK_DISCOUNT for at in VALUE_ATTACK_TYPES.get(value_type, ())]
+    return max(scores, default=0)
 
 
 def get_risk_label(attack_type: str) -> str:
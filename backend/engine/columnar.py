@@ -0,0 +1,195 @@
+"""Columnar (Parquet / Arrow IPC) export of a project's recon data.
+
+Each table is read through a server-side cursor and written one record batch
+(one Parquet row group) at a time, so the full dataset never sits in memory.
+Repeated strings such as hosts, parameter names and sources are dictionary
+encoded.
+"""
+
+import asyncio
+import io
+import zipfile
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from database import project_session
+from models import Subdomain, URL, Endpoint, ParamName, Parameter, NucleiFinding
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional at runtime
+    pa = None
+
+COLUMNAR_BATCH_ROWS = 50_000
+
+# format -> (media type, file extension)
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def _tables() -> dict:
+    """table name -> (query, [(column, arrow type)])
+
+    ``id`` and the ``*_id`` columns are the integer row keys, which join the
+    files to each other; ``uuid`` is the id the API uses.
+    """
+    string, dict_string, key = pa.string(), pa.dictionary(pa.int32(), pa.string()), pa.int64()
+    return {
+        "subdomains": (
+            select(
+                Subdomain.id, Subdomain.uuid, Subdomain.subdomain, Subdomain.ip_address, Subdomain.status_code,
+                Subdomain.title, Subdomain.technologies, Subdomain.content_length, Subdomain.source,
+            ),
+            [
+                ("id", key), ("uuid", string), ("subdomain", string), ("ip_address", dict_string),
+                ("status_code", pa.int16()), ("title", dict_string),
+                ("technologies", pa.list_(dict_string)), ("content_length", pa.int64()),
+                ("source", dict_string),
+            ],
+        ),
+        "urls": (
+            select(
+                URL.id, URL.uuid, URL.subdomain_id, URL.endpoint_id, Subdomain.subdomain, URL.full_url, URL.path,
+                URL.source,
+            ).outerjoin(Subdomain, Subdomain.id == URL.subdomain_id),
+            [
+                ("id", key), ("uuid", string), ("subdomain_id", key), ("endpoint_id", key), ("host", dict_string),
+                ("full_url", string), ("path", string), ("source", dict_string),
+            ],
+        ),
+        "endpoints": (
+            select(
+                Endpoint.id, Endpoint.uuid, Endpoint.subdomain_id, Subdomain.subdomain, Endpoint.template,
+                Endpoint.url_count, Endpoint.sample_url,
+            ).join(Subdomain, Subdomain.id == Endpoint.subdomain_id),
+            [
+                ("id", key), ("uuid", string), ("subdomain_id", key), ("host", dict_string),
+                ("template", string), ("url_count", pa.int64()), ("sample_url", string),
+            ],
+        ),
+        "parameters": (
+            select(
+                Parameter.id, Parameter.uuid, Parameter.url_id, ParamName.name, Parameter.sample_value,
+                ParamName.attack_types, Parameter.value_type,
+            ).join(ParamName, ParamName.id == Parameter.name_id),
+            [
+                ("id", key), ("uuid", string), ("url_id", key), ("name", dict_string),
+                ("sample_value", string), ("attack_types", pa.list_(dict_string)), ("value_type", dict_string),
+            ],
+        ),
+        "findings": (
+            select(
+                NucleiFinding.id, NucleiFinding.uuid, NucleiFinding.subdomain_id, Subdomain.subdomain,
+                NucleiFinding.template_id, NucleiFinding.name, NucleiFinding.severity, NucleiFinding.matched_at,
+                NucleiFinding.description,
+            ).outerjoin(Subdomain, Subdomain.id == NucleiFinding.subdomain_id),
+            [
+                ("id", key), ("uuid", string), ("subdomain_id", key), ("host", dict_string),
+                ("template_id", dict_string), ("name", dict_string), ("severity", dict_string),
+                ("matched_at", string), ("description", string),
+            ],
+        ),
+    }
+
+
+COLUMNAR_TABLES = ("subdomains", "urls", "endpoints", "parameters", "findings")
+
+_MODELS = {
+    "subdomains": Subdomain, "urls": URL, "endpoints": Endpoint, "parameters": Parameter, "findings": NucleiFinding,
+}
+
+
+def _as_list(value):
+    # technologies may be stored as a list or as a {name: version} mapping
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return [str(k) for k in value]
+    return [str(v) for v in value]
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_list(field.type):
+            arrays.append(pa.array([_as_list(v) for v in values], type=pa.list_(pa.string())).cast(field.type))
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Sink(io.RawIOBase):
+    """Write-only stream that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _open_writer(sink, schema, format: str):
+    if format == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd", use_dictionary=True)
+    # The stream format allows a fresh dictionary per batch; the file format does not
+    return pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+
+async def _table_chunks(project_id: str, table: str, format: str) -> AsyncIterator[bytes]:
+    query, columns = _tables()[table]
+    schema = pa.schema(columns)
+    query = query.where(_MODELS[table].project_id == project_id)
+
+    sink = _Sink()
+    writer = _open_writer(sink, schema, format)
+    async with project_session(project_id) as db:
+        result = await db.stream(query.execution_options(yield_per=COLUMNAR_BATCH_ROWS))
+        async for rows in result.partitions():
+            batch = _record_batch(rows, schema)
+            await asyncio.to_thread(writer.write_batch, batch)
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+async def stream_table(project_id: str, table: str, format: str) -> AsyncIterator[bytes]:
+    """Stream one table as a Parquet file or Arrow IPC stream."""
+    async for chunk in _table_chunks(project_id, table, format):
+        if chunk:
+            yield chunk
+
+
+async def stream_snapshot(project_id: str, format: str) -> AsyncIterator[bytes]:
+    """Stream a zip holding one columnar file per table."""
+    ext = COLUMNAR_FORMATS[format][1]
+    out = _Sink()
+    # Members are already compressed, so store them as-is
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+        for table in COLUMNAR_TABLES:
+            with archive.open(f"{table}.{ext}", "w", force_zip64=True) as member:
+                async for chunk in _table_chunks(project_id, table, format):
+                    member.write(chunk)
+                    yield out.drain()
+    yield out.drain()
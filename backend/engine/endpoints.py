@@ -0,0 +1,82 @@
+"""Infer endpoint templates from URL paths.
+
+Archived URL lists hold thousands of variants of one endpoint
+(``/product/123``, ``/product/124``...). Each host's paths go into a trie of
+path segments; segments shaped like ids become placeholders (``{int}``,
+``{uuid}``, ``{hex}``), and a trie node with more than ``VARIANCE_THRESHOLD``
+distinct literal children (slugs, usernames) has them merged into ``{str}``.
+Nothing here touches the database.
+"""
+
+import re
+
+SEGMENT_TYPES: dict[str, str] = {
+    "int": r"\d+",
+    "uuid": r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
+    "hex": r"(?=[a-f]*\d)[0-9a-f]{16,}",
+}
+
+# Distinct literal segments under one prefix before they count as a variable
+VARIANCE_THRESHOLD = 20
+
+_SEGMENT_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in SEGMENT_TYPES.items()), re.IGNORECASE,
+)
+_PLACEHOLDER = re.compile(r"\{\w+\}")
+_VARIABLE = "{str}"
+
+
+def segment_template(segment: str) -> str:
+    """``{int}``, ``{uuid}`` or ``{hex}`` for id-shaped segments, else the segment."""
+    match = _SEGMENT_PATTERN.fullmatch(segment)
+    return "{%s}" % match.lastgroup if match else segment
+
+
+def _segments(path: str) -> list[str]:
+    return [segment_template(s) for s in path.split("/") if s]
+
+
+def _merge(into: dict, other: dict):
+    for key, child in other.items():
+        _merge(into.setdefault(key, {}), child)
+
+
+def _collapse(node: dict, threshold: int, depth: int = 0):
+    # The first segment names sections of the site, not values, so it is left alone.
+    # Once a position is variable, later values there join it.
+    literals = [k for k in node if k is not None and not _PLACEHOLDER.fullmatch(k)]
+    if depth and literals and (len(literals) > threshold or _VARIABLE in node):
+        variable = node.setdefault(_VARIABLE, {})
+        for key in literals:
+            _merge(variable, node.pop(key))
+    for key, child in node.items():
+        if key is not None:
+            _collapse(child, threshold, depth + 1)
+
+
+def infer_templates(paths, known=(), threshold: int = VARIANCE_THRESHOLD) -> dict[str, str]:
+    """Map each of one host's paths, and its ``known`` templates, to a template.
+
+    Known templates go into the trie too, so new paths line up with stored
+    endpoints, and a known literal template maps to a broader one once its
+    siblings pass the threshold.
+    """
+    segments = {path: _segments(path) for path in {*paths, *known}}
+    trie: dict = {}
+    for parts in segments.values():
+        node = trie
+        for part in parts:
+            node = node.setdefault(part, {})
+        node[None] = {}  # end of a path
+    _collapse(trie, threshold)
+
+    templates = {}
+    for path, parts in segments.items():
+        node, out = trie, []
+        for part in parts:
+            if part not in node:
+                part = _VARIABLE
+            out.append(part)
+            node = node[part]
+        templates[path] = "/" + "/".join(out)
+    return templates
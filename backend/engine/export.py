@@ -0,0 +1,96 @@
+"""Streaming export of project data.
+
+Rows are read through a server-side cursor in batches and encoded as they
+arrive, so memory stays flat however many URLs a project holds and the
+first bytes go out before the query finishes.
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+from sqlalchemy import select, exists, func
+
+from database import project_session
+from models import URL, Parameter
+from models.param_name import names_with_attack_type
+from engine.classifier import normalize_attack_type
+
+EXPORT_BATCH_ROWS = 1000
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "txt": ("text/plain", "txt"),
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv"),
+}
+
+
+async def stream_urls(project_id: str, attack_type: str | None = None,
+                      endpoints: bool = False) -> AsyncIterator[list[str]]:
+    """Yield batches of full URLs, optionally limited to one attack type.
+
+    With ``endpoints``, one URL per endpoint template.
+    """
+    query = select(func.min(URL.full_url) if endpoints else URL.full_url).where(URL.project_id == project_id)
+    if attack_type:
+        query = query.where(exists().where(
+            Parameter.url_id == URL.id,
+            Parameter.name_id.in_(names_with_attack_type(project_id, normalize_attack_type(attack_type))),
+        ))
+    # Explicit order, so exports are repeatable whatever plan the database picks
+    if endpoints:
+        query = query.group_by(URL.endpoint_id).order_by(func.min(URL.id))
+    else:
+        query = query.order_by(URL.id)
+    # The route's session is gone once streaming starts, so open our own
+    async with project_session(project_id) as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        async for batch in result.scalars().partitions():
+            yield batch
+
+
+async def encode_txt(batches: AsyncIterator[list[str]]) -> AsyncIterator[bytes]:
+    first = True
+    async for batch in batches:
+        chunk = "\n".join(batch)
+        yield (chunk if first else "\n" + chunk).encode()
+        first = False
+
+
+async def encode_json(batches: AsyncIterator[list[str]]) -> AsyncIterator[bytes]:
+    # Same layout as json.dumps(urls, indent=2), written incrementally
+    first = True
+    async for batch in batches:
+        chunk = ",\n  ".join(json.dumps(url) for url in batch)
+        yield (("[\n  " if first else ",\n  ") + chunk).encode()
+        first = False
+    yield b"[]" if first else b"\n]"
+
+
+async def encode_csv(batches: AsyncIterator[list[str]]) -> AsyncIterator[bytes]:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["url"])
+    async for batch in batches:
+        writer.writerows([url] for url in batch)
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+    if output.tell():
+        yield output.getvalue().encode()
+
+
+ENCODERS = {"txt": encode_txt, "json": encode_json, "csv": encode_csv}
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
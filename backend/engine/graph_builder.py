@@ -1,11 +1,95 @@
-from sqlalchemy import select
+from collections import defaultdict
+
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Project, Subdomain, URL, Parameter, NucleiFinding
+from models import Project, Subdomain, URL, Endpoint, ParamName, Parameter, NucleiFinding
 from schemas.graph import GraphData, GraphNode, GraphEdge
 from engine.classifier import get_attack_color, get_risk_score, get_risk_label, get_insight_text, RISK_SEVERITY
 
 
+# Subdomains whose URLs, parameters and findings are loaded per round of queries
+GRAPH_HOST_BATCH = 200
+# URLs (or endpoint templates) drawn per subdomain
+GRAPH_ITEMS_PER_HOST = 50
+
+
+def _first_per_host(model, subdomain_ids: list[int], *order_by):
+    """Subquery of the ids of the first ``GRAPH_ITEMS_PER_HOST`` rows per subdomain."""
+    rank = func.row_number().over(partition_by=model.subdomain_id, order_by=order_by).label("rank")
+    ranked = select(model.id, rank).where(model.subdomain_id.in_(subdomain_ids)).subquery()
+    return select(ranked.c.id).where(ranked.c.rank <= GRAPH_ITEMS_PER_HOST)
+
+
+async def _url_items(db: AsyncSession, subdomain_ids: list[int]) -> dict[int, list]:
+    """``(id, node type, label, data, params)`` per URL, grouped by subdomain id.
+
+    ``params`` are ``(node key, ParamName, value_type, sample_value)``.
+    """
+    first = _first_per_host(URL, subdomain_ids, URL.id)
+    urls = (await db.execute(select(URL).where(URL.id.in_(first)).order_by(URL.id))).scalars().all()
+    param_result = await db.execute(
+        select(Parameter, ParamName)
+        .join(ParamName, ParamName.id == Parameter.name_id)
+        .where(Parameter.url_id.in_(first))
+        .order_by(Parameter.id)
+    )
+    params: dict[int, list] = defaultdict(list)
+    for p, n in param_result.all():
+        params[p.url_id].append((p.uuid, n, p.value_type, p.sample_value))
+
+    items: dict[int, list] = defaultdict(list)
+    for url_obj in urls:
+        items[url_obj.subdomain_id].append((
+            url_obj.uuid, "url", url_obj.path or url_obj.full_url[:60],
+            {"full_url": url_obj.full_url, "source": url_obj.source}, params[url_obj.id],
+        ))
+    return items
+
+
+async def _endpoint_items(db: AsyncSession, subdomain_ids: list[int]) -> dict[int, list]:
+    """Like ``_url_items``, per endpoint template, with the parameters of all its URLs."""
+    first = _first_per_host(Endpoint, subdomain_ids, Endpoint.url_count.desc(), Endpoint.template)
+    endpoints = (await db.execute(
+        select(Endpoint).where(Endpoint.id.in_(first))
+        .order_by(Endpoint.subdomain_id, Endpoint.url_count.desc(), Endpoint.template)
+    )).scalars().all()
+    param_result = await db.execute(
+        select(URL.endpoint_id, ParamName, Parameter.value_type, func.min(Parameter.sample_value))
+        .join(Parameter, Parameter.name_id == ParamName.id)
+        .join(URL, URL.id == Parameter.url_id)
+        .where(URL.endpoint_id.in_(first))
+        .group_by(URL.endpoint_id, ParamName.id, Parameter.value_type)
+    )
+    # One node per name and endpoint, with the value shape that scores highest
+    by_name: dict[int, dict[int, tuple]] = defaultdict(dict)
+    uuids = {e.id: e.uuid for e in endpoints}
+    for endpoint_id, name, value_type, sample_value in param_result.all():
+        current = by_name[endpoint_id].get(name.id)
+        risk = get_risk_score(name.attack_types or [], value_type, name.name)
+        if current is None or risk > get_risk_score(name.attack_types or [], current[2], name.name):
+            by_name[endpoint_id][name.id] = (f"{uuids[endpoint_id]}-{name.id}", name, value_type, sample_value)
+
+    items: dict[int, list] = defaultdict(list)
+    for endpoint in endpoints:
+        items[endpoint.subdomain_id].append((
+            endpoint.uuid, "endpoint", endpoint.template,
+            {"template": endpoint.template, "sample_url": endpoint.sample_url, "url_count": endpoint.url_count},
+            list(by_name[endpoint.id].values()),
+        ))
+    return items
+
+
+async def _findings(db: AsyncSession, subdomain_ids: list[int]) -> dict[int, list]:
+    result = await db.execute(
+        select(NucleiFinding).where(NucleiFinding.subdomain_id.in_(subdomain_ids)).order_by(NucleiFinding.id)
+    )
+    findings: dict[int, list] = defaultdict(list)
+    for f in result.scalars():
+        findings[f.subdomain_id].append(f)
+    return findings
+
+
 async def build_graph(
     project_id: str,
     db: AsyncSession,
@@ -13,8 +97,13 @@ async def build_graph(
     attack_type: str | None = None,
     limit: int = 500,
     min_risk: int = 0,
+    endpoints: bool = False,
 ) -> GraphData:
-    """Build graph nodes and edges for D3.js visualization."""
+    """Build graph nodes and edges for D3.js visualization.
+
+    With ``endpoints``, each subdomain links to its endpoint templates instead
+    of individual URLs, with the parameters seen across each endpoint's URLs.
+    """
     nodes: list[GraphNode] = []
     edges: list[GraphEdge] = []
     node_ids: set[str] = set()
@@ -47,8 +136,16 @@ async def build_graph(
     attack_type_nodes: dict[str, str] = {}  # attack_name -> node_id
     risk_counts: dict[str, int] = {}  # attack_name -> param count
 
-    for sub in subdomains:
-        sub_node_id = f"sub-{sub.id}"
+    items_by_host: dict[int, list] = {}
+    findings_by_host: dict[int, list] = {}
+    for i, sub in enumerate(subdomains):
+        if depth >= 2 and i % GRAPH_HOST_BATCH == 0:
+            # Load the next batch of subdomains' URLs (or endpoints) and findings in a few queries
+            batch = [s.id for s in subdomains[i:i + GRAPH_HOST_BATCH]]
+            items_by_host = await (_endpoint_items if endpoints else _url_items)(db, batch)
+            findings_by_host = await _findings(db, batch)
+
+        sub_node_id = f"sub-{sub.uuid}"
         if sub_node_id in node_ids:
             continue
 
@@ -66,24 +163,13 @@ async def build_graph(
         if depth < 2:
             continue
 
-        # URLs for this subdomain
-        url_result = await db.execute(
-            select(URL).where(URL.subdomain_id == sub.id).limit(50)
-        )
-        urls = url_result.scalars().all()
-
-        for url_obj in urls:
-            # Get params for this URL
-            param_result = await db.execute(
-                select(Parameter).where(Parameter.url_id == url_obj.id)
-            )
-            params = param_result.scalars().all()
-
+        # URLs (or endpoint templates) for this subdomain
+        for item_id, item_type, label, item_data, params in items_by_host.get(sub.id, []):
             # Filter by attack type if specified
             if attack_type:
                 has_match = any(
-                    attack_type.upper() in [a.upper() for a in (p.attack_types or [])]
-                    for p in params
+                    attack_type.upper() in [a.upper() for a in (n.attack_types or [])]
+                    for _, n, _, _ in params
                 )
                 if not has_match:
                     continue
@@ -92,47 +178,47 @@ async def build_graph(
                 continue
 
             # Filter by min_risk
-            url_risk = max((get_risk_score(p.attack_types or []) for p in params), default=0)
+            url_risk = max((get_risk_score(n.attack_types or [], vt, n.name) for _, n, vt, _ in params), default=0)
             if url_risk < min_risk:
                 continue
 
-            url_node_id = f"url-{url_obj.id}"
+            url_node_id = f"{item_type}-{item_id}"
             if len(nodes) >= limit:
                 return GraphData(nodes=nodes, edges=edges, total_nodes=total_count, truncated=True, risk_summary=risk_counts)
 
             # Aggregate attack types from params
             url_attack_types = list(set(
-                at for p in params for at in (p.attack_types or [])
+                at for _, n, _, _ in params for at in (n.attack_types or [])
             ))
 
             # Color URL by risk level
             url_color = '#ff4444' if url_risk >= 8 else '#ff8800' if url_risk >= 5 else '#00ff88'
 
             nodes.append(GraphNode(
-                id=url_node_id, label=url_obj.path or url_obj.full_url[:60],
-                type="url", color=url_color, size=15 + url_risk,
+                id=url_node_id, label=label,
+                type=item_type, color=url_color, size=15 + url_risk,
                 data={
-                    "full_url": url_obj.full_url, "source": url_obj.source,
+                    **item_data,
                     "risk_score": url_risk, "attack_types": url_attack_types,
                     "param_count": len(params),
                 },
             ))
             node_ids.add(url_node_id)
-            edges.append(GraphEdge(source=sub_node_id, target=url_node_id, label="has_url"))
+            edges.append(GraphEdge(source=sub_node_id, target=url_node_id, label=f"has_{item_type}"))
 
             if depth < 3:
                 continue
 
             # Parameters
-            for param in params:
-                if attack_type and attack_type.upper() not in [a.upper() for a in (param.attack_types or [])]:
+            for param_key, name, value_type, sample_value in params:
+                if attack_type and attack_type.upper() not in [a.upper() for a in (name.attack_types or [])]:
                     continue
 
-                risk_score = get_risk_score(param.attack_types or [])
+                risk_score = get_risk_score(name.attack_types or [], value_type, name.name)
                 if risk_score < min_risk:
                     continue
 
-                insight = get_insight_text(param.name, param.attack_types or [])
+                insight = get_insight_text(name.name, name.attack_types or [])
 
                 # Color by risk
                 param_color = '#ffff00'
@@ -143,26 +229,27 @@ async def build_graph(
                 elif risk_score >= 4:
                     param_color = '#ff8800'
 
-                param_node_id = f"param-{param.id}"
+                param_node_id = f"param-{param_key}"
                 if len(nodes) >= limit:
                     return GraphData(nodes=nodes, edges=edges, total_nodes=total_count, truncated=True, risk_summary=risk_counts)
 
                 nodes.append(GraphNode(
-                    id=param_node_id, label=param.name, type="parameter",
+                    id=param_node_id, label=name.name, type="parameter",
                     color=param_color, size=10 + (risk_score * 2),
                     data={
-                        "value": param.sample_value,
-                        "attack_types": param.attack_types,
+                        "value": sample_value,
+                        "value_type": value_type,
+                        "attack_types": name.attack_types,
                         "risk_score": risk_score,
                         "insight": insight,
-                        "risk_labels": [get_risk_label(at) for at in (param.attack_types or [])],
+                        "risk_labels": [get_risk_label(at) for at in (name.attack_types or [])],
                     },
                 ))
                 node_ids.add(param_node_id)
                 edges.append(GraphEdge(source=url_node_id, target=param_node_id, label="has_param"))
 
                 # Attack type nodes
-                for at in (param.attack_types or []):
+                for at in (name.attack_types or []):
                     at_node_id = f"attack-{at}"
                     risk_counts[at] = risk_counts.get(at, 0) + 1
                     if at_node_id not in node_ids:
@@ -175,12 +262,8 @@ async def build_graph(
                     edges.append(GraphEdge(source=param_node_id, target=at_node_id, label="vuln_to"))
 
         # Nuclei findings for this subdomain
-        finding_result = await db.execute(
-            select(NucleiFinding).where(NucleiFinding.subdomain_id == sub.id)
-        )
-        findings = finding_result.scalars().all()
-        for f in findings:
-            f_node_id = f"finding-{f.id}"
+        for f in findings_by_host.get(sub.id, []):
+            f_node_id = f"finding-{f.uuid}"
             if len(nodes) >= limit:
                 return GraphData(nodes=nodes, edges=edges, total_nodes=total_count, truncated=True, risk_summary=risk_counts)
 
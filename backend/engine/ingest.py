@@ -0,0 +1,287 @@
+"""Ingest batches: provenance for every upload and scan stage.
+
+Each batch records the tool, the source, a content hash, the parser counts
+and timings. Every Subdomain, URL, Parameter and NucleiFinding row it
+creates carries its id, so an upload can be rolled back with one DELETE
+per table.
+
+The hashes also make re-uploads cheap: a file identical to one already
+ingested with the same tool is not parsed at all, and the input is hashed in
+~1 MB runs of lines so a file that only appends to an earlier upload skips
+the runs seen before. Both checks go through the chunk index, which is
+dropped whenever project data is deleted, so a re-upload after a delete
+or rollback is parsed again.
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, update, func, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import run_write, project_session
+from models import IngestBatch, IngestChunk, Subdomain, URL, Parameter, NucleiFinding
+from parsers.base import parse_in_batches, merge_results
+from parsers.bulk import bulk_insert, chunked
+from parsers.stream import InputInterrupted, LineReader, UploadTooLarge
+
+# Children first, so rollback never leans on FK cascades
+BATCH_TABLES = [Parameter, NucleiFinding, URL, Subdomain]
+
+# Size (in characters) of the line runs hashed for chunk-level dedupe
+DEDUPE_CHUNK_SIZE = 1024 * 1024
+
+# Piped ingest commits whatever has arrived at least this often
+STREAM_FLUSH_SECONDS = 1.0
+
+
+def content_hash(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+async def _create_batch(db: AsyncSession, values: dict) -> str:
+    batch = IngestBatch(**values)
+    db.add(batch)
+    await db.flush()
+    return batch.id
+
+
+async def _count_batch_rows(db: AsyncSession, batch_id: str) -> dict:
+    counts = {}
+    for model in BATCH_TABLES:
+        counts[model.__tablename__] = (await db.execute(
+            select(func.count()).select_from(model).where(model.batch_id == batch_id)
+        )).scalar() or 0
+    return counts
+
+
+async def _finish_batch(db: AsyncSession, batch_id: str, values: dict):
+    values["row_counts"] = await _count_batch_rows(db, batch_id)
+    values["completed_at"] = datetime.now(timezone.utc)
+    await db.execute(update(IngestBatch).where(IngestBatch.id == batch_id).values(**values))
+
+
+async def _find_duplicate(project_id: str, tool: str, digest: str) -> IngestBatch | None:
+    async with project_session(project_id) as db:
+        return (await db.execute(
+            select(IngestBatch).where(
+                IngestBatch.project_id == project_id,
+                IngestBatch.content_hash == digest,
+                IngestBatch.tool == tool,
+                IngestBatch.status == "completed",
+                # Only while its data is known to be intact (see forget_ingested)
+                exists().where(IngestChunk.batch_id == IngestBatch.id),
+            ).limit(1)
+        )).scalar_one_or_none()
+
+
+async def _seen_chunks(project_id: str, tool: str, hashes: list[str]) -> set[str]:
+    seen = set()
+    async with project_session(project_id) as db:
+        for chunk in chunked(hashes):
+            result = await db.execute(
+                select(IngestChunk.chunk_hash).where(
+                    IngestChunk.project_id == project_id,
+                    IngestChunk.tool == tool,
+                    IngestChunk.chunk_hash.in_(chunk),
+                )
+            )
+            seen.update(result.scalars())
+    return seen
+
+
+async def forget_ingested(db: AsyncSession, project_id: str):
+    """Drop the project's dedupe index. Call from any write that deletes data rows."""
+    await db.execute(delete(IngestChunk).where(IngestChunk.project_id == project_id))
+
+
+async def _record_chunk(db: AsyncSession, values: dict):
+    await bulk_insert(db, IngestChunk, [values])
+
+
+async def ingest_lines(parser, project_id: str, reader: LineReader, tool: str, source: str | None = None,
+                       digest: str | None = None, flush_interval: float | None = None,
+                       progress: dict | None = None) -> dict:
+    """Parse lines from ``reader`` as one recorded batch, as they arrive.
+
+    Returns the parser result plus ``batch_id``. When ``digest`` (the hash of
+    the whole input) is known up front and matches a batch already ingested
+    with the same tool, returns at once with ``skipped: True``. Otherwise the
+    stream is cut into ~1 MB runs of lines; runs seen before are skipped and
+    the rest are parsed and committed run by run. With ``flush_interval`` a
+    run is also cut once that many seconds have passed, so a slow pipe
+    shows up in the project while it is still running.
+
+    ``progress``, if given, is updated in place after every run with the
+    batch id, lines and bytes read so far and the running counts. If parsing
+    fails or the calling task is cancelled, the rows loaded so far are
+    rolled back, so retrying the same input loads all of it; a streamed
+    body that stops early keeps them.
+    """
+    if digest:
+        earlier = await _find_duplicate(project_id, tool, digest)
+        if earlier:
+            return {
+                "parsed_count": earlier.parsed_count, "new_count": 0, "duplicate_count": earlier.parsed_count,
+                "batch_id": earlier.id, "skipped": True,
+            }
+
+    batch_id = await run_write(_create_batch, {
+        "project_id": project_id,
+        "tool": tool,
+        "source": source[:512] if source else None,
+        "content_hash": digest,
+    }, project_id=project_id)
+
+    result = {"parsed_count": 0, "new_count": 0, "duplicate_count": 0, "skipped_chunks": 0}
+    parsed_any = False
+    lines_read = 0
+    if progress is not None:
+        progress["batch_id"] = batch_id
+
+    async def process(lines: list[str]):
+        nonlocal parsed_any, lines_read
+        lines_read += len(lines)
+        chunk_hash = content_hash("\n".join(lines))
+        if await _seen_chunks(project_id, tool, [chunk_hash]):
+            merge_results(result, {"parsed_count": len(lines), "duplicate_count": len(lines), "skipped_chunks": 1})
+        else:
+            parsed_any = True
+            merge_results(result, await parse_in_batches(parser, project_id, "\n".join(lines), batch_id=batch_id))
+            await run_write(_record_chunk, {
+                "project_id": project_id, "batch_id": batch_id, "tool": tool,
+                "chunk_hash": chunk_hash, "line_count": len(lines),
+            }, project_id=project_id)
+        if progress is not None:
+            progress.update(
+                lines_processed=lines_read, bytes_read=reader.bytes_read, position=reader.position,
+                **{k: v for k, v in result.items() if k != "breakdown"},
+            )
+            if "breakdown" in result:
+                progress["breakdown"] = dict(result["breakdown"])
+
+    try:
+        # Run boundaries depend only on the lines before them, so an appended
+        # file reproduces the earlier file's runs (all but its last, partial one)
+        run: list[str] = []
+        length = 0
+        started = False
+        flushed = time.monotonic()
+        async for lines in reader:
+            for line in lines:
+                if not started and not line.strip():
+                    continue  # match parse_in_batches' leading strip()
+                started = True
+                run.append(line)
+                length += len(line) + 1
+                if length >= DEDUPE_CHUNK_SIZE:
+                    await process(run)
+                    run, length = [], 0
+                    flushed = time.monotonic()
+            if run and flush_interval is not None and time.monotonic() - flushed >= flush_interval:
+                await process(run)
+                run, length = [], 0
+                flushed = time.monotonic()
+        while run and not run[-1].strip():
+            run.pop()
+        if run:
+            await process(run)
+        if not parsed_any:
+            # Let the parser report its empty result shape
+            merge_results(result, await parse_in_batches(parser, project_id, "", batch_id=batch_id))
+    except asyncio.CancelledError:
+        # Writes already queued run first (the queue is FIFO), so the rollback sees them
+        await rollback_batch(project_id, batch_id)
+        await run_write(_finish_batch, batch_id, {
+            "status": "cancelled", "size_bytes": reader.bytes_read,
+        }, project_id=project_id)
+        raise
+    except InputInterrupted as e:
+        # A dropped pipe keeps what it delivered; those runs are intact and indexed
+        await run_write(_finish_batch, batch_id, {
+            "status": "failed", "error": str(e), "size_bytes": reader.bytes_read,
+        }, project_id=project_id)
+        raise
+    except Exception as e:
+        # Don't leave half an upload behind: runs committed so far are in the
+        # chunk index, so a retry would skip them instead of loading them again
+        await rollback_batch(project_id, batch_id)
+        await run_write(_finish_batch, batch_id, {
+            "status": "failed",
+            "error": "Input too large" if isinstance(e, UploadTooLarge) else str(e),
+            "size_bytes": reader.bytes_read,
+        }, project_id=project_id)
+        raise
+
+    await run_write(_finish_batch, batch_id, {
+        "status": "completed",
+        "content_hash": digest or reader.sha256,
+        "size_bytes": reader.bytes_read,
+        "parsed_count": result.get("parsed_count", 0),
+        "new_count": result.get("new_count", 0),
+        "duplicate_count": result.get("duplicate_count", 0),
+    }, project_id=project_id)
+    return {**result, "batch_id": batch_id}
+
+
+async def ingest(parser, project_id: str, content: str, tool: str, source: str | None = None) -> dict:
+    """Parse in-memory ``content`` as one recorded batch (see ``ingest_lines``)."""
+    return await ingest_lines(
+        parser, project_id, LineReader.from_text(content), tool, source, digest=content_hash(content),
+    )
+
+
+async def _rollback(db: AsyncSession, project_id: str, batch_id: str) -> dict | None:
+    batch = (await db.execute(
+        select(IngestBatch).where(IngestBatch.id == batch_id, IngestBatch.project_id == project_id)
+    )).scalar_one_or_none()
+    if not batch:
+        return None
+    deleted = {}
+    for model in BATCH_TABLES:
+        result = await db.execute(delete(model).where(model.batch_id == batch_id))
+        deleted[model.__tablename__] = result.rowcount
+    # Later batches may have skipped rows this one created
+    await forget_ingested(db, project_id)
+    batch.status = "rolled_back"
+    batch.completed_at = batch.completed_at or datetime.now(timezone.utc)
+    return deleted
+
+
+async def rollback_batch(project_id: str, batch_id: str) -> dict | None:
+    """Delete every row a batch created. Returns rows deleted per table, or None if unknown.
+
+    Rows the batch only updated (e.g. httpx filling in a subdomain that
+    subfinder created) keep the new values; rows that hang off deleted rows
+    go with them through the foreign keys.
+    """
+    return await run_write(_rollback, project_id, batch_id, project_id=project_id)
+
+
+def batch_summary(batch: IngestBatch) -> dict:
+    duration = None
+    if batch.completed_at and batch.started_at:
+        duration = (batch.completed_at - batch.started_at).total_seconds()
+    rows = sum((batch.row_counts or {}).values())
+    return {
+        "id": batch.id,
+        "project_id": batch.project_id,
+        "tool": batch.tool,
+        "source": batch.source,
+        "content_hash": batch.content_hash,
+        "size_bytes": batch.size_bytes,
+        "status": batch.status,
+        "parsed_count": batch.parsed_count,
+        "new_count": batch.new_count,
+        "duplicate_count": batch.duplicate_count,
+        "row_counts": batch.row_counts,
+        "error": batch.error,
+        "started_at": batch.started_at,
+        "completed_at": batch.completed_at,
+        "duration_seconds": duration,
+        "rows_per_second": round(rows / duration, 1) if duration else None,
+    }
@@ -0,0 +1,148 @@
+"""Background ingest of files already on disk.
+
+The request that queues a job returns at once; the file is parsed with the
+streaming reader in a background task. Progress lives in the in-memory
+``ingest_jobs`` registry, like scans and purges, and is streamed over SSE.
+The durable record is the IngestBatch the job creates.
+"""
+
+import asyncio
+import shutil
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from engine.ingest import ingest_lines
+from parsers.stream import LineReader, UploadTooLarge, hash_file
+
+# In-memory registry of ingest jobs, keyed by job id
+ingest_jobs: dict[str, dict] = {}
+_tasks: dict[str, asyncio.Task] = {}
+
+ACTIVE_STATUSES = ("queued", "preparing", "running")
+
+
+def _log(job: dict, line: str):
+    job["log_lines"].append(line)
+
+
+async def _run_job(job_id: str, parser, path: Path, prepare: Callable[[], str] | None,
+                   cleanup: Path | None, limit: int | None):
+    job = ingest_jobs[job_id]
+    try:
+        digest = None
+        if prepare:
+            job["status"] = "preparing"
+            _log(job, "[*] Preparing file...")
+            digest = await asyncio.to_thread(prepare)
+        job["status"] = "running"
+        with open(path, "rb") as f:
+            if digest is None:
+                digest = await asyncio.to_thread(hash_file, f)
+            job["size_bytes"] = path.stat().st_size
+            _log(job, f"[*] Parsing {job['source'] or path.name} ({job['size_bytes']} bytes) as {job['tool']}")
+            reader = LineReader.from_file(f, limit=limit)
+            result = await ingest_lines(
+                parser, job["project_id"], reader, job["tool"], job["source"], digest, progress=job["progress"],
+            )
+        job["result"] = result
+        job["batch_id"] = result["batch_id"]
+        job["status"] = "completed"
+        if result.get("skipped"):
+            _log(job, "[+] Identical file was already ingested; nothing to do")
+        else:
+            _log(job, f"[+] Done: {result['parsed_count']} parsed, {result['new_count']} new")
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        _log(job, "[!] Cancelled; rows loaded so far were rolled back")
+    except UploadTooLarge:
+        job["status"] = "failed"
+        job["error"] = f"Input exceeds {limit} bytes once decompressed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        if job["error"]:
+            _log(job, f"[!] {job['error']}")
+        if cleanup:
+            await asyncio.to_thread(shutil.rmtree, cleanup, True)
+        job["batch_id"] = job["batch_id"] or job["progress"].get("batch_id")
+        job["completed_at"] = datetime.now(timezone.utc).isoformat()
+        _tasks.pop(job_id, None)
+
+
+def start_ingest_job(parser, project_id: str, path: Path, tool: str, source: str | None = None,
+                     prepare: Callable[[], str] | None = None, cleanup: Path | None = None,
+                     limit: int | None = None) -> dict:
+    """Parse the file at ``path`` in the background and return the job record.
+
+    ``prepare`` runs in a worker thread first (e.g. to assemble the file) and
+    returns its sha256. ``cleanup`` is removed once the job ends, whatever
+    the outcome.
+    """
+    job_id = str(uuid.uuid4())
+    job = {
+        "id": job_id,
+        "project_id": project_id,
+        "tool": tool,
+        "source": source,
+        "status": "queued",
+        "size_bytes": None,
+        "batch_id": None,
+        "progress": {},
+        "log_lines": [],
+        "result": None,
+        "error": None,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "completed_at": None,
+    }
+    ingest_jobs[job_id] = job
+    _tasks[job_id] = asyncio.create_task(_run_job(job_id, parser, path, prepare, cleanup, limit))
+    return job
+
+
+def cancel_ingest_job(job_id: str) -> bool:
+    """Stop a queued or running job; its batch is rolled back. False if it is not active."""
+    task = _tasks.get(job_id)
+    if not task or ingest_jobs[job_id]["status"] not in ACTIVE_STATUSES:
+        return False
+    task.cancel()
+    return True
+
+
+async def stop_ingest_jobs():
+    """Cancel every active job and wait for its rollback; for shutdown."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def job_stats(job: dict) -> dict:
+    """Progress so far, with rates and percent done (of the raw file)."""
+    progress = job["progress"]
+    end = datetime.fromisoformat(job["completed_at"]) if job["completed_at"] else datetime.now(timezone.utc)
+    elapsed = (end - datetime.fromisoformat(job["started_at"])).total_seconds()
+    lines = progress.get("lines_processed", 0)
+    new = progress.get("new_count", 0)
+    percent = None
+    if job["size_bytes"]:
+        if job["status"] == "completed":
+            percent = 100.0
+        elif progress.get("position") is not None:
+            percent = round(min(progress["position"] / job["size_bytes"], 1.0) * 100, 1)
+    return {
+        "status": job["status"],
+        "lines_processed": lines,
+        "bytes_read": progress.get("bytes_read", 0),
+        "size_bytes": job["size_bytes"],
+        "percent": percent,
+        "parsed_count": progress.get("parsed_count", 0),
+        "new_count": new,
+        "duplicate_count": progress.get("duplicate_count", 0),
+        "breakdown": progress.get("breakdown"),
+        "elapsed_seconds": round(elapsed, 1),
+        "lines_per_second": round(lines / elapsed, 1) if elapsed else None,
+        "rows_per_second": round(new / elapsed, 1) if elapsed else None,
+    }
@@ -3,8 +3,9 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Project, Parameter, URL
-from engine.classifier import get_risk_score, RISK_SEVERITY
+from models import Project, ParamName, Parameter, URL, Endpoint
+from models.param_name import has_attack_type
+from engine.classifier import get_risk_score, normalize_attack_type, RISK_SEVERITY
 from engine.attack_knowledge import ATTACK_KNOWLEDGE
 from schemas.mindmap import (
     MindmapData,
@@ -20,8 +21,13 @@ async def build_mindmap(
     project_id: str,
     db: AsyncSession,
     attack_type: str | None = None,
+    endpoints: bool = False,
 ) -> MindmapData:
-    """Build hierarchical mindmap: attack_type -> params -> URLs."""
+    """Build hierarchical mindmap: attack_type -> params -> URLs.
+
+    With ``endpoints``, each parameter lists the endpoints it was seen on
+    (sample URL and template) instead of every URL.
+    """
 
     # Fetch project
     project_result = await db.execute(select(Project).where(Project.id == project_id))
@@ -39,10 +45,18 @@ async def build_mindmap(
             attack_types=[],
         )
 
-    # Fetch all parameters with their URLs
-    param_query = select(Parameter, URL).join(URL, Parameter.url_id == URL.id).where(
-        Parameter.project_id == project_id
+    # Fetch classified parameters with their names and URLs
+    location = (Endpoint.sample_url, Endpoint.template) if endpoints else (URL.full_url, URL.path)
+    param_query = (
+        select(ParamName.name, ParamName.attack_types, Parameter.sample_value, Parameter.value_type, *location)
+        .join(ParamName, ParamName.id == Parameter.name_id)
+        .join(URL, Parameter.url_id == URL.id)
+        .where(Parameter.project_id == project_id, ParamName.risk_score > 0)
     )
+    if endpoints:
+        param_query = param_query.join(Endpoint, Endpoint.id == URL.endpoint_id)
+    if attack_type:
+        param_query = param_query.where(has_attack_type(normalize_attack_type(attack_type)))
     result = await db.execute(param_query)
     rows = result.all()
 
@@ -50,8 +64,7 @@ async def build_mindmap(
     # Structure: { attack_type: { param_name: { "sample_value": ..., "attack_types": [...], "urls": [...] } } }
     grouped: dict[str, dict[str, dict]] = {}
 
-    for param, url in rows:
-        param_attacks = param.attack_types or []
+    for name, param_attacks, sample_value, value_type, full_url, path in rows:
         if not param_attacks:
             continue
 
@@ -62,19 +75,20 @@ async def build_mindmap(
             if at not in grouped:
                 grouped[at] = {}
 
-            if param.name not in grouped[at]:
-                grouped[at][param.name] = {
-                    "sample_value": param.sample_value,
+            if name not in grouped[at]:
+                grouped[at][name] = {
+                    "sample_value": sample_value,
+                    "value_type": value_type,
                     "attack_types": list(set(param_attacks)),
                     "urls": [],
                     "url_set": set(),
                 }
 
             # Deduplicate URLs within each attack type + param
-            if url.full_url not in grouped[at][param.name]["url_set"]:
-                grouped[at][param.name]["url_set"].add(url.full_url)
-                grouped[at][param.name]["urls"].append(
-                    MindmapUrl(full_url=url.full_url, path=url.path)
+            if full_url not in grouped[at][name]["url_set"]:
+                grouped[at][name]["url_set"].add(full_url)
+                grouped[at][name]["urls"].append(
+                    MindmapUrl(full_url=full_url, path=path)
                 )
 
     # Build MindmapAttackType list
@@ -91,12 +105,13 @@ async def build_mindmap(
         # Build parameters
         param_list: list[MindmapParameter] = []
         for p_name, p_data in params_dict.items():
-            risk = get_risk_score(p_data["attack_types"])
+            risk = get_risk_score(p_data["attack_types"], p_data["value_type"], p_name)
             param_list.append(
                 MindmapParameter(
                     name=p_name,
                     risk_score=risk,
                     sample_value=p_data["sample_value"],
+                    value_type=p_data["value_type"],
                     urls=p_data["urls"],
                     attack_types=p_data["attack_types"],
                 )
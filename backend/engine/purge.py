@@ -0,0 +1,124 @@
+"""Chunked, set-based deletion of project data.
+
+Each chunk is its own short write transaction, so a multi-million row purge
+never holds the writer (or the event loop) for more than a moment.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base, CATALOG_ONLY_TABLES, PROJECT_SETTINGS_TABLES, run_write, project_session
+from engine import scope
+
+PURGE_CHUNK_SIZE = 5000
+# Purges up to this many rows finish before the request returns
+PURGE_INLINE_ROWS = 50_000
+
+# In-memory registry of purges, keyed by project id
+purge_jobs: dict[str, dict] = {}
+_tasks: set[asyncio.Task] = set()
+
+
+def _project_tables(keep_settings: bool = False):
+    """Tables holding per-project data rows, children first.
+
+    Catalog tables (scan jobs) are small and go with the project row via
+    ON DELETE CASCADE. Settings such as scope rules are left alone when
+    only the data is cleared.
+    """
+    return [
+        t for t in reversed(Base.metadata.sorted_tables)
+        if "project_id" in t.c and t.name not in CATALOG_ONLY_TABLES
+        and not (keep_settings and t.name in PROJECT_SETTINGS_TABLES)
+    ]
+
+
+async def _count_rows(project_id: str, tables) -> dict[str, int]:
+    counts = {}
+    async with project_session(project_id) as db:
+        for table in tables:
+            counts[table.name] = (await db.execute(
+                select(func.count()).select_from(table).where(table.c.project_id == project_id)
+            )).scalar() or 0
+    return counts
+
+
+async def _delete_chunk(db: AsyncSession, table, project_id: str, limit: int) -> int:
+    chunk = select(table.c.id).where(table.c.project_id == project_id).limit(limit)
+    result = await db.execute(delete(table).where(table.c.id.in_(chunk)))
+    return result.rowcount
+
+
+async def _delete_project_row(db: AsyncSession, project_id: str):
+    projects = Base.metadata.tables["projects"]
+    await db.execute(delete(projects).where(projects.c.id == project_id))
+
+
+async def _run_purge(project_id: str, keep_project: bool):
+    job = purge_jobs[project_id]
+    try:
+        for table in _project_tables(keep_settings=keep_project):
+            while True:
+                deleted = await run_write(_delete_chunk, table, project_id, PURGE_CHUNK_SIZE, project_id=project_id)
+                job["tables"][table.name] = job["tables"].get(table.name, 0) + deleted
+                job["deleted_rows"] += deleted
+                if deleted < PURGE_CHUNK_SIZE:
+                    break
+                await asyncio.sleep(0)
+        if not keep_project:
+            await run_write(_delete_project_row, project_id)
+            scope.invalidate(project_id)
+        job["status"] = "completed"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        raise
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["completed_at"] = datetime.now(timezone.utc).isoformat()
+
+
+async def stop_purges():
+    """Cancel running purges between chunks and wait for them; for shutdown.
+
+    Chunks already deleted stay deleted; the purge can be started again.
+    """
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def start_purge(project_id: str, keep_project: bool = False) -> dict:
+    """Delete a project's data (and the project, unless ``keep_project``).
+
+    Small purges complete before returning; large ones keep running in the
+    background and report progress through ``purge_jobs``.
+    """
+    existing = purge_jobs.get(project_id)
+    if existing and existing["status"] == "running":
+        return existing
+
+    counts = await _count_rows(project_id, _project_tables(keep_settings=keep_project))
+    job = {
+        "project_id": project_id,
+        "status": "running",
+        "keep_project": keep_project,
+        "total_rows": sum(counts.values()),
+        "deleted_rows": 0,
+        "tables": {},
+        "error": None,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "completed_at": None,
+    }
+    purge_jobs[project_id] = job
+    task = asyncio.create_task(_run_purge(project_id, keep_project))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    if job["total_rows"] <= PURGE_INLINE_ROWS:
+        await task
+    return job
@@ -0,0 +1,115 @@
+"""Bring stored parameter classifications up to the current rule set.
+
+Classifications live in the per-project ``param_names`` dictionary, and each
+entry records the ``CLASSIFIER_VERSION`` it was classified with.
+Reclassifying a project classifies each stale name once and rewrites the
+entries with set-based UPDATEs in short chunked write transactions, as
+purges do. Parameter rows reference the entries and need no changes.
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import run_write, project_session
+from engine.classifier import CLASSIFIER_VERSION, classify_parameters, get_risk_score
+from models import ParamName
+from parsers.bulk import chunked
+
+# In-memory registry of reclassifications, keyed by project id
+reclassify_jobs: dict[str, dict] = {}
+_tasks: set[asyncio.Task] = set()
+
+
+async def stale_names(project_id: str) -> dict[str, int]:
+    """{name: param_names id} for entries classified under another rule set."""
+    async with project_session(project_id) as db:
+        result = await db.execute(
+            select(ParamName.name, ParamName.id).where(
+                ParamName.project_id == project_id,
+                or_(ParamName.classifier_version.is_(None), ParamName.classifier_version != CLASSIFIER_VERSION),
+            )
+        )
+        return dict(result.all())
+
+
+async def _update_chunk(db: AsyncSession, ids: list[int], attack_types: list[str]) -> int:
+    result = await db.execute(
+        update(ParamName)
+        .where(ParamName.id.in_(ids))
+        .values(
+            attack_types=attack_types,
+            risk_score=get_risk_score(attack_types),
+            classifier_version=CLASSIFIER_VERSION,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def _run_reclassify(project_id: str):
+    job = reclassify_jobs[project_id]
+    try:
+        names = await stale_names(project_id)
+        job["total_names"] = len(names)
+
+        # Names that classify alike are rewritten together
+        groups: dict[tuple, list[int]] = defaultdict(list)
+        for name, attack_types in classify_parameters(names).items():
+            groups[tuple(attack_types)].append(names[name])
+
+        for attack_types, ids in groups.items():
+            for batch in chunked(sorted(ids)):
+                job["updated_names"] += await run_write(
+                    _update_chunk, batch, list(attack_types), project_id=project_id,
+                )
+                job["done_names"] += len(batch)
+                await asyncio.sleep(0)
+        job["status"] = "completed"
+    except asyncio.CancelledError:
+        job["status"] = "cancelled"
+        raise
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["completed_at"] = datetime.now(timezone.utc).isoformat()
+
+
+def start_reclassify(project_id: str) -> dict:
+    """Reclassify the project's parameter names in the background; returns the job record."""
+    existing = reclassify_jobs.get(project_id)
+    if existing and existing["status"] == "running":
+        return existing
+
+    job = {
+        "project_id": project_id,
+        "status": "running",
+        "classifier_version": CLASSIFIER_VERSION,
+        "total_names": None,
+        "done_names": 0,
+        "updated_names": 0,
+        "error": None,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "completed_at": None,
+    }
+    reclassify_jobs[project_id] = job
+    task = asyncio.create_task(_run_reclassify(project_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+async def stop_reclassify_jobs():
+    """Cancel running reclassifications and wait for them; for shutdown.
+
+    Names already rewritten keep their new classification; the rest stay
+    stale and are picked up by the next run.
+    """
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -5,13 +5,14 @@ from datetime import datetime, timezone
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import async_session
+from database import project_session, run_write
 from models import ScanJob
 from engine.tool_manager import TOOLS, check_tool, _get_go_env
 from parsers.subfinder import parse_subfinder
 from parsers.httpx_parser import parse_httpx
 from parsers.waybackurls import parse_waybackurls
 from parsers.nuclei import parse_nuclei
+from engine.ingest import ingest
 
 # In-memory registry of active scans for SSE streaming
 active_scans: dict[str, dict] = {}
@@ -24,14 +25,16 @@ async def _append_log(scan_id: str, line: str):
         active_scans[scan_id]["log_lines"].append(line)
 
 
+async def _write_job(db: AsyncSession, scan_id: str, values: dict):
+    result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
+    job = result.scalar_one_or_none()
+    if job:
+        for k, v in values.items():
+            setattr(job, k, v)
+
+
 async def _update_job(scan_id: str, **kwargs):
-    async with async_session() as db:
-        result = await db.execute(select(ScanJob).where(ScanJob.id == scan_id))
-        job = result.scalar_one_or_none()
-        if job:
-            for k, v in kwargs.items():
-                setattr(job, k, v)
-            await db.commit()
+    await run_write(_write_job, scan_id, kwargs)
 
 
 async def _check_pause(scan_id: str):
@@ -161,17 +164,17 @@ async def _run_and_parse(scan_id: str, project_id: str, tool_name: str, target:
         await _append_log(scan_id, f"[!] {tool_name} returned no output")
         return {"parsed_count": 0, "new_count": 0, "duplicate_count": 0}
 
-    async with async_session() as db:
-        if tool_name == "subfinder":
-            result = await parse_subfinder(project_id, output, db)
-        elif tool_name == "httpx":
-            result = await parse_httpx(project_id, output, db)
-        elif tool_name in ("waybackurls", "gau", "katana"):
-            result = await parse_waybackurls(project_id, output, db)
-        elif tool_name == "nuclei":
-            result = await parse_nuclei(project_id, output, db)
-        else:
-            result = {"parsed_count": 0, "new_count": 0, "duplicate_count": 0}
+    source = f"scan:{scan_id}"
+    if tool_name == "subfinder":
+        result = await ingest(parse_subfinder, project_id, output, tool=tool_name, source=source)
+    elif tool_name == "httpx":
+        result = await ingest(parse_httpx, project_id, output, tool=tool_name, source=source)
+    elif tool_name in ("waybackurls", "gau", "katana"):
+        result = await ingest(parse_waybackurls, project_id, output, tool=tool_name, source=source)
+    elif tool_name == "nuclei":
+        result = await ingest(parse_nuclei, project_id, output, tool=tool_name, source=source)
+    else:
+        result = {"parsed_count": 0, "new_count": 0, "duplicate_count": 0}
 
     await _append_log(scan_id, f"[+] Parsed: {result.get('new_count', 0)} new, {result.get('duplicate_count', 0)} duplicates")
     return result
@@ -232,7 +235,7 @@ async def run_scan(scan_id: str, project_id: str, scan_type: str, target: str):
                 active_scans[scan_id]["stats"]["subdomains_found"] = sub_result.get("new_count", 0)
 
             # Collect subdomains for httpx input
-            async with async_session() as db:
+            async with project_session(project_id) as db:
                 from models import Subdomain
                 subs = (await db.execute(
                     select(Subdomain.subdomain).where(Subdomain.project_id == project_id)
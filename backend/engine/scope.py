@@ -0,0 +1,219 @@
+"""Per-project ingest scope.
+
+A project's scope rules are compiled into one matcher:
+
+- domains (``example.com`` exactly, ``*.example.com`` for any subdomain) go
+  into a trie keyed by reversed labels, so a host is checked in one walk
+  however many rules there are;
+- regexes are joined into one alternation per action, one named group per
+  rule, and searched in the record's URL (or its host when it has none).
+  Rules with capture groups are compiled on their own instead, since their
+  group numbers (and so backreferences) would shift inside the alternation;
+- CIDRs become sorted, disjoint address intervals found by bisection, and
+  match hosts that are IP addresses and the IPs httpx resolved.
+
+A record is kept when it matches no exclude rule and, if the project has
+include rules, at least one of them. Parsers drop out-of-scope records with
+``apply_scope`` before any other database work, and each rule counts the
+records it decided.
+"""
+
+import ipaddress
+import re
+from bisect import bisect_right
+from collections import Counter
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ScopeRule
+
+RULE_ACTIONS = ("include", "exclude")
+RULE_KINDS = ("domain", "regex", "cidr")
+
+# Trie keys that cannot clash with a label (wildcard leaks produce "*" labels)
+_EXACT, _WILDCARD = object(), object()
+
+
+class ScopeError(ValueError):
+    """Raised for a scope rule that cannot be compiled."""
+
+
+def validate_rule(kind: str, pattern: str) -> str:
+    """Return the rule's normalized pattern, or raise ``ScopeError``."""
+    pattern = pattern.strip()
+    if kind == "domain":
+        domain = pattern.lower().rstrip(".")
+        labels = domain.removeprefix("*.").split(".")
+        if not domain or any(not label or "*" in label for label in labels):
+            raise ScopeError("Domains look like example.com or *.example.com")
+        return domain
+    if kind == "regex":
+        try:
+            # As it is nested in the combined pattern, so global flags are caught here
+            re.compile(f"(?:{pattern})")
+        except re.error as e:
+            raise ScopeError(f"Invalid regex: {e}")
+        return pattern
+    if kind == "cidr":
+        try:
+            return str(ipaddress.ip_network(pattern, strict=False))
+        except ValueError as e:
+            raise ScopeError(f"Invalid CIDR: {e}")
+    raise ScopeError(f"Unknown rule kind: {kind}. Use one of: {', '.join(RULE_KINDS)}")
+
+
+def _parse_ip(value: str | None):
+    # Most hosts are names; skip the costly failed parse for them
+    if not value or not (value[0].isdigit() or ":" in value):
+        return None
+    try:
+        return ipaddress.ip_address(value.strip("[]"))
+    except ValueError:
+        return None
+
+
+class _RuleSet:
+    """The compiled rules of one action."""
+
+    def __init__(self, rules: list[tuple[int, str, str]]):
+        self.trie: dict = {}
+        patterns = []
+        self.grouped: list[tuple[int, re.Pattern]] = []
+        networks = []
+        for rule_id, kind, pattern in rules:
+            if kind == "domain":
+                wildcard = pattern.startswith("*.")
+                node = self.trie
+                for label in reversed(pattern.removeprefix("*.").split(".")):
+                    node = node.setdefault(label, {})
+                node.setdefault(_WILDCARD if wildcard else _EXACT, rule_id)
+            elif kind == "regex":
+                compiled = re.compile(pattern)
+                if compiled.groups:
+                    self.grouped.append((rule_id, compiled))
+                else:
+                    patterns.append(f"(?P<r{rule_id}>{pattern})")
+            elif kind == "cidr":
+                networks.append((ipaddress.ip_network(pattern), rule_id))
+        self.regex = re.compile("|".join(patterns)) if patterns else None
+        self.intervals = {version: self._intervals(networks, version) for version in (4, 6)}
+        self.has_cidrs = bool(networks)
+
+    @staticmethod
+    def _intervals(networks, version: int) -> tuple[list[int], list[int | None]]:
+        # Cut the address space at every network edge; each piece is then
+        # covered by the same networks throughout, and goes to the narrowest
+        networks = sorted((n for n in networks if n[0].version == version), key=lambda n: n[0].num_addresses)
+        edges = sorted(
+            {int(n.network_address) for n, _ in networks} | {int(n.broadcast_address) + 1 for n, _ in networks}
+        )
+        owners = [
+            next((rule_id for n, rule_id in networks
+                  if int(n.network_address) <= edge <= int(n.broadcast_address)), None)
+            for edge in edges
+        ]
+        return edges, owners
+
+    def _domain(self, host: str) -> int | None:
+        labels = host.rstrip(".").split(".")
+        node, found = self.trie, None
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                return found
+            if depth < len(labels) and _WILDCARD in node:
+                found = node[_WILDCARD]  # the deepest wildcard wins
+        return node.get(_EXACT, found)
+
+    def _ip(self, ip) -> int | None:
+        edges, owners = self.intervals[ip.version]
+        i = bisect_right(edges, int(ip)) - 1
+        return owners[i] if i >= 0 else None
+
+    def match(self, host: str | None, url: str | None, ips: list) -> int | None:
+        """Id of a rule matching the record, or None."""
+        if host and self.trie:
+            rule_id = self._domain(host)
+            if rule_id is not None:
+                return rule_id
+        text = url or host
+        if self.regex is not None and text:
+            found = self.regex.search(text)
+            if found:
+                return int(found.lastgroup[1:])
+        for rule_id, compiled in self.grouped:
+            if text and compiled.search(text):
+                return rule_id
+        for ip in ips:
+            rule_id = self._ip(ip)
+            if rule_id is not None:
+                return rule_id
+        return None
+
+
+class ScopeMatcher:
+    def __init__(self, rules: list[tuple[int, str, str, str]]):
+        """``rules`` are ``(id, action, kind, pattern)``."""
+        self.include = _RuleSet([(i, kind, p) for i, action, kind, p in rules if action == "include"])
+        self.exclude = _RuleSet([(i, kind, p) for i, action, kind, p in rules if action == "exclude"])
+        self.has_include = any(action == "include" for _, action, _, _ in rules)
+        self.has_cidrs = self.include.has_cidrs or self.exclude.has_cidrs
+
+    def match(self, host: str | None, url: str | None = None, ip: str | None = None) -> tuple[bool, int | None]:
+        """(in scope, id of the deciding rule) for one record."""
+        ips = []
+        if self.has_cidrs:
+            ips = [a for a in (_parse_ip(ip), _parse_ip(host)) if a is not None]
+        rule_id = self.exclude.match(host, url, ips)
+        if rule_id is not None:
+            return False, rule_id
+        if not self.has_include:
+            return True, None
+        rule_id = self.include.match(host, url, ips)
+        return rule_id is not None, rule_id
+
+
+# Compiled matchers by project id; None for projects without rules
+_matchers: dict[str, ScopeMatcher | None] = {}
+
+
+def invalidate(project_id: str):
+    """Drop the cached matcher after the project's rules change."""
+    _matchers.pop(project_id, None)
+
+
+async def project_matcher(db: AsyncSession, project_id: str) -> ScopeMatcher | None:
+    if project_id not in _matchers:
+        result = await db.execute(
+            select(ScopeRule.id, ScopeRule.action, ScopeRule.kind, ScopeRule.pattern)
+            .where(ScopeRule.project_id == project_id)
+        )
+        rules = [tuple(row) for row in result]
+        _matchers[project_id] = ScopeMatcher(rules) if rules else None
+    return _matchers[project_id]
+
+
+async def apply_scope(db: AsyncSession, project_id: str, records: list, key) -> tuple[list, int]:
+    """Drop out-of-scope records; returns ``(kept, out_of_scope_count)``.
+
+    ``key(record)`` gives the record's ``(host, url, ip)``. Each rule's hit
+    counter is bumped in the caller's transaction.
+    """
+    matcher = await project_matcher(db, project_id)
+    if matcher is None:
+        return records, 0
+    kept = []
+    hits: Counter = Counter()
+    for record in records:
+        in_scope, rule_id = matcher.match(*key(record))
+        if rule_id is not None:
+            hits[rule_id] += 1
+        if in_scope:
+            kept.append(record)
+    for rule_id, count in hits.items():
+        await db.execute(
+            update(ScopeRule).where(ScopeRule.id == rule_id).values(hits=ScopeRule.hits + count)
+            .execution_options(synchronize_session=False)
+        )
+    return kept, len(records) - len(kept)
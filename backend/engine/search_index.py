@@ -0,0 +1,119 @@
+"""FTS5 trigram index over subdomain names, full URLs and the parameter name dictionary.
+
+The index tables use the base tables as external content and are kept in
+sync by triggers, so every ingest path (ORM, bulk insert, COPY into a shard)
+maintains them without extra code. Where FTS5 or the trigram tokenizer is
+missing, search falls back to LIKE.
+"""
+
+import logging
+
+from sqlalchemy import column as sql_column, func, literal_column, select, table as sql_table
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import schema_hooks
+
+logger = logging.getLogger(__name__)
+
+# base table -> indexed column
+FTS_COLUMNS = {
+    "subdomains": "subdomain",
+    "urls": "full_url",
+    "param_names": "name",
+}
+
+# Trigram matching needs at least three characters
+MIN_FTS_QUERY = 3
+
+fts_available = False
+
+
+def _fts_ddl(table: str, column: str) -> list[str]:
+    fts = f"{table}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column}, content='{table}', content_rowid='rowid', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column}); END",
+    ]
+
+
+def ensure_search_index(sync_conn):
+    """Schema hook: create the FTS tables and triggers, backfilling new ones."""
+    global fts_available
+    if sync_conn.dialect.name != "sqlite":
+        return
+    try:
+        sync_conn.exec_driver_sql("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+        sync_conn.exec_driver_sql("DROP TABLE temp.fts_probe")
+    except OperationalError:
+        logger.warning("SQLite FTS5 trigram tokenizer unavailable; search falls back to LIKE")
+        fts_available = False
+        return
+
+    for table, column in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        exists = sync_conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+        ).first()
+        for statement in _fts_ddl(table, column):
+            sync_conn.exec_driver_sql(statement)
+        if not exists:
+            # Index rows that predate the FTS table
+            sync_conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    fts_available = True
+
+
+schema_hooks.append(ensure_search_index)
+
+
+def match_offsets(text: str | None, q: str) -> list[list[int]]:
+    """Case-insensitive [start, end) offsets of every occurrence of ``q`` in ``text``."""
+    if not text:
+        return []
+    haystack, needle = text.lower(), q.lower()
+    offsets = []
+    start = haystack.find(needle)
+    while start != -1:
+        offsets.append([start, start + len(needle)])
+        start = haystack.find(needle, start + len(needle))
+    return offsets
+
+
+def _fts_phrase(q: str) -> str:
+    # A quoted phrase of trigrams is a plain substring match
+    return '"' + q.replace('"', '""') + '"'
+
+
+async def search_rows(db: AsyncSession, model, column, project_id: str, q: str, limit: int = 50) -> list:
+    """Return rows of ``model`` whose ``column`` contains ``q``, best match first."""
+    table = model.__tablename__
+    if fts_available and len(q) >= MIN_FTS_QUERY:
+        fts_table = sql_table(f"{table}_fts", sql_column("rowid"))
+        fts = literal_column(f"{table}_fts")
+        query = (
+            select(model)
+            .join(fts_table, fts_table.c.rowid == literal_column(f"{table}.rowid"))
+            .where(fts.op("MATCH")(_fts_phrase(q)), model.project_id == project_id)
+            .order_by(func.bm25(fts), func.length(column))
+            .limit(limit)
+        )
+        try:
+            return list((await db.execute(query)).scalars())
+        except OperationalError:
+            # e.g. a shard opened by an older build without the index
+            logger.warning("FTS search on %s failed; falling back to LIKE", table, exc_info=True)
+
+    query = (
+        select(model)
+        .where(model.project_id == project_id, column.contains(q, autoescape=True))
+        .order_by(func.length(column))
+        .limit(limit)
+    )
+    return list((await db.execute(query)).scalars())
@@ -0,0 +1,280 @@
+"""Project snapshots, restores and full-database backups.
+
+A project snapshot is a standalone SQLite file with the normal schema and
+only that project's rows, copied with INSERT ... SELECT from the live
+database ATTACHed read-only. In sharded mode the project's shard already is
+such a file, so it is copied with the online backup API instead. Neither
+path blocks the writer: WAL readers see a consistent view while writes
+carry on.
+
+Restoring loads a snapshot as a new project. Every UUID is remapped with
+uuid5(new project id, old id), so foreign keys can be rewritten row by row
+without holding an id map, and a snapshot can be restored next to the
+project it came from. Tables with integer row keys get fresh keys from the
+database; references to them are read as the parent's UUID and looked up
+again batch by batch. The parameter name dictionary is small and is rebuilt
+(and reclassified) up front.
+"""
+
+import asyncio
+import sqlite3
+import uuid
+from pathlib import Path
+
+from sqlalchemy import column as sql_column, create_engine, func, literal_column, select, delete
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+from database import (
+    Base, CATALOG_ONLY_TABLES, IS_SQLITE, SHARDED, ProjectNotFound,
+    async_session, drop_shard, project_session, run_write, shard_path,
+)
+from parsers.bulk import bulk_insert, chunked, ensure_endpoints, ensure_param_names
+from engine.classifier import classify_parameters
+from engine.purge import start_purge
+
+RESTORE_BATCH_ROWS = 5000
+
+
+class SnapshotError(ValueError):
+    """Raised for files that are not usable project snapshots."""
+
+
+def _snapshot_tables():
+    return [t for t in Base.metadata.sorted_tables if t.name not in CATALOG_ONLY_TABLES]
+
+
+def _models() -> dict:
+    return {m.local_table.name: m.class_ for m in Base.registry.mappers}
+
+
+def _catalog_path() -> str:
+    return settings.DATABASE_URL.split("///", 1)[1]
+
+
+def _copy_project(src: str, dest: Path, project_id: str):
+    tables = _snapshot_tables()
+    engine = create_engine(f"sqlite:///{dest}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn, tables=tables)
+    engine.dispose()
+
+    conn = sqlite3.connect(dest, isolation_level=None, uri=True)
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{src}?mode=ro",))
+        # One transaction, so every table is read from the same point in time
+        conn.execute("BEGIN")
+        for table in tables:
+            key = "id" if table.name == "projects" else "project_id"
+            cols = ", ".join(c.name for c in table.columns)
+            conn.execute(
+                f"INSERT INTO main.{table.name} ({cols}) SELECT {cols} FROM src.{table.name} WHERE {key} = ?",
+                (project_id,),
+            )
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE src")
+    finally:
+        conn.close()
+
+
+def _backup_file(src: str | Path, dest: Path):
+    source = sqlite3.connect(f"file:{src}?mode=ro", uri=True)
+    target = sqlite3.connect(dest)
+    try:
+        source.backup(target)
+        # The copy inherits WAL mode; make it a self-contained single file
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+
+
+async def snapshot_project(project_id: str, dest: Path) -> Path:
+    """Write one project's data to a new SQLite file at ``dest``."""
+    if not IS_SQLITE:
+        raise NotImplementedError("Snapshots need the SQLite backend")
+    async with async_session() as db:
+        projects = Base.metadata.tables["projects"]
+        found = (await db.execute(select(projects.c.id).where(projects.c.id == project_id))).first()
+    if not found:
+        raise ProjectNotFound(project_id)
+
+    dest.unlink(missing_ok=True)
+    if SHARDED:
+        # Bootstraps the shard if it was never opened, and keeps it open while copying
+        async with project_session(project_id):
+            await asyncio.to_thread(_backup_file, shard_path(project_id), dest)
+    else:
+        await asyncio.to_thread(_copy_project, _catalog_path(), dest, project_id)
+    return dest
+
+
+async def backup_database(dest: Path) -> list[Path]:
+    """Online backup of the whole database (and every shard, when sharded)."""
+    if not IS_SQLITE:
+        raise NotImplementedError("Use pg_dump for PostgreSQL backups")
+    dest.unlink(missing_ok=True)
+    await asyncio.to_thread(_backup_file, _catalog_path(), dest)
+    written = [dest]
+    if SHARDED:
+        shard_dir = dest.with_name(f"{dest.stem}-projects")
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        for shard in sorted(settings.SHARD_DIR.glob("*.db")):
+            target = shard_dir / shard.name
+            target.unlink(missing_ok=True)
+            await asyncio.to_thread(_backup_file, shard.resolve(), target)
+            written.append(target)
+    return written
+
+
+async def _discard(project_id: str):
+    if SHARDED:
+        await drop_shard(project_id)
+        projects = Base.metadata.tables["projects"]
+
+        async def _delete(db):
+            await db.execute(delete(projects).where(projects.c.id == project_id))
+
+        await run_write(_delete)
+    else:
+        await start_purge(project_id)
+
+
+async def _restore_param_names(conn, present: dict, old_id: str, new_id: str) -> dict:
+    """Load the snapshot's parameter names; returns {old name id: new name id}.
+
+    Snapshots from before the dictionary existed carry names on the
+    parameter rows, and the map is keyed by name instead.
+    """
+    if "param_names" in present:
+        table = Base.metadata.tables["param_names"]
+        query = select(table.c.id, table.c.name, table.c.sample_value).where(table.c.project_id == old_id)
+    elif "name" in present.get("parameters", ()):
+        name = sql_column("name")
+        query = (
+            select(name.label("key"), name, func.min(sql_column("sample_value")))
+            .select_from(Base.metadata.tables["parameters"])
+            .where(sql_column("project_id") == old_id)
+            .group_by(name)
+        )
+    else:
+        return {}
+    rows = (await conn.execute(query)).all()
+    attack_types = classify_parameters(name for _, name, _ in rows)
+    ids = await run_write(
+        ensure_param_names, new_id, {name: (attack_types[name], value) for _, name, value in rows}, project_id=new_id,
+    )
+    return {key: ids[name] for key, name, _ in rows}
+
+
+async def _insert_rows(db, model, rows: list[dict], parents: dict):
+    """Insert restored rows, first turning parent UUIDs into the parents' new row keys."""
+    for column, parent in parents.items():
+        wanted = sorted({row[column] for row in rows if row[column] is not None})
+        keys = {}
+        for chunk in chunked(wanted):
+            keys.update((await db.execute(select(parent.c.uuid, parent.c.id).where(parent.c.uuid.in_(chunk)))).all())
+        for row in rows:
+            row[column] = keys.get(row[column])
+    if model.__tablename__ == "urls" and "endpoint_id" not in rows[0]:
+        # Older snapshot without endpoints: group the URLs as they arrive
+        await ensure_endpoints(db, rows[0]["project_id"], rows)
+    await bulk_insert(db, model, rows)
+
+
+async def restore_project(path: Path, name: str | None = None) -> dict:
+    """Load a snapshot file as a new project and return its id and row counts."""
+    try:
+        probe = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            present = {
+                table: {row[1] for row in probe.execute(f'PRAGMA table_info("{table}")')}
+                for (table,) in probe.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+            }
+        finally:
+            probe.close()
+    except sqlite3.DatabaseError as e:
+        raise SnapshotError(f"Not a SQLite file: {e}")
+    if "projects" not in present:
+        raise SnapshotError("Snapshot has no projects table")
+
+    models = _models()
+    projects = Base.metadata.tables["projects"]
+    source = create_async_engine(f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true")
+    try:
+        async with source.connect() as conn:
+            rows = (await conn.execute(select(projects))).mappings().all()
+            if len(rows) != 1:
+                raise SnapshotError(f"Snapshot must hold exactly one project, found {len(rows)}")
+            old_project = dict(rows[0])
+            old_id = old_project["id"]
+            new_id = str(uuid.uuid4())
+            namespace = uuid.UUID(new_id)
+
+            old_project.update(id=new_id, name=name or old_project["name"])
+            await run_write(bulk_insert, models["projects"], [old_project])
+
+            counts = {}
+            try:
+                name_ids = await _restore_param_names(conn, present, old_id, new_id)
+                counts["param_names"] = len(name_ids)
+                for table in _snapshot_tables():
+                    if table.name in ("projects", "param_names") or table.name not in present:
+                        continue
+                    keyed = "uuid" in table.c
+                    # Snapshots from before integer row keys have the UUID in id
+                    public = lambda t, name: t.c.uuid if "uuid" in present[name] else t.c.id
+                    columns = [
+                        c for c in table.columns
+                        if c.name in present[table.name] and not (keyed and c.name in ("id", "uuid"))
+                    ]
+                    # UUIDs and references to other data rows get new ids
+                    remap = [
+                        c.name for c in columns
+                        if c.primary_key
+                        or any(fk.column.table.name not in ("projects", "param_names") for fk in c.foreign_keys)
+                    ]
+                    if keyed:
+                        columns.append(public(table, table.name).label("uuid"))
+                        remap.append("uuid")
+                    # References to integer-keyed rows are read as the parent's UUID
+                    parents, joins = {}, []
+                    for i, c in enumerate(columns):
+                        parent = next((fk.column.table for fk in c.foreign_keys), None)
+                        if parent is not None and "uuid" in parent.c:
+                            alias = parent.alias()
+                            joins.append((alias, alias.c.id == c))
+                            columns[i] = public(alias, parent.name).label(c.name)
+                            parents[c.name] = parent
+                    counters = [c.name for c in table.columns if c.info.get("counter") and c.name in present[table.name]]
+                    if table.name == "parameters" and "name_id" not in present[table.name]:
+                        # Older snapshot: the name is on the row
+                        columns.append(literal_column("parameters.name").label("name"))
+                    query = select(*columns).where(table.c.project_id == old_id)
+                    for alias, on in joins:
+                        query = query.outerjoin(alias, on)
+                    result = await conn.stream(query)
+                    counts[table.name] = 0
+                    async for part in result.partitions(RESTORE_BATCH_ROWS):
+                        batch = []
+                        for row in part:
+                            values = dict(row._mapping)
+                            values["project_id"] = new_id
+                            # Trigger-maintained counters count the rows restored after them
+                            values.update((c, 0) for c in counters)
+                            for col in remap:
+                                if values[col] is not None:
+                                    values[col] = str(uuid.uuid5(namespace, values[col]))
+                            if table.name == "parameters":
+                                values["name_id"] = name_ids[values.pop("name_id", None) or values.pop("name")]
+                            batch.append(values)
+                        await run_write(_insert_rows, models[table.name], batch, parents, project_id=new_id)
+                        counts[table.name] += len(batch)
+            except Exception:
+                await _discard(new_id)
+                raise
+    finally:
+        await source.dispose()
+
+    return {"project_id": new_id, "name": old_project["name"], "rows": counts}
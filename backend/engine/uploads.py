@@ -0,0 +1,220 @@
+"""Resumable chunked uploads.
+
+A session is a directory under ``UPLOAD_DIR/sessions`` holding a JSON
+manifest and one file per received chunk. A chunk is written under a temp
+name and only renamed into place once its sha256 matches, so the directory
+listing is the record of what the server has: a client that lost its
+connection asks for it and re-sends only the missing chunks. Sessions
+survive restarts; finishing one assembles the chunks into a single file and
+hands it to a background ingest job.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator
+
+from config import settings
+from engine.ingest_jobs import ingest_jobs
+from parsers.stream import READ_BLOCK_SIZE, UploadTooLarge
+
+SESSION_DIR = settings.UPLOAD_DIR / "sessions"
+MANIFEST = "manifest.json"
+ASSEMBLED = "upload.bin"
+
+
+class UploadSessionError(ValueError):
+    """Raised for chunks or finish requests the session cannot accept."""
+
+
+def _session_path(upload_id: str) -> Path | None:
+    try:
+        return SESSION_DIR / str(uuid.UUID(upload_id))  # never a path from the client
+    except ValueError:
+        return None
+
+
+def _part_path(path: Path, index: int) -> Path:
+    return path / f"{index:06d}.part"
+
+
+def _write_manifest(manifest: dict):
+    path = SESSION_DIR / manifest["id"]
+    tmp = path / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest))
+    os.replace(tmp, path / MANIFEST)
+
+
+def expire_sessions():
+    """Remove sessions idle past the TTL, unless their ingest job is still running."""
+    if not SESSION_DIR.exists():
+        return
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL_HOURS * 3600
+    for path in SESSION_DIR.iterdir():
+        try:
+            manifest = json.loads((path / MANIFEST).read_text())
+        except (OSError, ValueError):
+            manifest = {}
+        job = ingest_jobs.get(manifest.get("job_id"))
+        if job and job["completed_at"] is None:
+            continue
+        try:
+            idle_since = max((p.stat().st_mtime for p in path.iterdir()), default=path.stat().st_mtime)
+        except OSError:
+            continue  # removed under us
+        if idle_since < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def create_session(project_id: str, tool: str, filename: str | None = None,
+                   total_size: int | None = None, total_chunks: int | None = None) -> dict:
+    if total_size is not None and total_size > settings.MAX_CHUNKED_UPLOAD_SIZE:
+        raise UploadTooLarge(f"Upload exceeds {settings.MAX_CHUNKED_UPLOAD_SIZE} bytes")
+    expire_sessions()
+    manifest = {
+        "id": str(uuid.uuid4()),
+        "project_id": project_id,
+        "tool": tool,
+        "filename": filename,
+        "total_size": total_size,
+        "total_chunks": total_chunks,
+        "status": "open",
+        "job_id": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (SESSION_DIR / manifest["id"]).mkdir(parents=True)
+    _write_manifest(manifest)
+    return manifest
+
+
+def get_session(project_id: str, upload_id: str) -> dict | None:
+    path = _session_path(upload_id)
+    if path is None:
+        return None
+    try:
+        manifest = json.loads((path / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest["project_id"] == project_id else None
+
+
+def received_chunks(manifest: dict) -> dict[int, int]:
+    """Index -> size of every chunk stored so far."""
+    chunks = {}
+    with os.scandir(SESSION_DIR / manifest["id"]) as entries:
+        for entry in entries:
+            stem, _, ext = entry.name.partition(".")
+            if ext == "part" and stem.isdigit():
+                chunks[int(stem)] = entry.stat().st_size
+    return chunks
+
+
+def session_info(manifest: dict) -> dict:
+    chunks = received_chunks(manifest)
+    info = {
+        "upload_id": manifest["id"],
+        "project_id": manifest["project_id"],
+        "tool_type": manifest["tool"],
+        "filename": manifest["filename"],
+        "status": manifest["status"],
+        "total_size": manifest["total_size"],
+        "total_chunks": manifest["total_chunks"],
+        "received": sorted(chunks),
+        "bytes_received": sum(chunks.values()),
+        "job_id": manifest["job_id"],
+        "created_at": manifest["created_at"],
+    }
+    if manifest["total_chunks"] is not None:
+        info["missing"] = [i for i in range(manifest["total_chunks"]) if i not in chunks]
+    return info
+
+
+async def write_chunk(manifest: dict, index: int, checksum: str, body: AsyncIterator[bytes]) -> int:
+    """Store chunk ``index`` from ``body`` if its sha256 is ``checksum``. Returns its size.
+
+    Re-sending a chunk replaces it, so a retry after an unclear failure is safe.
+    """
+    if manifest["status"] != "open":
+        raise UploadSessionError("Upload is already finished")
+    if index < 0 or (manifest["total_chunks"] is not None and index >= manifest["total_chunks"]):
+        raise UploadSessionError(f"Chunk index {index} is out of range")
+
+    path = SESSION_DIR / manifest["id"]
+    others = sum(size for i, size in received_chunks(manifest).items() if i != index)
+    tmp = path / f"{index:06d}.{uuid.uuid4().hex}.tmp"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            async for block in body:
+                size += len(block)
+                if size > settings.UPLOAD_CHUNK_MAX_SIZE:
+                    raise UploadTooLarge(f"Chunk exceeds {settings.UPLOAD_CHUNK_MAX_SIZE} bytes")
+                if others + size > settings.MAX_CHUNKED_UPLOAD_SIZE:
+                    raise UploadTooLarge(f"Upload exceeds {settings.MAX_CHUNKED_UPLOAD_SIZE} bytes")
+                hasher.update(block)
+                out.write(block)
+        if hasher.hexdigest() != checksum.strip().lower():
+            raise UploadSessionError(f"Checksum mismatch for chunk {index}")
+        os.replace(tmp, _part_path(path, index))
+    finally:
+        tmp.unlink(missing_ok=True)
+    return size
+
+
+def check_complete(manifest: dict, total_chunks: int | None) -> int:
+    """Validate that every chunk is present and return the chunk count."""
+    total = total_chunks if total_chunks is not None else manifest["total_chunks"]
+    if total is None or total < 1:
+        raise UploadSessionError("total_chunks is required")
+    chunks = received_chunks(manifest)
+    missing = [i for i in range(total) if i not in chunks]
+    if missing:
+        raise UploadSessionError(f"Missing {len(missing)} chunk(s), first: {missing[:20]}")
+    extra = [i for i in chunks if i >= total]
+    if extra:
+        raise UploadSessionError(f"Received chunks past total_chunks: {sorted(extra)[:20]}")
+    size = sum(chunks.values())
+    if manifest["total_size"] is not None and size != manifest["total_size"]:
+        raise UploadSessionError(f"Received {size} bytes, expected {manifest['total_size']}")
+    return total
+
+
+def finish_session(manifest: dict, total_chunks: int, job_id: str):
+    manifest.update(status="finished", total_chunks=total_chunks, job_id=job_id)
+    _write_manifest(manifest)
+
+
+def assemble(manifest: dict, total_chunks: int, expected_sha256: str | None = None) -> str:
+    """Concatenate the chunks into one file and return its sha256 (runs in a thread)."""
+    path = SESSION_DIR / manifest["id"]
+    hasher = hashlib.sha256()
+    with open(path / ASSEMBLED, "wb") as out:
+        for index in range(total_chunks):
+            with open(_part_path(path, index), "rb") as part:
+                while block := part.read(READ_BLOCK_SIZE):
+                    hasher.update(block)
+                    out.write(block)
+    for index in range(total_chunks):
+        _part_path(path, index).unlink()
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest != expected_sha256.strip().lower():
+        raise UploadSessionError("Checksum mismatch for the assembled file")
+    return digest
+
+
+def assembled_path(manifest: dict) -> Path:
+    return SESSION_DIR / manifest["id"] / ASSEMBLED
+
+
+def session_dir(manifest: dict) -> Path:
+    return SESSION_DIR / manifest["id"]
+
+
+def discard_session(manifest: dict):
+    shutil.rmtree(SESSION_DIR / manifest["id"], ignore_errors=True)
@@ -5,13 +5,18 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Ensure backend dir is on path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from config import settings
-from database import init_db
+from database import init_db, close_db, write_queue, query_counter, ProjectNotFound
 from api.router import api_router
+from parsers.pool import shutdown_pool
+from engine.ingest_jobs import stop_ingest_jobs
+from engine.purge import stop_purges
+from engine.reclassify import stop_reclassify_jobs
 
 _start_time = time.time()
 
@@ -19,7 +24,14 @@ _start_time = time.time()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    write_queue.start()
     yield
+    # Background jobs write through the queues; stop them while the queues still run
+    await stop_ingest_jobs()
+    await stop_purges()
+    await stop_reclassify_jobs()
+    shutdown_pool()
+    await close_db()
 
 
 app = FastAPI(
@@ -35,11 +47,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count"],
 )
 
+
+@app.middleware("http")
+async def count_queries(request, call_next):
+    counter = {"queries": 0}
+    token = query_counter.set(counter)
+    try:
+        response = await call_next(request)
+    finally:
+        query_counter.reset(token)
+    response.headers["X-Query-Count"] = str(counter["queries"])
+    return response
+
 app.include_router(api_router)
 
 
+@app.exception_handler(ProjectNotFound)
+async def project_not_found_handler(request, exc: ProjectNotFound):
+    return JSONResponse(status_code=404, content={"detail": "Project not found"})
+
+
 @app.get("/health")
 async def health_check():
     return {
@@ -47,4 +77,5 @@ async def health_check():
         "app": settings.APP_NAME,
         "version": "1.1.0",
         "uptime_seconds": int(time.time() - _start_time),
+        "write_queue": {"pending": write_queue.pending, **write_queue.stats},
     }
@@ -1,8 +1,14 @@
 from models.project import Project
 from models.subdomain import Subdomain
 from models.url import URL
+from models.param_name import ParamName
 from models.parameter import Parameter
 from models.finding import NucleiFinding
+# Migrations run in import order: integer row keys before endpoint grouping
+from models.row_keys import migrate_row_keys
+from models.endpoint import Endpoint
+from models.scope_rule import ScopeRule
 from models.scan_job import ScanJob
+from models.ingest_batch import IngestBatch, IngestChunk
 
-__all__ = ["Project", "Subdomain", "URL", "Parameter", "NucleiFinding", "ScanJob"]
+__all__ = ["Project", "Subdomain", "URL", "Endpoint", "ParamName", "Parameter", "NucleiFinding", "ScopeRule", "ScanJob", "IngestBatch", "IngestChunk"]
@@ -0,0 +1,139 @@
+"""Endpoint templates: URLs of one host grouped by inferred path template.
+
+``url_count`` is kept current by triggers on ``urls``, which also drop an
+endpoint once its last URL is deleted or moved to a broader template.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+
+from sqlalchemy import Integer, String, ForeignKey, Index, inspect, insert, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base, migrations, schema_hooks
+from engine.endpoints import infer_templates
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint(Base):
+    __tablename__ = "endpoints"
+    __table_args__ = (
+        Index("ux_endpoints_uuid", "uuid", unique=True),
+        Index("ux_endpoints_subdomain_template", "subdomain_id", "template", unique=True),
+        Index("ix_endpoints_project_id", "project_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
+    subdomain_id: Mapped[int] = mapped_column(Integer, ForeignKey("subdomains.id", ondelete="CASCADE"), nullable=False)
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    template: Mapped[str] = mapped_column(String(1024), nullable=False)
+    # First URL seen for the template
+    sample_url: Mapped[str] = mapped_column(String(2048), nullable=False)
+    url_count: Mapped[int] = mapped_column(Integer, default=0, info={"counter": True})
+
+
+_SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS endpoints_count_ai AFTER INSERT ON urls BEGIN "
+    "UPDATE endpoints SET url_count = url_count + 1 WHERE id = new.endpoint_id; END",
+    "CREATE TRIGGER IF NOT EXISTS endpoints_count_ad AFTER DELETE ON urls BEGIN "
+    "UPDATE endpoints SET url_count = url_count - 1 WHERE id = old.endpoint_id; "
+    "DELETE FROM endpoints WHERE id = old.endpoint_id AND url_count <= 0; END",
+    "CREATE TRIGGER IF NOT EXISTS endpoints_count_au AFTER UPDATE OF endpoint_id ON urls "
+    "WHEN old.endpoint_id IS NOT new.endpoint_id BEGIN "
+    "UPDATE endpoints SET url_count = url_count + 1 WHERE id = new.endpoint_id; "
+    "UPDATE endpoints SET url_count = url_count - 1 WHERE id = old.endpoint_id; "
+    "DELETE FROM endpoints WHERE id = old.endpoint_id AND url_count <= 0; END",
+]
+
+# Statement-level, like the parameter name counters
+_POSTGRES_TRIGGERS = [
+    """CREATE OR REPLACE FUNCTION endpoints_count() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE endpoints e SET url_count = e.url_count + c.n
+            FROM (SELECT endpoint_id, count(*) AS n FROM new_rows GROUP BY endpoint_id) c WHERE e.id = c.endpoint_id;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE endpoints e SET url_count = e.url_count - c.n
+            FROM (SELECT endpoint_id, count(*) AS n FROM old_rows GROUP BY endpoint_id) c WHERE e.id = c.endpoint_id;
+            DELETE FROM endpoints e USING (SELECT DISTINCT endpoint_id FROM old_rows) c
+            WHERE e.id = c.endpoint_id AND e.url_count <= 0;
+        END IF;
+        RETURN NULL;
+    END $$""",
+    "DROP TRIGGER IF EXISTS endpoints_count_ai ON urls",
+    "CREATE TRIGGER endpoints_count_ai AFTER INSERT ON urls REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION endpoints_count()",
+    "DROP TRIGGER IF EXISTS endpoints_count_ad ON urls",
+    "CREATE TRIGGER endpoints_count_ad AFTER DELETE ON urls REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION endpoints_count()",
+    "DROP TRIGGER IF EXISTS endpoints_count_au ON urls",
+    "CREATE TRIGGER endpoints_count_au AFTER UPDATE ON urls "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION endpoints_count()",
+]
+
+
+def ensure_endpoint_triggers(sync_conn):
+    """Schema hook: keep ``endpoints.url_count`` in step with the urls table."""
+    if not inspect(sync_conn).has_table("urls"):
+        return
+    statements = _POSTGRES_TRIGGERS if sync_conn.dialect.name == "postgresql" else _SQLITE_TRIGGERS
+    for statement in statements:
+        sync_conn.exec_driver_sql(statement)
+
+
+def migrate_url_endpoints(sync_conn):
+    """Migration: group URLs stored before endpoint templates into endpoints."""
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("urls"):
+        return
+    if "endpoint_id" not in {c["name"] for c in inspector.get_columns("urls")}:
+        sync_conn.exec_driver_sql(
+            "ALTER TABLE urls ADD COLUMN endpoint_id INTEGER REFERENCES endpoints(id) ON DELETE SET NULL"
+        )
+    rows = sync_conn.execute(text(
+        "SELECT id, project_id, subdomain_id, path, full_url FROM urls "
+        "WHERE endpoint_id IS NULL AND subdomain_id IS NOT NULL ORDER BY id"
+    )).all()
+    if not rows:
+        return
+    logger.info("Grouping %d URLs into endpoints", len(rows))
+
+    by_host: dict[tuple, list] = defaultdict(list)
+    for row in rows:
+        by_host[row.project_id, row.subdomain_id].append(row)
+    for (project_id, subdomain_id), host_rows in by_host.items():
+        known = dict(sync_conn.execute(
+            text("SELECT template, id FROM endpoints WHERE subdomain_id = :s"), {"s": subdomain_id}
+        ).all())
+        templates = infer_templates((r.path for r in host_rows), known)
+        new = {}
+        for row in host_rows:
+            template = templates[row.path]
+            if template not in known and template not in new:
+                new[template] = {
+                    "uuid": str(uuid.uuid4()), "project_id": project_id, "subdomain_id": subdomain_id,
+                    "template": template, "sample_url": row.full_url, "url_count": 0,
+                }
+        if new:
+            sync_conn.execute(insert(Endpoint.__table__), list(new.values()))
+            known = dict(sync_conn.execute(
+                text("SELECT template, id FROM endpoints WHERE subdomain_id = :s"), {"s": subdomain_id}
+            ).all())
+        sync_conn.execute(
+            text("UPDATE urls SET endpoint_id = :e WHERE id = :u"),
+            [{"e": known[templates[r.path]], "u": r.id} for r in host_rows],
+        )
+
+    # The counting triggers may not exist yet, so count directly
+    sync_conn.exec_driver_sql(
+        "UPDATE endpoints SET url_count = (SELECT count(*) FROM urls WHERE urls.endpoint_id = endpoints.id)"
+    )
+
+
+migrations.append(migrate_url_endpoints)
+schema_hooks.append(ensure_endpoint_triggers)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy import Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -7,15 +7,23 @@ from database import Base
 
 class NucleiFinding(Base):
     __tablename__ = "nuclei_findings"
+    __table_args__ = (
+        Index("ux_nuclei_findings_uuid", "uuid", unique=True),
+        Index("ix_nuclei_findings_project_template", "project_id", "template_id"),
+        Index("ix_nuclei_findings_subdomain_id", "subdomain_id"),
+        Index("ix_nuclei_findings_batch_id", "batch_id"),
+    )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
-    subdomain_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("subdomains.id", ondelete="SET NULL"), nullable=True)
+    subdomain_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("subdomains.id", ondelete="SET NULL"), nullable=True)
     template_id: Mapped[str] = mapped_column(String(255), nullable=False)
     name: Mapped[str] = mapped_column(String(512), nullable=False)
     severity: Mapped[str] = mapped_column(String(20), default="info")
     matched_at: Mapped[str] = mapped_column(String(2048), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    batch_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("ingest_batches.id", ondelete="SET NULL"), nullable=True)
 
     project = relationship("Project", back_populates="findings")
     subdomain = relationship("Subdomain", back_populates="findings")
@@ -0,0 +1,54 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import String, DateTime, Text, Integer, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from database import Base, JSONType
+
+
+class IngestBatch(Base):
+    """One upload or scan stage: where the rows came from and what it cost."""
+
+    __tablename__ = "ingest_batches"
+    __table_args__ = (
+        Index("ix_ingest_batches_project_started", "project_id", "started_at"),
+        Index("ix_ingest_batches_project_hash", "project_id", "content_hash"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    tool: Mapped[str] = mapped_column(String(50), nullable=False)
+    source: Mapped[str | None] = mapped_column(String(512), nullable=True)  # file name or scan:<id>
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)  # sha256 of the input
+    size_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    status: Mapped[str] = mapped_column(String(20), default="running")
+    parsed_count: Mapped[int] = mapped_column(Integer, default=0)
+    new_count: Mapped[int] = mapped_column(Integer, default=0)
+    duplicate_count: Mapped[int] = mapped_column(Integer, default=0)
+    row_counts: Mapped[dict | None] = mapped_column(JSONType, nullable=True)  # rows created, per table
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    project = relationship("Project", back_populates="ingest_batches")
+    chunks = relationship("IngestChunk", back_populates="batch", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class IngestChunk(Base):
+    """Hash of a ~1 MB run of input lines that has already been ingested."""
+
+    __tablename__ = "ingest_chunks"
+    __table_args__ = (
+        Index("ix_ingest_chunks_project_tool_hash", "project_id", "tool", "chunk_hash"),
+        Index("ix_ingest_chunks_batch_id", "batch_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    batch_id: Mapped[str] = mapped_column(String(36), ForeignKey("ingest_batches.id", ondelete="CASCADE"), nullable=False)
+    tool: Mapped[str] = mapped_column(String(50), nullable=False)
+    chunk_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    line_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    batch = relationship("IngestBatch", back_populates="chunks")
@@ -0,0 +1,160 @@
+"""Per-project dictionary of parameter names.
+
+Each distinct name is stored once with its classification, so the
+parameters table only holds a ``name_id`` and the per-URL sample value.
+``occurrences`` is kept current by triggers on ``parameters``, which also
+drop a name once its last occurrence is deleted.
+"""
+
+import logging
+
+from sqlalchemy import Integer, String, ForeignKey, Index, exists, func, inspect, insert, select, text, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base, JSONType, IS_POSTGRES, migrations, schema_hooks
+from engine.classifier import CLASSIFIER_VERSION, classify_parameters, get_risk_score
+
+logger = logging.getLogger(__name__)
+
+
+class ParamName(Base):
+    __tablename__ = "param_names"
+    __table_args__ = (
+        Index("ux_param_names_project_name", "project_id", "name", unique=True),
+        Index(
+            "ix_param_names_attack_types_gin", "attack_types",
+            postgresql_using="gin", postgresql_ops={"attack_types": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    attack_types: Mapped[list] = mapped_column(JSONType, default=list)
+    # From the name alone; the graph and mindmap score each occurrence with its value_type too
+    risk_score: Mapped[int] = mapped_column(Integer, default=0)
+    classifier_version: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    # First sample value seen for the name
+    sample_value: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    occurrences: Mapped[int] = mapped_column(Integer, default=0, info={"counter": True})
+
+
+def has_attack_type(attack_type: str):
+    """SQL predicate matching names classified with ``attack_type``.
+
+    Uses JSONB containment (GIN-indexed) on PostgreSQL and json_each on SQLite.
+    """
+    if IS_POSTGRES:
+        return type_coerce(ParamName.attack_types, JSONB).contains([attack_type])
+    values = func.json_each(ParamName.attack_types).table_valued("value")
+    return exists(select(1).select_from(values).where(values.c.value == attack_type))
+
+
+def names_with_attack_type(project_id: str, attack_type: str):
+    """Subquery of the project's name ids classified with ``attack_type``, for ``Parameter.name_id.in_()``."""
+    return select(ParamName.id).where(ParamName.project_id == project_id, has_attack_type(attack_type))
+
+
+def name_values(name: str, attack_types: list[str], sample_value: str | None) -> dict:
+    """Column values for a new dictionary entry."""
+    return {
+        "name": name,
+        "attack_types": attack_types,
+        "risk_score": get_risk_score(attack_types),
+        "classifier_version": CLASSIFIER_VERSION,
+        "sample_value": sample_value,
+        "occurrences": 0,
+    }
+
+
+_SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS param_names_count_ai AFTER INSERT ON parameters BEGIN "
+    "UPDATE param_names SET occurrences = occurrences + 1 WHERE id = new.name_id; END",
+    "CREATE TRIGGER IF NOT EXISTS param_names_count_ad AFTER DELETE ON parameters BEGIN "
+    "UPDATE param_names SET occurrences = occurrences - 1 WHERE id = old.name_id; "
+    "DELETE FROM param_names WHERE id = old.name_id AND occurrences <= 0; END",
+]
+
+# Statement-level, so a COPY of a million rows updates each name once
+_POSTGRES_TRIGGERS = [
+    """CREATE OR REPLACE FUNCTION param_names_count() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE param_names p SET occurrences = p.occurrences + c.n
+            FROM (SELECT name_id, count(*) AS n FROM new_rows GROUP BY name_id) c WHERE p.id = c.name_id;
+        ELSE
+            UPDATE param_names p SET occurrences = p.occurrences - c.n
+            FROM (SELECT name_id, count(*) AS n FROM old_rows GROUP BY name_id) c WHERE p.id = c.name_id;
+            DELETE FROM param_names p USING (SELECT DISTINCT name_id FROM old_rows) c
+            WHERE p.id = c.name_id AND p.occurrences <= 0;
+        END IF;
+        RETURN NULL;
+    END $$""",
+    "DROP TRIGGER IF EXISTS param_names_count_ai ON parameters",
+    "CREATE TRIGGER param_names_count_ai AFTER INSERT ON parameters REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION param_names_count()",
+    "DROP TRIGGER IF EXISTS param_names_count_ad ON parameters",
+    "CREATE TRIGGER param_names_count_ad AFTER DELETE ON parameters REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION param_names_count()",
+]
+
+
+def ensure_occurrence_triggers(sync_conn):
+    """Schema hook: keep ``param_names.occurrences`` in step with the parameters table."""
+    if not inspect(sync_conn).has_table("parameters"):
+        return
+    statements = _POSTGRES_TRIGGERS if sync_conn.dialect.name == "postgresql" else _SQLITE_TRIGGERS
+    for statement in statements:
+        sync_conn.exec_driver_sql(statement)
+
+
+def migrate_parameter_names(sync_conn):
+    """Migration: move names and classifications off legacy parameter rows into param_names.
+
+    The names are classified afresh on the way, with the current rules.
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("parameters"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("parameters")}
+    if "name" not in columns:
+        return
+    logger.info("Moving parameter names into param_names")
+
+    groups = sync_conn.execute(text(
+        "SELECT project_id, name, count(*), min(sample_value) FROM parameters GROUP BY project_id, name"
+    )).all()
+    attack_types = classify_parameters(name for _, name, _, _ in groups)
+    rows = [
+        {**name_values(name, attack_types[name], sample_value), "project_id": project_id, "occurrences": count}
+        for project_id, name, count, sample_value in groups
+    ]
+    for start in range(0, len(rows), 5000):
+        sync_conn.execute(insert(ParamName.__table__), rows[start:start + 5000])
+
+    if "name_id" not in columns:
+        sync_conn.exec_driver_sql(
+            "ALTER TABLE parameters ADD COLUMN name_id INTEGER REFERENCES param_names(id) ON DELETE CASCADE"
+        )
+    sync_conn.exec_driver_sql(
+        "UPDATE parameters SET name_id = (SELECT id FROM param_names "
+        "WHERE param_names.project_id = parameters.project_id AND param_names.name = parameters.name)"
+    )
+
+    # The legacy name index and FTS triggers read the columns being dropped
+    if sync_conn.dialect.name == "sqlite":
+        for trigger in ("parameters_fts_ai", "parameters_fts_ad", "parameters_fts_au"):
+            sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        sync_conn.exec_driver_sql("DROP TABLE IF EXISTS parameters_fts")
+    sync_conn.exec_driver_sql("DROP INDEX IF EXISTS ix_parameters_project_name")
+    sync_conn.exec_driver_sql("DROP INDEX IF EXISTS ix_parameters_attack_types_gin")
+    for column in ("name", "attack_types", "classifier_version"):
+        if column in columns:
+            sync_conn.exec_driver_sql(f"ALTER TABLE parameters DROP COLUMN {column}")
+    if sync_conn.dialect.name == "postgresql":
+        sync_conn.exec_driver_sql("ALTER TABLE parameters ALTER COLUMN name_id SET NOT NULL")
+
+
+migrations.append(migrate_parameter_names)
+schema_hooks.append(ensure_occurrence_triggers)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import String, JSON, ForeignKey
+from sqlalchemy import Integer, String, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -7,13 +7,22 @@ from database import Base
 
 class Parameter(Base):
     __tablename__ = "parameters"
+    __table_args__ = (
+        Index("ux_parameters_uuid", "uuid", unique=True),
+        Index("ix_parameters_url_id", "url_id"),
+        Index("ix_parameters_name_id", "name_id"),
+        Index("ix_parameters_batch_id", "batch_id"),
+    )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    url_id: Mapped[str] = mapped_column(String(36), ForeignKey("urls.id", ondelete="CASCADE"), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
+    url_id: Mapped[int] = mapped_column(Integer, ForeignKey("urls.id", ondelete="CASCADE"), nullable=False)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
-    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Name and classification live in param_names
+    name_id: Mapped[int] = mapped_column(Integer, ForeignKey("param_names.id", ondelete="CASCADE"), nullable=False)
     sample_value: Mapped[str | None] = mapped_column(String(1024), nullable=True)
-    attack_types: Mapped[list] = mapped_column(JSON, default=list)
+    value_type: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    batch_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("ingest_batches.id", ondelete="SET NULL"), nullable=True)
 
     url = relationship("URL", back_populates="parameters")
     project = relationship("Project", back_populates="parameters")
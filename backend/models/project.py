@@ -13,10 +13,11 @@ class Project(Base):
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     root_domain: Mapped[str] = mapped_column(String(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
-    subdomains = relationship("Subdomain", back_populates="project", cascade="all, delete-orphan")
-    urls = relationship("URL", back_populates="project", cascade="all, delete-orphan")
-    parameters = relationship("Parameter", back_populates="project", cascade="all, delete-orphan")
-    findings = relationship("NucleiFinding", back_populates="project", cascade="all, delete-orphan")
-    scan_jobs = relationship("ScanJob", back_populates="project", cascade="all, delete-orphan")
+    subdomains = relationship("Subdomain", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    urls = relationship("URL", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    parameters = relationship("Parameter", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    findings = relationship("NucleiFinding", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    scan_jobs = relationship("ScanJob", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+    ingest_batches = relationship("IngestBatch", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
@@ -0,0 +1,89 @@
+"""Migration from UUID string primary keys to integer row keys.
+
+Subdomains, URLs, parameters and findings used to be keyed by 36-character
+UUID strings, repeated in every foreign key and index. They now have
+integer keys, and the old id is kept as the ``uuid`` the API exposes.
+SQLite cannot change a primary key in place, so each table is rebuilt and
+its rows copied across, with references rewritten by joining on the UUID.
+"""
+
+import logging
+
+from sqlalchemy import inspect
+
+from database import Base, migrations
+
+logger = logging.getLogger(__name__)
+
+# Parents before children
+KEYED_TABLES = ("subdomains", "urls", "parameters", "nuclei_findings")
+
+
+def migrate_row_keys(sync_conn):
+    """Migration: rebuild legacy UUID-keyed tables with integer keys, keeping the UUIDs."""
+    inspector = inspect(sync_conn)
+    legacy = {
+        name: {c["name"] for c in inspector.get_columns(name)}
+        for name in KEYED_TABLES
+        if inspector.has_table(name) and "uuid" not in {c["name"] for c in inspector.get_columns(name)}
+    }
+    if not legacy:
+        return
+    logger.info("Rebuilding %s with integer row keys", ", ".join(legacy))
+    sqlite = sync_conn.dialect.name == "sqlite"
+
+    # Triggers and external-content FTS tables are recreated (and rebuilt) by the schema hooks
+    if sqlite:
+        for trigger in ("param_names_count_ai", "param_names_count_ad"):
+            sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        for name in ("subdomains", "urls"):
+            for suffix in ("ai", "ad", "au"):
+                sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}_fts_{suffix}")
+            sync_conn.exec_driver_sql(f"DROP TABLE IF EXISTS {name}_fts")
+
+    # Newer tables referencing these are empty (or, on PostgreSQL, not created
+    # yet, as their keys don't match); renaming the tables would repoint their
+    # foreign keys at the legacy copies, so they are recreated with them
+    dependents = [
+        table for table in Base.metadata.sorted_tables
+        if table.name not in legacy and any(fk.column.table.name in legacy for fk in table.foreign_keys)
+    ]
+    for table in reversed(dependents):
+        if inspector.has_table(table.name):
+            table.drop(sync_conn)
+
+    for name in legacy:
+        for index in inspector.get_indexes(name):
+            sync_conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index["name"]}"')
+        if not sqlite:
+            # The primary key index name would clash with the new table's
+            pkey = inspector.get_pk_constraint(name)["name"]
+            sync_conn.exec_driver_sql(f'ALTER TABLE {name} RENAME CONSTRAINT "{pkey}" TO "{name}_legacy_pkey"')
+        sync_conn.exec_driver_sql(f"ALTER TABLE {name} RENAME TO {name}_legacy")
+
+    tables = [Base.metadata.tables[name] for name in legacy]
+    Base.metadata.create_all(sync_conn, tables=tables + dependents)
+
+    for table in tables:
+        targets, sources, joins = ["uuid"], ["l.id"], []
+        for column in table.columns:
+            parent = next((fk.column.table.name for fk in column.foreign_keys), None)
+            if parent in KEYED_TABLES:
+                # Legacy references hold the parent's UUID
+                alias = f"p_{column.name}"
+                targets.append(column.name)
+                sources.append(f"{alias}.id")
+                joins.append(f"LEFT JOIN {parent} {alias} ON {alias}.uuid = l.{column.name}")
+            elif column.name not in ("id", "uuid") and column.name in legacy[table.name]:
+                targets.append(column.name)
+                sources.append(f"l.{column.name}")
+        sync_conn.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(targets)}) "
+            f"SELECT {', '.join(sources)} FROM {table.name}_legacy l {' '.join(joins)}"
+        )
+
+    for name in reversed(list(legacy)):
+        sync_conn.exec_driver_sql(f"DROP TABLE {name}_legacy")
+
+
+migrations.append(migrate_row_keys)
@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class ScopeRule(Base):
+    """An include or exclude rule applied to a project's uploads (see ``engine.scope``)."""
+
+    __tablename__ = "scope_rules"
+    __table_args__ = (
+        Index("ux_scope_rules_uuid", "uuid", unique=True),
+        Index("ix_scope_rules_project_id", "project_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
+    project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    action: Mapped[str] = mapped_column(String(10), nullable=False)  # include / exclude
+    kind: Mapped[str] = mapped_column(String(10), nullable=False)  # domain / regex / cidr
+    pattern: Mapped[str] = mapped_column(String(1024), nullable=False)
+    # Records this rule kept or dropped
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
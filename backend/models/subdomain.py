@@ -1,23 +1,32 @@
 import uuid
-from sqlalchemy import String, Integer, JSON, ForeignKey
+from sqlalchemy import String, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from database import Base
+from database import Base, JSONType
 
 
 class Subdomain(Base):
     __tablename__ = "subdomains"
+    __table_args__ = (
+        Index("ux_subdomains_uuid", "uuid", unique=True),
+        Index("ix_subdomains_project_subdomain", "project_id", "subdomain"),
+        Index("ix_subdomains_batch_id", "batch_id"),
+        Index("ix_subdomains_technologies_gin", "technologies", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Integer row key for joins; the UUID is the id the API exposes
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     subdomain: Mapped[str] = mapped_column(String(512), nullable=False)
     ip_address: Mapped[str | None] = mapped_column(String(45), nullable=True)
     status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
     title: Mapped[str | None] = mapped_column(String(512), nullable=True)
-    technologies: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    technologies: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
     content_length: Mapped[int | None] = mapped_column(Integer, nullable=True)
     source: Mapped[str] = mapped_column(String(50), default="subfinder")
+    batch_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("ingest_batches.id", ondelete="SET NULL"), nullable=True)
 
     project = relationship("Project", back_populates="subdomains")
-    urls = relationship("URL", back_populates="subdomain", cascade="all, delete-orphan")
-    findings = relationship("NucleiFinding", back_populates="subdomain", cascade="all, delete-orphan")
+    urls = relationship("URL", back_populates="subdomain", cascade="all, delete-orphan", passive_deletes=True)
+    findings = relationship("NucleiFinding", back_populates="subdomain", cascade="all, delete-orphan", passive_deletes=True)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import Integer, String, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -7,14 +7,24 @@ from database import Base
 
 class URL(Base):
     __tablename__ = "urls"
+    __table_args__ = (
+        Index("ux_urls_uuid", "uuid", unique=True),
+        Index("ix_urls_project_full_url", "project_id", "full_url"),
+        Index("ix_urls_subdomain_id", "subdomain_id"),
+        Index("ix_urls_endpoint_id", "endpoint_id"),
+        Index("ix_urls_batch_id", "batch_id"),
+    )
 
-    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    subdomain_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("subdomains.id", ondelete="CASCADE"), nullable=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    uuid: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
+    subdomain_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("subdomains.id", ondelete="CASCADE"), nullable=True)
+    endpoint_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("endpoints.id", ondelete="SET NULL"), nullable=True)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     full_url: Mapped[str] = mapped_column(String(2048), nullable=False)
     path: Mapped[str] = mapped_column(String(1024), nullable=False, default="/")
     source: Mapped[str] = mapped_column(String(50), default="waybackurls")
+    batch_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("ingest_batches.id", ondelete="SET NULL"), nullable=True)
 
     project = relationship("Project", back_populates="urls")
     subdomain = relationship("Subdomain", back_populates="urls")
-    parameters = relationship("Parameter", back_populates="url", cascade="all, delete-orphan")
+    parameters = relationship("Parameter", back_populates="url", cascade="all, delete-orphan", passive_deletes=True)
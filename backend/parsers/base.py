@@ -1,5 +1,28 @@
+import asyncio
 from abc import ABC, abstractmethod
+from collections import deque
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import run_write
+from parsers.pool import normalize_lines
+
+# Lines handed to the writer per transaction. Keeps each write short so
+# concurrent uploads and scans interleave instead of queueing behind one file.
+WRITE_BATCH_LINES = 2000
+
+# Chunks normalized ahead of the writer, so workers stay busy while it stores
+NORMALIZE_AHEAD = 4
+
+# parser -> (normalize, store): parsers split in a CPU-bound half that can run
+# in a worker process and a database half that runs on the writer
+PARSE_STAGES: dict = {}
+
+
+def register_stages(parser, normalize, store):
+    PARSE_STAGES[parser] = (normalize, store)
 
 
 class BaseParser(ABC):
@@ -9,3 +32,74 @@ class BaseParser(ABC):
         Returns: { parsed_count, new_count, duplicate_count }
         """
         ...
+
+
+def merge_results(total: dict, result: dict) -> dict:
+    """Add counters from one batch result into a running total (nested dicts included)."""
+    for key, value in result.items():
+        if isinstance(value, dict):
+            merge_results(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+        else:
+            total[key] = value
+    return total
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_batch(session, flush_context, instances):
+    # Rows created while a parser runs belong to its ingest batch
+    batch_id = session.info.get("batch_id")
+    if not batch_id:
+        return
+    for obj in session.new:
+        if hasattr(obj, "batch_id") and obj.batch_id is None:
+            obj.batch_id = batch_id
+
+
+async def _parse_chunk(db: AsyncSession, parser, project_id: str, chunk: str, batch_id: str | None = None) -> dict:
+    db.info["batch_id"] = batch_id
+    return await parser(project_id, chunk, db)
+
+
+async def _store_chunk(db: AsyncSession, store, project_id: str, normalized, batch_id: str | None = None) -> dict:
+    db.info["batch_id"] = batch_id
+    return await store(project_id, normalized, db)
+
+
+async def parse_in_batches(parser, project_id: str, content: str, batch_lines: int = WRITE_BATCH_LINES,
+                           batch_id: str | None = None) -> dict:
+    """Run a parser over ``content`` as a series of queued write batches.
+
+    For parsers with registered stages, each chunk is normalized in the
+    worker pool (a few chunks ahead) and only stored on the writer. Rows
+    created are tagged with ``batch_id`` (see ``engine.ingest``).
+    """
+    lines = content.strip().splitlines()
+    total = {"parsed_count": 0, "new_count": 0, "duplicate_count": 0}
+    # Always run at least once so parsers can report their empty result shape
+    chunks = (lines[start:start + batch_lines] for start in range(0, max(len(lines), 1), batch_lines))
+
+    stages = PARSE_STAGES.get(parser)
+    if stages is None:
+        for chunk in chunks:
+            result = await run_write(_parse_chunk, parser, project_id, "\n".join(chunk), batch_id, project_id=project_id)
+            merge_results(total, result)
+        return total
+
+    normalize, store = stages
+    ahead = deque()
+    try:
+        for chunk in chunks:
+            ahead.append(asyncio.ensure_future(normalize_lines(normalize, chunk)))
+            if len(ahead) < NORMALIZE_AHEAD:
+                continue
+            result = await run_write(_store_chunk, store, project_id, await ahead.popleft(), batch_id, project_id=project_id)
+            merge_results(total, result)
+        while ahead:
+            result = await run_write(_store_chunk, store, project_id, await ahead.popleft(), batch_id, project_id=project_id)
+            merge_results(total, result)
+    finally:
+        for future in ahead:
+            future.cancel()
+    return total
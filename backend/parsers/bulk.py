@@ -0,0 +1,189 @@
+"""Bulk dedupe and insert helpers shared by the parsers."""
+
+import json
+from collections import defaultdict
+
+from sqlalchemy import JSON, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import IS_POSTGRES
+from models import Subdomain, URL, Endpoint, ParamName
+from models.param_name import name_values
+from engine.endpoints import infer_templates
+
+# Keeps IN (...) lists well under the bind-parameter limits of SQLite and asyncpg
+IN_CHUNK_SIZE = 1000
+
+
+def chunked(items: list, size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _column_default(column):
+    default = column.default
+    if default is None:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+async def _copy_rows(db: AsyncSession, model, rows: list[dict]):
+    """Stream rows into PostgreSQL with COPY, inside the session's transaction."""
+    # Integer row keys left out of the rows come from the table's sequence
+    columns = [
+        c for c in model.__table__.columns
+        if not (c.primary_key and c.autoincrement is True and c.key not in rows[0])
+    ]
+    records = []
+    for row in rows:
+        record = []
+        for column in columns:
+            value = row[column.key] if column.key in row else _column_default(column)
+            if value is not None and isinstance(column.type, JSON):
+                value = json.dumps(value)
+            record.append(value)
+        records.append(tuple(record))
+
+    await db.flush()
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        model.__tablename__, records=records, columns=[c.name for c in columns],
+    )
+
+
+async def bulk_insert(db: AsyncSession, model, rows: list[dict]):
+    """Insert many rows at once: COPY on PostgreSQL, executemany elsewhere."""
+    if not rows:
+        return
+    batch_id = db.info.get("batch_id")
+    if batch_id and "batch_id" in model.__table__.c:
+        for row in rows:
+            row.setdefault("batch_id", batch_id)
+    if IS_POSTGRES:
+        await _copy_rows(db, model, rows)
+    else:
+        await db.execute(insert(model), rows)
+
+
+async def existing_urls(db: AsyncSession, project_id: str, full_urls: list[str]) -> dict[str, int]:
+    """Return {full_url: url_id} for the URLs already in the project."""
+    found: dict[str, int] = {}
+    for chunk in chunked(full_urls):
+        result = await db.execute(
+            select(URL.full_url, URL.id).where(URL.project_id == project_id, URL.full_url.in_(chunk))
+        )
+        found.update(result.all())
+    return found
+
+
+async def existing_subdomains(db: AsyncSession, project_id: str, hostnames: set[str]) -> dict[str, int]:
+    """Return {hostname: subdomain_id} for the hostnames already in the project."""
+    ids: dict[str, int] = {}
+    for chunk in chunked(sorted(hostnames)):
+        result = await db.execute(
+            select(Subdomain.subdomain, Subdomain.id).where(
+                Subdomain.project_id == project_id, Subdomain.subdomain.in_(chunk),
+            )
+        )
+        ids.update(dict(result.all()))
+    return ids
+
+
+async def ensure_subdomains(db: AsyncSession, project_id: str, hostnames: set[str], source: str) -> dict[str, int]:
+    """Return {hostname: subdomain_id}, creating rows for hostnames not yet in the project."""
+    ids = await existing_subdomains(db, project_id, hostnames)
+
+    new_rows = [
+        {"project_id": project_id, "subdomain": hostname, "source": source}
+        for hostname in hostnames if hostname not in ids
+    ]
+    if new_rows:
+        # Ids are assigned by the database, so read them back
+        await bulk_insert(db, Subdomain, new_rows)
+        ids.update(await existing_subdomains(db, project_id, {row["subdomain"] for row in new_rows}))
+    return ids
+
+
+async def ensure_param_names(db: AsyncSession, project_id: str, names: dict[str, tuple]) -> dict[str, int]:
+    """Return {name: param_names id}, adding dictionary entries for new names.
+
+    ``names`` maps each name to ``(attack_types, sample_value)``.
+    """
+    ids: dict[str, int] = {}
+
+    async def lookup(wanted):
+        for chunk in chunked(sorted(wanted)):
+            result = await db.execute(
+                select(ParamName.name, ParamName.id).where(ParamName.project_id == project_id, ParamName.name.in_(chunk))
+            )
+            ids.update(result.all())
+
+    await lookup(names)
+    new_rows = [
+        {**name_values(name, *names[name]), "project_id": project_id}
+        for name in names if name not in ids
+    ]
+    if new_rows:
+        # Ids are assigned by the database, so read them back
+        await bulk_insert(db, ParamName, new_rows)
+        await lookup(row["name"] for row in new_rows)
+    return ids
+
+
+async def ensure_endpoints(db: AsyncSession, project_id: str, url_rows: list[dict]):
+    """Set ``endpoint_id`` on new URL rows, creating endpoints for new templates.
+
+    Stored templates that the new paths widen (``/u/alice`` once there are
+    enough users to make ``/u/{str}``) are merged into the wider endpoint.
+    """
+    by_host: dict[int, list[dict]] = defaultdict(list)
+    for row in url_rows:
+        if row["subdomain_id"] is not None:
+            by_host[row["subdomain_id"]].append(row)
+
+    async def lookup(subdomain_ids) -> dict[int, dict[str, tuple]]:
+        """{subdomain_id: {template: (endpoint id, sample_url)}}"""
+        found = defaultdict(dict)
+        for chunk in chunked(sorted(subdomain_ids)):
+            result = await db.execute(
+                select(Endpoint.subdomain_id, Endpoint.template, Endpoint.id, Endpoint.sample_url)
+                .where(Endpoint.subdomain_id.in_(chunk))
+            )
+            for subdomain_id, template, endpoint_id, sample_url in result:
+                found[subdomain_id][template] = (endpoint_id, sample_url)
+        return found
+
+    known = await lookup(by_host)
+    templates, new_rows, widened = {}, {}, []
+    for subdomain_id, rows in by_host.items():
+        stored = known[subdomain_id]
+        templates[subdomain_id] = inferred = infer_templates((row["path"] for row in rows), stored)
+        samples = [(row["path"], row["full_url"]) for row in rows]
+        samples += [(template, sample_url) for template, (_, sample_url) in stored.items()]
+        for path, sample_url in samples:
+            template = inferred[path]
+            if template not in stored and (subdomain_id, template) not in new_rows:
+                new_rows[subdomain_id, template] = {
+                    "project_id": project_id, "subdomain_id": subdomain_id,
+                    "template": template, "sample_url": sample_url, "url_count": 0,
+                }
+        widened += [(subdomain_id, template) for template in stored if inferred[template] != template]
+
+    if new_rows:
+        # Ids are assigned by the database, so read them back
+        await bulk_insert(db, Endpoint, list(new_rows.values()))
+        known.update(await lookup({subdomain_id for subdomain_id, _ in new_rows}))
+    for subdomain_id, template in widened:
+        # The counting triggers move the URLs' counts and drop the narrower endpoint
+        await db.execute(
+            update(URL)
+            .where(URL.endpoint_id == known[subdomain_id][template][0])
+            .values(endpoint_id=known[subdomain_id][templates[subdomain_id][template]][0])
+            .execution_options(synchronize_session=False)
+        )
+    for subdomain_id, rows in by_host.items():
+        for row in rows:
+            row["endpoint_id"] = known[subdomain_id][templates[subdomain_id][row["path"]]][0]
@@ -1,64 +1,62 @@
-import json
-
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Subdomain
-
-
-async def parse_httpx(project_id: str, content: str, db: AsyncSession) -> dict:
-    """Parse httpx JSON output (one JSON object per line - JSONL format)."""
-    lines = [line.strip() for line in content.strip().splitlines() if line.strip()]
-    parsed_count = 0
-    new_count = 0
-    duplicate_count = 0
-
-    for line in lines:
-        try:
-            data = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-
-        parsed_count += 1
-        host = data.get("host") or data.get("input") or ""
-        if not host:
-            continue
-
-        host = host.lower().strip()
-
-        # Check existing
-        existing = await db.execute(
-            select(Subdomain).where(
-                Subdomain.project_id == project_id,
-                Subdomain.subdomain == host,
-            )
+from engine.scope import apply_scope
+from parsers.base import register_stages
+from parsers.bulk import bulk_insert, chunked
+from parsers.normalize import normalize_httpx
+
+
+async def store_httpx(project_id: str, normalized: tuple[dict, list[tuple]], db: AsyncSession,
+                      source: str = "httpx") -> dict:
+    """Fill in probed hosts that exist and insert the rest (see ``normalize_httpx``)."""
+    counts, records = normalized
+    records, out_of_scope_count = await apply_scope(db, project_id, records, lambda r: (r[0], None, r[4] or r[3]))
+    existing: dict[str, Subdomain] = {}
+    for chunk in chunked(sorted({r[0] for r in records})):
+        result = await db.execute(
+            select(Subdomain).where(Subdomain.project_id == project_id, Subdomain.subdomain.in_(chunk))
         )
-        subdomain = existing.scalar_one_or_none()
+        existing.update((s.subdomain, s) for s in result.scalars())
 
-        if subdomain:
+    new_rows: dict[str, dict] = {}
+    duplicate_count = 0
+    for host, status_code, title, ip_on_update, host_ip, content_length, technologies in records:
+        values = {
+            "status_code": status_code,
+            "title": title,
+            "ip_address": ip_on_update,
+            "content_length": content_length,
+            "technologies": technologies,
+            "source": source,
+        }
+        if host in existing:
             # Update with httpx data
-            subdomain.status_code = data.get("status_code") or data.get("status-code")
-            subdomain.title = data.get("title")
-            subdomain.ip_address = data.get("host") if data.get("a") else data.get("host_ip")
-            subdomain.content_length = data.get("content_length") or data.get("content-length")
-            technologies = data.get("tech") or data.get("technologies") or []
-            subdomain.technologies = technologies if isinstance(technologies, list) else [technologies]
-            subdomain.source = "httpx"
+            for key, value in values.items():
+                setattr(existing[host], key, value)
+            duplicate_count += 1
+        elif host in new_rows:
+            new_rows[host].update(values)
             duplicate_count += 1
         else:
-            technologies = data.get("tech") or data.get("technologies") or []
-            subdomain = Subdomain(
-                project_id=project_id,
-                subdomain=host,
-                status_code=data.get("status_code") or data.get("status-code"),
-                title=data.get("title"),
-                ip_address=data.get("host_ip"),
-                content_length=data.get("content_length") or data.get("content-length"),
-                technologies=technologies if isinstance(technologies, list) else [technologies],
-                source="httpx",
-            )
-            db.add(subdomain)
-            new_count += 1
+            new_rows[host] = {
+                **values, "project_id": project_id, "subdomain": host, "ip_address": host_ip,
+            }
 
+    await bulk_insert(db, Subdomain, list(new_rows.values()))
     await db.commit()
-    return {"parsed_count": parsed_count, "new_count": new_count, "duplicate_count": duplicate_count}
+    return {
+        "parsed_count": counts["parsed_count"],
+        "new_count": len(new_rows),
+        "duplicate_count": duplicate_count,
+        "out_of_scope_count": out_of_scope_count,
+    }
+
+
+async def parse_httpx(project_id: str, content: str, db: AsyncSession) -> dict:
+    """Parse httpx JSON output (one JSON object per line - JSONL format)."""
+    return await store_httpx(project_id, normalize_httpx(content.splitlines()), db)
+
+
+register_stages(parse_httpx, normalize_httpx, store_httpx)
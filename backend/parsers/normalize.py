@@ -0,0 +1,203 @@
+"""CPU-bound half of the parsers: raw lines in, compact tuples out.
+
+Nothing here touches the database (or imports it), so these functions can
+run in worker processes (see ``parsers.pool``). Each returns
+``(counts, records)``; the matching ``store_*`` coroutine in the parser
+module does the dedupe and inserts.
+"""
+
+import json
+from urllib.parse import urlparse, parse_qs
+
+from engine.classifier import classify_parameters, classify_values
+
+
+def _clean(lines: list[str]) -> list[str]:
+    return [line.strip() for line in lines if line.strip()]
+
+
+def normalize_subdomains(lines: list[str]) -> tuple[dict, list[str]]:
+    """Hostnames, lowercased, from subfinder/amass output."""
+    lines = _clean(lines)
+    hosts = [line.lower() for line in lines if " " not in line and "." in line]
+    return {"parsed_count": len(lines)}, hosts
+
+
+def split_url(url_str: str):
+    """(full_url, hostname, path, ((name, sample_value), ...)) or None."""
+    if not url_str.startswith(("http://", "https://")):
+        url_str = "https://" + url_str
+    try:
+        parsed = urlparse(url_str)
+        hostname = parsed.hostname
+    except Exception:
+        return None
+    if not hostname:
+        return None
+    params = tuple(
+        (name, values[0][:1024] if values else None)
+        for name, values in parse_qs(parsed.query, keep_blank_values=True).items()
+    )
+    return url_str, hostname, (parsed.path or "/")[:1024], params
+
+
+def normalize_urls(lines: list[str]) -> tuple[dict, list[tuple]]:
+    """URL records from waybackurls/gau/katana output, first occurrence wins.
+
+    Records are ``(full_url, hostname, path, ((name, sample_value, attack_types, value_type), ...))``.
+    """
+    lines = _clean(lines)
+    duplicate_count = 0
+    seen = set()
+    split = []
+    for line in lines:
+        record = split_url(line)
+        if record is None:
+            continue
+        if record[0] in seen:
+            duplicate_count += 1
+            continue
+        seen.add(record[0])
+        split.append(record)
+
+    # Each distinct parameter name and sample value in the chunk is classified once
+    attack_types = classify_parameters(name for record in split for name, _ in record[3])
+    value_types = classify_values(value for record in split for _, value in record[3] if value)
+    records = [
+        (url, hostname, path, tuple(
+            (name[:255], value, attack_types[name], value_types.get(value)) for name, value in params
+        ))
+        for url, hostname, path, params in split
+    ]
+    return {"parsed_count": len(lines), "duplicate_count": duplicate_count}, records
+
+
+def normalize_httpx_entry(data: dict):
+    """(host, status_code, title, ip_on_update, host_ip, content_length, technologies) or None."""
+    host = (data.get("host") or data.get("input") or "").lower().strip()
+    if not host:
+        return None
+    technologies = data.get("tech") or data.get("technologies") or []
+    if not isinstance(technologies, list):
+        technologies = [technologies]
+    return (
+        host,
+        data.get("status_code") or data.get("status-code"),
+        data.get("title"),
+        data.get("host") if data.get("a") else data.get("host_ip"),
+        data.get("host_ip"),
+        data.get("content_length") or data.get("content-length"),
+        technologies,
+    )
+
+
+def normalize_httpx(lines: list[str]) -> tuple[dict, list[tuple]]:
+    """httpx JSONL entries; lines that are not JSON objects are dropped."""
+    parsed_count = 0
+    records = []
+    for line in _clean(lines):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        parsed_count += 1
+        record = normalize_httpx_entry(data)
+        if record:
+            records.append(record)
+    return {"parsed_count": parsed_count}, records
+
+
+def normalize_nuclei_finding(data: dict) -> tuple:
+    """(template_id, name, severity, matched_at, description, hostname)."""
+    info = data.get("info")
+    if not isinstance(info, dict):
+        info = {}
+    template_id = data.get("template-id") or data.get("templateID") or "unknown"
+    matched_at = data.get("matched-at") or data.get("matched") or data.get("host") or ""
+    try:
+        hostname = urlparse(matched_at).hostname
+    except Exception:
+        hostname = None
+    return (
+        template_id,
+        info.get("name") or data.get("name") or template_id,
+        (info.get("severity") or data.get("severity") or "info").lower(),
+        matched_at,
+        info.get("description") or "",
+        hostname,
+    )
+
+
+def normalize_nuclei(lines: list[str]) -> tuple[dict, list[tuple]]:
+    """nuclei JSONL findings; lines that are not JSON objects are dropped."""
+    parsed_count = 0
+    records = []
+    for line in _clean(lines):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        parsed_count += 1
+        records.append(normalize_nuclei_finding(data))
+    return {"parsed_count": parsed_count}, records
+
+
+def detect_line(stripped: str):
+    """(line type, decoded JSON or None) for one stripped line of mixed recon data."""
+    if not stripped:
+        return "skip", None
+
+    # Try JSON first; the decoded object is kept so it is parsed only once
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            if "template-id" in data or "templateID" in data or "info" in data:
+                return "nuclei", data
+            if "status_code" in data or "status-code" in data or "tech" in data or "technologies" in data:
+                return "httpx", data
+            return "json_unknown", data
+
+    # URL with parameters → waybackurls type
+    if stripped.startswith(("http://", "https://")):
+        if "?" in stripped:
+            return "url_with_params", None
+        return "url_no_params", None
+
+    # Plain hostname (subdomain)
+    if "." in stripped and " " not in stripped and "/" not in stripped:
+        return "subdomain", None
+
+    return "skip", None
+
+
+def normalize_auto(lines: list[str]) -> tuple[dict, dict]:
+    """Sort mixed lines by type in one pass, then normalize each group like its dedicated parser."""
+    groups = {"subdomain": [], "url_with_params": [], "url_no_params": [], "httpx": [], "nuclei": []}
+    skipped = 0
+    for line in lines:
+        line_type, data = detect_line(line.strip())
+        if line_type in ("skip", "json_unknown"):
+            skipped += 1
+        elif line_type in ("httpx", "nuclei"):
+            groups[line_type].append(data)
+        else:
+            groups[line_type].append(line.strip())
+
+    records = {"subdomains": [line.lower() for line in groups["subdomain"]]}
+    for kind in ("url_with_params", "url_no_params"):
+        counts, urls = normalize_urls(groups[kind])
+        # Lines without a usable hostname
+        skipped += counts["parsed_count"] - len(urls) - counts["duplicate_count"]
+        records[kind] = (counts, urls)
+    httpx = [normalize_httpx_entry(data) for data in groups["httpx"]]
+    skipped += sum(1 for r in httpx if r is None)
+    records["httpx"] = [r for r in httpx if r]
+    records["nuclei"] = [normalize_nuclei_finding(data) for data in groups["nuclei"]]
+    return {"parsed_count": len(lines), "skipped": skipped}, records
@@ -1,73 +1,58 @@
-import json
-from urllib.parse import urlparse
-
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Subdomain, NucleiFinding
-
-
-async def parse_nuclei(project_id: str, content: str, db: AsyncSession) -> dict:
-    """Parse nuclei JSON output (one JSON object per line - JSONL format)."""
-    lines = [line.strip() for line in content.strip().splitlines() if line.strip()]
-    parsed_count = 0
-    new_count = 0
-    duplicate_count = 0
-
-    for line in lines:
-        try:
-            data = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-
-        parsed_count += 1
+from models import NucleiFinding
+from engine.scope import apply_scope
+from parsers.base import register_stages
+from parsers.bulk import bulk_insert, chunked, existing_subdomains
+from parsers.normalize import normalize_nuclei
 
-        template_id = data.get("template-id") or data.get("templateID") or "unknown"
-        name = data.get("info", {}).get("name") or data.get("name") or template_id
-        severity = (data.get("info", {}).get("severity") or data.get("severity") or "info").lower()
-        matched_at = data.get("matched-at") or data.get("matched") or data.get("host") or ""
-        description = data.get("info", {}).get("description") or ""
 
-        # Extract hostname for subdomain linking
-        subdomain_id = None
-        try:
-            hostname = urlparse(matched_at).hostname
-            if hostname:
-                sub_result = await db.execute(
-                    select(Subdomain).where(
-                        Subdomain.project_id == project_id,
-                        Subdomain.subdomain == hostname,
-                    )
-                )
-                sub = sub_result.scalar_one_or_none()
-                if sub:
-                    subdomain_id = sub.id
-        except Exception:
-            pass
+async def store_nuclei(project_id: str, normalized: tuple[dict, list[tuple]], db: AsyncSession) -> dict:
+    """Insert findings not yet recorded, keyed by (template, matched_at), linked to known hosts."""
+    counts, records = normalized
+    records, out_of_scope_count = await apply_scope(db, project_id, records, lambda r: (r[5], r[3], None))
+    subdomain_ids = await existing_subdomains(db, project_id, {r[5] for r in records if r[5]})
 
-        # Check duplicate
-        existing = await db.execute(
-            select(NucleiFinding).where(
-                NucleiFinding.project_id == project_id,
-                NucleiFinding.template_id == template_id,
-                NucleiFinding.matched_at == matched_at,
+    seen = set()
+    for chunk in chunked(sorted({r[3] for r in records})):
+        result = await db.execute(
+            select(NucleiFinding.template_id, NucleiFinding.matched_at).where(
+                NucleiFinding.project_id == project_id, NucleiFinding.matched_at.in_(chunk),
             )
         )
-        if existing.scalar_one_or_none():
+        seen.update(result.all())
+
+    rows = []
+    duplicate_count = 0
+    for template_id, name, severity, matched_at, description, hostname in records:
+        if (template_id, matched_at) in seen:
             duplicate_count += 1
             continue
+        seen.add((template_id, matched_at))
+        rows.append({
+            "project_id": project_id,
+            "subdomain_id": subdomain_ids.get(hostname),
+            "template_id": template_id,
+            "name": name,
+            "severity": severity,
+            "matched_at": matched_at,
+            "description": description,
+        })
+
+    await bulk_insert(db, NucleiFinding, rows)
+    await db.commit()
+    return {
+        "parsed_count": counts["parsed_count"],
+        "new_count": len(rows),
+        "duplicate_count": duplicate_count,
+        "out_of_scope_count": out_of_scope_count,
+    }
 
-        finding = NucleiFinding(
-            project_id=project_id,
-            subdomain_id=subdomain_id,
-            template_id=template_id,
-            name=name,
-            severity=severity,
-            matched_at=matched_at,
-            description=description,
-        )
-        db.add(finding)
-        new_count += 1
 
-    await db.commit()
-    return {"parsed_count": parsed_count, "new_count": new_count, "duplicate_count": duplicate_count}
+async def parse_nuclei(project_id: str, content: str, db: AsyncSession) -> dict:
+    """Parse nuclei JSON output (one JSON object per line - JSONL format)."""
+    return await store_nuclei(project_id, normalize_nuclei(content.splitlines()), db)
+
+
+register_stages(parse_nuclei, normalize_nuclei, store_nuclei)
@@ -0,0 +1,46 @@
+"""Worker processes for the CPU-bound half of parsing.
+
+JSON decoding, URL splitting and parameter classification run here, in a
+ProcessPoolExecutor, so a large upload neither blocks the event loop nor is
+capped at one core. Only the database work stays on the loop.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import settings
+
+# Smaller chunks are normalized inline; shipping them to a worker costs more than it saves
+POOL_MIN_LINES = 200
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if _pool is None and settings.PARSE_WORKERS > 0:
+        # spawn: forking a process that runs threads (aiosqlite, to_thread) is not safe
+        _pool = ProcessPoolExecutor(settings.PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def normalize_lines(normalize, lines: list[str]):
+    """Run ``normalize(lines)`` in the pool (inline for small chunks or with PARSE_WORKERS=0)."""
+    pool = get_pool()
+    if pool is None or len(lines) < POOL_MIN_LINES:
+        return normalize(lines)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, normalize, lines)
+    except BrokenProcessPool:
+        # A worker died (OOM killer, say); start a fresh pool next time and finish this chunk here
+        shutdown_pool()
+        return normalize(lines)
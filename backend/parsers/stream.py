@@ -0,0 +1,244 @@
+"""Incremental line reading for uploads, with transparent decompression.
+
+Compressed input (gzip, bzip2, xz, zstd) is detected by its magic bytes and
+decompressed a block at a time, so neither the compressed nor the plain text
+is ever held in memory whole. The size limit applies to the decompressed
+bytes, which is what stops a decompression bomb.
+"""
+
+import asyncio
+import bz2
+import codecs
+import gzip
+import hashlib
+import io
+import lzma
+from typing import AsyncIterator, BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional at runtime
+    zstandard = None
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bzip2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+class UploadTooLarge(ValueError):
+    """Raised once the decompressed input passes the size limit."""
+
+
+class UnsupportedCompression(ValueError):
+    """Raised for compressed input we cannot decode here."""
+
+
+class CorruptInput(ValueError):
+    """Raised when compressed input is truncated or damaged."""
+
+
+class InputInterrupted(ConnectionError):
+    """Raised when a streamed body stops before its end (e.g. the client went away)."""
+
+
+_DECOMPRESS_ERRORS = (OSError, EOFError, lzma.LZMAError) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def detect_compression(head: bytes) -> str | None:
+    for magic, kind in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _decompressing(fileobj: BinaryIO, kind: str | None) -> BinaryIO:
+    """Wrap a binary file (read sequentially) so reads return decompressed bytes."""
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if kind == "bzip2":
+        return bz2.BZ2File(fileobj, mode="rb")
+    if kind == "xz":
+        return lzma.LZMAFile(fileobj, mode="rb")
+    if kind == "zstd":
+        if zstandard is None:
+            raise UnsupportedCompression("zstd input needs the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    return fileobj
+
+
+def open_decompressed(fileobj: BinaryIO) -> tuple[BinaryIO, str | None]:
+    """Wrap a seekable binary file so reads return decompressed bytes."""
+    head = fileobj.read(8)
+    fileobj.seek(0)
+    kind = detect_compression(head)
+    return _decompressing(fileobj, kind), kind
+
+
+async def _interruptible(blocks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    try:
+        async for block in blocks:
+            yield block
+    except Exception as e:
+        raise InputInterrupted(f"Input stream stopped: {e!r}") from e
+
+
+class _BlockFile(io.RawIOBase):
+    """Sync file over an async iterator of byte blocks, read from a worker thread.
+
+    Each refill hands the next block fetch back to the event loop, so the
+    stream keeps arriving while the thread decompresses.
+    """
+
+    def __init__(self, head: bytes, blocks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        self._pending = memoryview(head)
+        self._blocks = blocks
+        self._loop = loop
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            block = asyncio.run_coroutine_threadsafe(anext(self._blocks, None), self._loop).result()
+            if block is None:
+                return 0
+            self._pending = memoryview(block)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def hash_file(fileobj: BinaryIO) -> str:
+    """sha256 of a seekable file's raw bytes; leaves it rewound."""
+    hasher = hashlib.sha256()
+    fileobj.seek(0)
+    while block := fileobj.read(READ_BLOCK_SIZE):
+        hasher.update(block)
+    fileobj.seek(0)
+    return hasher.hexdigest()
+
+
+class LineReader:
+    """Async iterator of line lists decoded from a byte source.
+
+    ``read(n)`` is an async callable returning up to ``n`` bytes, ``b""`` at
+    the end. ``bytes_read`` and ``sha256`` cover the (decompressed) bytes
+    seen so far; for files, ``position`` is the offset reached in the raw,
+    possibly compressed, file.
+    """
+
+    def __init__(self, read, limit: int | None = None, block_size: int = READ_BLOCK_SIZE):
+        self._read = read
+        self.limit = limit
+        self.block_size = block_size
+        self.bytes_read = 0
+        self.position: int | None = None
+        self._hasher = hashlib.sha256()
+
+    @classmethod
+    def from_file(cls, fileobj: BinaryIO, limit: int | None = None, decompress: bool = True) -> "LineReader":
+        """Read from a sync file object in a worker thread, decompressing if needed."""
+        raw, kind = fileobj, None
+        if decompress:
+            fileobj, kind = open_decompressed(fileobj)
+
+        def read_block(n: int) -> tuple[bytes, int]:
+            return fileobj.read(n), raw.tell()
+
+        async def read(n: int) -> bytes:
+            try:
+                block, reader.position = await asyncio.to_thread(read_block, n)
+            except _DECOMPRESS_ERRORS as e:
+                if kind is None:
+                    raise
+                raise CorruptInput(f"Damaged {kind} input: {e}")
+            return block
+
+        reader = cls(read, limit)
+        return reader
+
+    @classmethod
+    def from_stream(cls, blocks: AsyncIterator[bytes], limit: int | None = None) -> "LineReader":
+        """Read from an async iterator of byte blocks (e.g. ``request.stream()``), as they arrive.
+
+        Compressed streams are detected from their first bytes and
+        decompressed in a worker thread, like files.
+        """
+        blocks = _interruptible(blocks).__aiter__()
+        head: bytes | None = None
+        decompressed: BinaryIO | None = None
+        kind: str | None = None
+
+        async def read_plain(n: int) -> bytes:
+            # Hand over each block as soon as it arrives rather than waiting for n bytes
+            async for block in blocks:
+                if block:
+                    return block
+            return b""
+
+        async def read(n: int) -> bytes:
+            nonlocal head, decompressed, kind
+            if head is None:
+                head = b""
+                async for block in blocks:
+                    head += block
+                    if len(head) >= 8:
+                        break
+                kind = detect_compression(head)
+                if kind is not None:
+                    decompressed = _decompressing(_BlockFile(head, blocks, asyncio.get_running_loop()), kind)
+                elif head:
+                    return head
+            if decompressed is None:
+                return await read_plain(n)
+            try:
+                return await asyncio.to_thread(decompressed.read, n)
+            except InputInterrupted:
+                raise
+            except _DECOMPRESS_ERRORS as e:
+                raise CorruptInput(f"Damaged {kind} input: {e}")
+
+        return cls(read, limit)
+
+    @classmethod
+    def from_text(cls, text: str) -> "LineReader":
+        data = text.encode()
+        offset = 0
+
+        async def read(n: int) -> bytes:
+            nonlocal offset
+            block = data[offset:offset + n]
+            offset += len(block)
+            return block
+
+        return cls(read)
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    async def __aiter__(self) -> AsyncIterator[list[str]]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        pending = ""
+        while True:
+            block = await self._read(self.block_size)
+            if not block:
+                break
+            self.bytes_read += len(block)
+            if self.limit is not None and self.bytes_read > self.limit:
+                raise UploadTooLarge(f"Input exceeds {self.limit} bytes")
+            self._hasher.update(block)
+            parts = (pending + decoder.decode(block)).split("\n")
+            pending = parts.pop()
+            lines = [p.rstrip("\r") for p in parts]
+            if lines:
+                yield lines
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield [pending.rstrip("\r")]
@@ -1,40 +1,40 @@
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import Subdomain
+from engine.scope import apply_scope
+from parsers.base import register_stages
+from parsers.bulk import bulk_insert, existing_subdomains
+from parsers.normalize import normalize_subdomains
 
 
-async def parse_subfinder(project_id: str, content: str, db: AsyncSession) -> dict:
-    """Parse subfinder/amass output (one subdomain per line)."""
-    lines = [line.strip() for line in content.strip().splitlines() if line.strip()]
-    parsed_count = len(lines)
-    new_count = 0
+async def store_subdomains(project_id: str, normalized: tuple[dict, list[str]], db: AsyncSession,
+                           source: str = "subfinder") -> dict:
+    """Insert hostnames not yet in the project; repeats count as duplicates."""
+    counts, hosts = normalized
+    hosts, out_of_scope_count = await apply_scope(db, project_id, hosts, lambda h: (h, None, None))
+    seen = set(await existing_subdomains(db, project_id, set(hosts)))
+    rows = []
     duplicate_count = 0
-
-    for line in lines:
-        subdomain_str = line.lower().strip()
-        # Skip invalid lines
-        if " " in subdomain_str or not "." in subdomain_str:
-            continue
-
-        # Check for duplicate
-        existing = await db.execute(
-            select(Subdomain).where(
-                Subdomain.project_id == project_id,
-                Subdomain.subdomain == subdomain_str,
-            )
-        )
-        if existing.scalar_one_or_none():
+    for host in hosts:
+        if host in seen:
             duplicate_count += 1
             continue
+        seen.add(host)
+        rows.append({"project_id": project_id, "subdomain": host, "source": source})
 
-        sub = Subdomain(
-            project_id=project_id,
-            subdomain=subdomain_str,
-            source="subfinder",
-        )
-        db.add(sub)
-        new_count += 1
-
+    await bulk_insert(db, Subdomain, rows)
     await db.commit()
-    return {"parsed_count": parsed_count, "new_count": new_count, "duplicate_count": duplicate_count}
+    return {
+        "parsed_count": counts["parsed_count"],
+        "new_count": len(rows),
+        "duplicate_count": duplicate_count,
+        "out_of_scope_count": out_of_scope_count,
+    }
+
+
+async def parse_subfinder(project_id: str, content: str, db: AsyncSession) -> dict:
+    """Parse subfinder/amass output (one subdomain per line)."""
+    return await store_subdomains(project_id, normalize_subdomains(content.splitlines()), db)
+
+
+register_stages(parse_subfinder, normalize_subdomains, store_subdomains)
@@ -1,78 +1,75 @@
-from urllib.parse import urlparse, parse_qs
-
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import Subdomain, URL, Parameter
-from engine.classifier import classify_parameter
+from models import URL, Parameter
+from engine.scope import apply_scope
+from parsers.base import register_stages
+from parsers.bulk import bulk_insert, ensure_endpoints, ensure_param_names, ensure_subdomains, existing_urls
+from parsers.normalize import normalize_urls
 
 
-async def parse_waybackurls(project_id: str, content: str, db: AsyncSession) -> dict:
-    """Parse waybackurls/gau/katana output (one URL per line)."""
-    lines = [line.strip() for line in content.strip().splitlines() if line.strip()]
-    parsed_count = len(lines)
-    new_count = 0
-    duplicate_count = 0
+async def store_urls(project_id: str, normalized: tuple[dict, list[tuple]], db: AsyncSession,
+                     source: str = "waybackurls") -> dict:
+    """Insert URL records (see ``normalize_urls``) and their parameters, skipping known URLs."""
+    counts, records = normalized
+    duplicate_count = counts.get("duplicate_count", 0)
+    records, out_of_scope_count = await apply_scope(db, project_id, records, lambda r: (r[1], r[0], None))
+
+    # Dedupe against the database in bulk
+    seen = await existing_urls(db, project_id, [r[0] for r in records])
+    duplicate_count += len(seen)
+    new_urls = [r for r in records if r[0] not in seen]
 
-    for line in lines:
-        url_str = line.strip()
-        if not url_str.startswith(("http://", "https://")):
-            url_str = "https://" + url_str
+    subdomain_ids = await ensure_subdomains(db, project_id, {r[1] for r in new_urls}, source=source)
 
-        try:
-            parsed = urlparse(url_str)
-        except Exception:
-            continue
+    # Each name is stored once per project, with the first non-empty sample value
+    names: dict[str, tuple] = {}
+    for *_, params in new_urls:
+        for name, sample_value, attack_types, _ in params:
+            if name not in names or (sample_value and not names[name][1]):
+                names[name] = (attack_types, sample_value)
+    name_ids = await ensure_param_names(db, project_id, names)
 
-        hostname = parsed.hostname
-        if not hostname:
-            continue
+    url_rows = [
+        {
+            "project_id": project_id,
+            "subdomain_id": subdomain_ids[hostname],
+            "full_url": url_str,
+            "path": path,
+            "source": source,
+        }
+        for url_str, hostname, path, _ in new_urls
+    ]
+    await ensure_endpoints(db, project_id, url_rows)
+    await bulk_insert(db, URL, url_rows)
 
-        # Check/create subdomain
-        sub_result = await db.execute(
-            select(Subdomain).where(
-                Subdomain.project_id == project_id,
-                Subdomain.subdomain == hostname,
-            )
-        )
-        subdomain = sub_result.scalar_one_or_none()
-        if not subdomain:
-            subdomain = Subdomain(project_id=project_id, subdomain=hostname, source="waybackurls")
-            db.add(subdomain)
-            await db.flush()
+    # URL ids are assigned by the database; read back those that have parameters
+    url_ids = await existing_urls(db, project_id, [r[0] for r in new_urls if r[3]])
+    param_rows = [
+        {
+            "url_id": url_ids[url_str],
+            "project_id": project_id,
+            "name_id": name_ids[name],
+            "sample_value": sample_value,
+            "value_type": value_type,
+        }
+        for url_str, _, _, params in new_urls
+        for name, sample_value, _, value_type in params
+    ]
+    await bulk_insert(db, Parameter, param_rows)
 
-        # Check duplicate URL
-        existing_url = await db.execute(
-            select(URL).where(URL.project_id == project_id, URL.full_url == url_str)
-        )
-        if existing_url.scalar_one_or_none():
-            duplicate_count += 1
-            continue
+    await db.commit()
+    return {
+        "parsed_count": counts["parsed_count"],
+        "new_count": len(url_rows),
+        "duplicate_count": duplicate_count,
+        "out_of_scope_count": out_of_scope_count,
+        "param_count": len(param_rows),
+    }
 
-        url_obj = URL(
-            project_id=project_id,
-            subdomain_id=subdomain.id,
-            full_url=url_str,
-            path=parsed.path or "/",
-            source="waybackurls",
-        )
-        db.add(url_obj)
-        await db.flush()
 
-        # Parse and classify parameters
-        query_params = parse_qs(parsed.query, keep_blank_values=True)
-        for param_name, values in query_params.items():
-            attack_types = classify_parameter(param_name)
-            param = Parameter(
-                url_id=url_obj.id,
-                project_id=project_id,
-                name=param_name,
-                sample_value=values[0] if values else None,
-                attack_types=attack_types,
-            )
-            db.add(param)
+async def parse_waybackurls(project_id: str, content: str, db: AsyncSession) -> dict:
+    """Parse waybackurls/gau/katana output (one URL per line)."""
+    return await store_urls(project_id, normalize_urls(content.splitlines()), db)
 
-        new_count += 1
 
-    await db.commit()
-    return {"parsed_count": parsed_count, "new_count": new_count, "duplicate_count": duplicate_count}
+register_stages(parse_waybackurls, normalize_urls, store_urls)
@@ -4,7 +4,7 @@ from pydantic import BaseModel
 class GraphNode(BaseModel):
     id: str
     label: str
-    type: str  # domain, subdomain, url, parameter, attack_type, finding
+    type: str  # domain, subdomain, url, endpoint, parameter, attack_type, finding
     color: str
     size: int
     data: dict = {}
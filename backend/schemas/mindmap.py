@@ -18,6 +18,7 @@ class MindmapParameter(BaseModel):
     name: str
     risk_score: int
     sample_value: str | None = None
+    value_type: str | None = None
     urls: list[MindmapUrl]
     attack_types: list[str]
 
@@ -0,0 +1,17 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ScopeRuleCreate(BaseModel):
+    action: str  # include / exclude
+    kind: str  # domain / regex / cidr
+    pattern: str
+
+
+class ScopeRuleResponse(BaseModel):
+    id: str
+    action: str
+    kind: str
+    pattern: str
+    hits: int = 0
+    created_at: datetime
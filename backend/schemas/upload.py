@@ -6,8 +6,23 @@ class UploadResponse(BaseModel):
     parsed_count: int
     new_count: int
     duplicate_count: int
+    # Records dropped by the project's scope rules
+    out_of_scope_count: int = 0
     message: str
+    batch_id: str | None = None
 
 
 class AutoUploadResponse(UploadResponse):
     breakdown: dict = {}
+
+
+class ChunkedUploadCreate(BaseModel):
+    tool_type: str
+    filename: str | None = None
+    total_size: int | None = None
+    total_chunks: int | None = None
+
+
+class ChunkedUploadComplete(BaseModel):
+    total_chunks: int | None = None
+    sha256: str | None = None  # of the whole file, checked after assembly
@@ -0,0 +1,80 @@
+import pytest
+
+from engine.classifier import (
+    RISK_SEVERITY, VALUE_RISK_DISCOUNT, classify_parameter, classify_parameters, classify_value,
+    get_risk_score, normalize_attack_type, tokenize_parameter,
+)
+
+
+@pytest.mark.parametrize("name, tokens", [
+    ("redirectURL2", ["redirect", "url"]),
+    ("user[id]", ["user", "id"]),
+    ("file-path", ["file", "path"]),
+    ("HTTPHost", ["http", "host"]),
+    ("__", []),
+])
+def test_tokenize_parameter(name, tokens):
+    assert tokenize_parameter(name) == tokens
+
+
+def test_exact_name_and_spelling_variants_match():
+    expected = classify_parameter("redirect_url")
+    assert expected
+    for variant in ("redirectUrl", "Redirect-URL", "REDIRECT_URL", "redirect_url2"):
+        assert classify_parameter(variant) == expected
+
+
+def test_compound_name_falls_back_to_last_token():
+    assert classify_parameter("user_email") == classify_parameter("email")
+    assert classify_parameter("config_file") == classify_parameter("file") != []
+
+
+@pytest.mark.parametrize("name", ["utm_source", "content_type", "page_size", "csrf_token", "api_key", "session_id"])
+def test_generic_compound_names_stay_unclassified(name):
+    assert classify_parameter(name) == []
+
+
+def test_classify_parameters_deduplicates():
+    result = classify_parameters(["id", "id", "q"])
+    assert set(result) == {"id", "q"}
+    assert result["id"] == classify_parameter("id")
+
+
+@pytest.mark.parametrize("value, shape", [
+    ("https://evil.com/x", "url"),
+    ("//evil.com", "url"),
+    ("123", "numeric"),
+    ("-5", "numeric"),
+    ("0b0f2d3e-1c2b-4a5d-9e8f-7a6b5c4d3e2f", "uuid"),
+    ("d41d8cd98f00b204e9800998ecf8427e", "hash"),
+    ("a@b.io", "email"),
+    ("../../etc/passwd", "path"),
+    ("C:\\windows\\win.ini", "path"),
+    ("report.pdf", "path"),
+    ("/", None),
+    ("hello world", None),
+    ("", None),
+    (None, None),
+])
+def test_classify_value(value, shape):
+    assert classify_value(value) == shape
+
+
+def test_value_shape_scores_below_the_same_name_match():
+    assert get_risk_score([]) == 0
+    assert get_risk_score(["SQLi", "IDOR"]) == RISK_SEVERITY["SQLi"]
+    assert get_risk_score([], "url", "x") == RISK_SEVERITY["SSRF"] - VALUE_RISK_DISCOUNT
+    assert get_risk_score(["SSRF"], "url", "x") == RISK_SEVERITY["SSRF"]
+    # An unnamed caller still gets the value's (discounted) evidence
+    assert get_risk_score([], "path") == RISK_SEVERITY["LFI"] - VALUE_RISK_DISCOUNT
+
+
+@pytest.mark.parametrize("name", ["page", "limit", "pageSize", "per-page", "year"])
+def test_value_is_ignored_for_pagination_params(name):
+    assert get_risk_score(classify_parameter(name), "numeric", name) == get_risk_score(classify_parameter(name))
+
+
+def test_normalize_attack_type():
+    assert normalize_attack_type("sqli") == "SQLi"
+    assert normalize_attack_type(" open redirect ") == "Open Redirect"
+    assert normalize_attack_type("unknown") == "unknown"
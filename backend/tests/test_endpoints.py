@@ -0,0 +1,43 @@
+from engine.endpoints import infer_templates, segment_template
+
+
+def test_segment_template():
+    assert segment_template("123") == "{int}"
+    assert segment_template("0B0F2D3E-1C2B-4A5D-9E8F-7A6B5C4D3E2F") == "{uuid}"
+    assert segment_template("5f2b9c1d0e3a4b6c") == "{hex}"
+    # Hex-looking words without a digit, and short hex, are literals
+    assert segment_template("deadbeefcafebabe") == "deadbeefcafebabe"
+    assert segment_template("abc123") == "abc123"
+
+
+def test_id_segments_become_placeholders():
+    templates = infer_templates(["/product/1", "/product/22/reviews", "/", "/about"])
+    assert templates == {
+        "/product/1": "/product/{int}",
+        "/product/22/reviews": "/product/{int}/reviews",
+        "/": "/",
+        "/about": "/about",
+    }
+
+
+def test_many_literals_under_one_prefix_become_a_variable():
+    users = [f"/u/user{i}/profile" for i in range(5)]
+    assert set(infer_templates(users, threshold=4).values()) == {"/u/{str}/profile"}
+    assert infer_templates(users[:4], threshold=4) == {path: path for path in users[:4]}
+
+
+def test_first_segment_is_never_merged():
+    sections = [f"/section{i}" for i in range(10)]
+    assert infer_templates(sections, threshold=2) == {path: path for path in sections}
+
+
+def test_new_paths_line_up_with_known_templates():
+    templates = infer_templates(["/u/newcomer/profile"], known=["/u/{str}/profile"])
+    assert templates["/u/newcomer/profile"] == "/u/{str}/profile"
+    assert templates["/u/{str}/profile"] == "/u/{str}/profile"
+
+
+def test_known_literal_template_widens_with_its_siblings():
+    known = [f"/u/user{i}/profile" for i in range(3)]
+    templates = infer_templates([f"/u/name{i}/profile" for i in range(3)], known=known, threshold=4)
+    assert {templates[path] for path in known} == {"/u/{str}/profile"}
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+
+import models  # noqa: F401  (registers the tables and their migrations)
+from database import _apply_pragmas, _create_schema
+from engine.classifier import classify_parameter
+
+# The schema as the first release created it, with UUID string keys and
+# names stored on every parameter row
+LEGACY_SCHEMA = [
+    """CREATE TABLE projects (
+        id VARCHAR(36) NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL,
+        root_domain VARCHAR(255) NOT NULL, created_at DATETIME NOT NULL)""",
+    """CREATE TABLE subdomains (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        project_id VARCHAR(36) NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+        subdomain VARCHAR(512) NOT NULL, ip_address VARCHAR(45), status_code INTEGER, title VARCHAR(512),
+        technologies JSON, content_length INTEGER, source VARCHAR(50) NOT NULL)""",
+    """CREATE TABLE urls (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        subdomain_id VARCHAR(36) REFERENCES subdomains (id) ON DELETE CASCADE,
+        project_id VARCHAR(36) NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+        full_url VARCHAR(2048) NOT NULL, path VARCHAR(1024) NOT NULL, source VARCHAR(50) NOT NULL)""",
+    """CREATE TABLE nuclei_findings (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        project_id VARCHAR(36) NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+        subdomain_id VARCHAR(36) REFERENCES subdomains (id) ON DELETE SET NULL,
+        template_id VARCHAR(255) NOT NULL, name VARCHAR(512) NOT NULL, severity VARCHAR(20) NOT NULL,
+        matched_at VARCHAR(2048) NOT NULL, description TEXT)""",
+    """CREATE TABLE parameters (
+        id VARCHAR(36) NOT NULL PRIMARY KEY,
+        url_id VARCHAR(36) NOT NULL REFERENCES urls (id) ON DELETE CASCADE,
+        project_id VARCHAR(36) NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+        name VARCHAR(255) NOT NULL, sample_value VARCHAR(1024), attack_types JSON NOT NULL)""",
+]
+
+SUB_ID = "11111111-1111-1111-1111-111111111111"
+URL_IDS = ["22222222-2222-2222-2222-22222222222%d" % i for i in range(3)]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    event.listen(engine, "connect", lambda conn, record: _apply_pragmas(conn, read_only=False))
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("INSERT INTO projects VALUES ('p1', 'demo', 'example.com', '2024-01-01 00:00:00')")
+        conn.exec_driver_sql(
+            f"INSERT INTO subdomains (id, project_id, subdomain, source) VALUES ('{SUB_ID}', 'p1', 'shop.example.com', 'subfinder')"
+        )
+        for i, url_id in enumerate(URL_IDS):
+            conn.exec_driver_sql(
+                f"INSERT INTO urls VALUES ('{url_id}', '{SUB_ID}', 'p1', "
+                f"'https://shop.example.com/product/{i}?id={i}', '/product/{i}', 'gau')"
+            )
+            conn.exec_driver_sql(
+                f"INSERT INTO parameters VALUES ('3333333{i}-3333-3333-3333-333333333333', '{url_id}', 'p1', "
+                f"'id', '{i}', '{json.dumps(['IDOR'])}')"
+            )
+        conn.exec_driver_sql(
+            f"INSERT INTO parameters VALUES ('44444444-4444-4444-4444-444444444444', '{URL_IDS[0]}', 'p1', "
+            f"'redirect_url', 'https://evil.com', '[]')"
+        )
+        conn.exec_driver_sql(
+            f"INSERT INTO nuclei_findings VALUES ('55555555-5555-5555-5555-555555555555', 'p1', '{SUB_ID}', "
+            f"'tpl', 'Finding', 'high', 'https://shop.example.com/', NULL)"
+        )
+    yield engine
+    engine.dispose()
+
+
+def _upgrade(engine):
+    with engine.begin() as conn:
+        _create_schema(conn)
+
+
+def test_row_keys_keep_uuids_and_references(legacy_engine):
+    _upgrade(legacy_engine)
+    with legacy_engine.connect() as conn:
+        assert not any(name.endswith("_legacy") for name in inspect(conn).get_table_names())
+        sub_id, sub_uuid = conn.exec_driver_sql("SELECT id, uuid FROM subdomains").one()
+        assert isinstance(sub_id, int) and sub_uuid == SUB_ID
+        urls = conn.exec_driver_sql("SELECT uuid, subdomain_id FROM urls ORDER BY uuid").all()
+        assert urls == [(url_id, sub_id) for url_id in URL_IDS]
+        assert conn.exec_driver_sql("SELECT subdomain_id FROM nuclei_findings").scalar() == sub_id
+        orphans = conn.exec_driver_sql(
+            "SELECT count(*) FROM parameters WHERE url_id NOT IN (SELECT id FROM urls)"
+        ).scalar()
+        assert orphans == 0
+
+
+def test_parameter_names_move_into_dictionary(legacy_engine):
+    _upgrade(legacy_engine)
+    with legacy_engine.connect() as conn:
+        assert "name" not in {c["name"] for c in inspect(conn).get_columns("parameters")}
+        names = {
+            name: (json.loads(attack_types), occurrences)
+            for name, attack_types, occurrences in conn.exec_driver_sql(
+                "SELECT name, attack_types, occurrences FROM param_names"
+            )
+        }
+        # Classified afresh on the way, not copied from the legacy rows
+        assert names["redirect_url"][0] == classify_parameter("redirect_url") != []
+        assert names["id"][1] == 3 and names["redirect_url"][1] == 1
+        assert conn.exec_driver_sql("SELECT count(*) FROM parameters WHERE name_id IS NULL").scalar() == 0
+
+
+def test_urls_are_grouped_into_endpoints(legacy_engine):
+    _upgrade(legacy_engine)
+    with legacy_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT template, url_count FROM endpoints").all() == [("/product/{int}", 3)]
+        assert conn.exec_driver_sql("SELECT count(*) FROM urls WHERE endpoint_id IS NULL").scalar() == 0
+
+
+def test_upgrade_is_idempotent(legacy_engine):
+    _upgrade(legacy_engine)
+    with legacy_engine.connect() as conn:
+        before = [conn.exec_driver_sql(f"SELECT * FROM {t} ORDER BY id").all()
+                  for t in ("subdomains", "urls", "parameters", "param_names", "endpoints")]
+    _upgrade(legacy_engine)
+    with legacy_engine.connect() as conn:
+        after = [conn.exec_driver_sql(f"SELECT * FROM {t} ORDER BY id").all()
+                 for t in ("subdomains", "urls", "parameters", "param_names", "endpoints")]
+    assert after == before
+
+
+def test_occurrence_triggers_follow_deletes(legacy_engine):
+    _upgrade(legacy_engine)
+    with legacy_engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM urls WHERE uuid = ?", (URL_IDS[0],))
+    with legacy_engine.connect() as conn:
+        names = dict(conn.exec_driver_sql("SELECT name, occurrences FROM param_names").all())
+    # redirect_url's only occurrence went with the URL, and so did the name
+    assert names == {"id": 2}
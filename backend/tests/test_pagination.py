@@ -0,0 +1,49 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+
+from api.pagination import after, decode_cursor, encode_cursor, page_result
+
+rows = Table("rows", MetaData(), Column("id", Integer, primary_key=True), Column("count", Integer), Column("name", String))
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(42, "a/b=c")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [42, "a/b=c"]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(1), encode_cursor({"a": 1}), "e30"])
+def test_bad_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor, 2)
+    assert raised.value.status_code == 400
+
+
+def test_page_result_builds_the_next_cursor_only_when_more_rows_exist():
+    assert page_result([1, 2], 2, lambda r: (r,)) == ([1, 2], None)
+    page, cursor = page_result([1, 2, 3], 2, lambda r: (r,))
+    assert page == [1, 2] and decode_cursor(cursor, 1) == [2]
+
+
+def test_keyset_pages_cover_every_row_once():
+    engine = create_engine("sqlite://")
+    data = [{"id": i, "count": i % 4, "name": f"n{i % 7}"} for i in range(1, 60)]
+    with engine.begin() as conn:
+        rows.create(conn)
+        conn.execute(insert(rows), data)
+        # count desc, then name, then id, as the listings order
+        order = [rows.c.count.desc(), rows.c.name, rows.c.id]
+        key = lambda r: (r.count, r.name, r.id)
+        seen, cursor = [], None
+        while True:
+            query = select(rows).order_by(*order)
+            if cursor:
+                columns = [rows.c.count, rows.c.name, rows.c.id]
+                query = query.where(after(columns, decode_cursor(cursor, 3), descending={0}))
+            page, cursor = page_result(conn.execute(query.limit(9)), 8, key)
+            seen += [r.id for r in page]
+            if not cursor:
+                break
+        expected = [r.id for r in conn.execute(select(rows).order_by(*order))]
+    assert seen == expected
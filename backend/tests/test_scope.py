@@ -0,0 +1,27 @@
+import pytest
+
+from engine.scope import ScopeError, ScopeMatcher, validate_rule
+
+
+def test_backreference_rule_compiles_and_matches():
+    pattern = validate_rule("regex", r"(a)\1")
+    matcher = ScopeMatcher([(1, "exclude", "regex", pattern)])
+    assert matcher.match("aa.com", "http://aa.com") == (False, 1)
+    assert matcher.match("ab.com", "http://ab.com") == (True, None)
+
+
+def test_backreference_is_not_shifted_by_other_rules():
+    matcher = ScopeMatcher([
+        (1, "exclude", "regex", "(x)"),
+        (2, "exclude", "regex", r"(a)\1"),
+        (3, "exclude", "regex", r"\.png$"),
+    ])
+    assert matcher.match("aa.com", "http://aa.com") == (False, 2)
+    assert matcher.match("b.com", "http://b.com/logo.png") == (False, 3)
+    assert matcher.match("b.com", "http://b.com/") == (True, None)
+
+
+@pytest.mark.parametrize("pattern", ["(", r"\1", "a(?i)b"])
+def test_invalid_regex_is_rejected(pattern):
+    with pytest.raises(ScopeError):
+        validate_rule("regex", pattern)
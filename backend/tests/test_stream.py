@@ -0,0 +1,69 @@
+import asyncio
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+
+from parsers.stream import CorruptInput, InputInterrupted, LineReader, UploadTooLarge
+
+TEXT = "".join(f"line{i}.example.com\r\n" for i in range(1000)) + "last"
+LINES = [f"line{i}.example.com" for i in range(1000)] + ["last"]
+
+
+def _lines(reader: LineReader) -> list[str]:
+    async def collect():
+        return [line async for lines in reader for line in lines]
+    return asyncio.run(collect())
+
+
+def _blocks(data: bytes, size: int = 100, error: Exception | None = None):
+    async def blocks():
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+        if error:
+            raise error
+    return blocks()
+
+
+def test_lines_survive_small_blocks():
+    reader = LineReader(LineReader.from_text(TEXT)._read, block_size=7)
+    assert _lines(reader) == LINES
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress, lambda d: d])
+def test_files_are_decompressed(compress):
+    reader = LineReader.from_file(io.BytesIO(compress(TEXT.encode())))
+    assert _lines(reader) == LINES
+    assert reader.bytes_read == len(TEXT)
+
+
+def test_multi_member_gzip():
+    data = gzip.compress(b"a.com\n") + gzip.compress(b"b.com\n")
+    assert _lines(LineReader.from_file(io.BytesIO(data))) == ["a.com", "b.com"]
+
+
+def test_limit_counts_decompressed_bytes():
+    bomb = gzip.compress(b"x" * 100_000)
+    with pytest.raises(UploadTooLarge):
+        _lines(LineReader.from_file(io.BytesIO(bomb), limit=50_000))
+
+
+def test_truncated_gzip_is_corrupt():
+    data = gzip.compress(TEXT.encode())
+    with pytest.raises(CorruptInput):
+        _lines(LineReader.from_file(io.BytesIO(data[:len(data) // 2])))
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, lambda d: d])
+def test_streams_are_decompressed(compress):
+    assert _lines(LineReader.from_stream(_blocks(compress(TEXT.encode())))) == LINES
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, lambda d: d])
+def test_stream_that_stops_early_is_interrupted(compress):
+    data = compress(TEXT.encode())
+    blocks = _blocks(data[:len(data) // 2], error=ConnectionResetError("gone"))
+    with pytest.raises(InputInterrupted):
+        _lines(LineReader.from_stream(blocks))
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import WriteQueue
+
+
+class WriterKilled(BaseException):
+    """Stands in for whatever takes the writer task down (not an Exception)."""
+
+
+def _run(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'q.db'}")
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (v INTEGER)"))
+        queue = WriteQueue(async_sessionmaker(engine, expire_on_commit=False))
+        try:
+            return await scenario(queue)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+async def _insert(session, value):
+    await session.execute(text("INSERT INTO t VALUES (:v)"), {"v": value})
+    return (await session.execute(text("SELECT count(*) FROM t"))).scalar()
+
+
+async def _fail(session):
+    await session.execute(text("INSERT INTO t VALUES (-1)"))
+    raise ValueError("bad row")
+
+
+async def _kill(session):
+    raise WriterKilled()
+
+
+def test_writes_run_in_order_and_failures_roll_back(tmp_path):
+    async def scenario(queue):
+        results = await asyncio.gather(
+            queue.submit(_insert, 1), queue.submit(_fail), queue.submit(_insert, 2), return_exceptions=True,
+        )
+        values = await queue.submit(lambda s: s.execute(text("SELECT v FROM t ORDER BY rowid")))
+        await queue.stop()
+        return results, [v for (v,) in values], queue.stats
+
+    results, values, stats = _run(tmp_path, scenario)
+    assert results[0] == 1 and isinstance(results[1], ValueError) and results[2] == 2
+    assert values == [1, 2]
+    assert stats["failed"] == 1
+
+
+def test_writer_death_fails_queued_writes(tmp_path):
+    async def scenario(queue):
+        results = await asyncio.wait_for(asyncio.gather(
+            queue.submit(_kill), queue.submit(_insert, 1), queue.submit(_insert, 2), return_exceptions=True,
+        ), timeout=5)
+        # The next write starts a fresh writer
+        after = await asyncio.wait_for(queue.submit(_insert, 3), timeout=5)
+        await queue.stop()
+        return results, after
+
+    results, after = _run(tmp_path, scenario)
+    assert isinstance(results[0], WriterKilled)
+    for result in results[1:]:
+        assert isinstance(result, RuntimeError) and "writer stopped" in str(result)
+    assert after == 1
+
+
+def test_stop_drains_the_queue(tmp_path):
+    async def scenario(queue):
+        pending = [asyncio.ensure_future(queue.submit(_insert, i)) for i in range(5)]
+        await asyncio.sleep(0)
+        await queue.stop()
+        return await asyncio.gather(*pending)
+
+    assert _run(tmp_path, scenario) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("value", [0, 7])
+def test_results_come_back_to_their_caller(tmp_path, value):
+    async def scenario(queue):
+        result = await queue.submit(lambda s, v: asyncio.sleep(0, result=v), value)
+        await queue.stop()
+        return result
+
+    assert _run(tmp_path, scenario) == value
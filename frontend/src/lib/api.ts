@@ -48,13 +48,13 @@ export const getStats = (projectId: string) =>
 export const searchProject = (projectId: string, q: string, type?: string) =>
   api.get(`/projects/${projectId}/search`, { params: { q, type } }).then(r => r.data);
 
-export const getParams = (projectId: string, params?: { attack_type?: string; page?: number; limit?: number }) =>
+export const getParams = (projectId: string, params?: { attack_type?: string; page?: number; limit?: number; cursor?: string }) =>
   api.get(`/projects/${projectId}/params`, { params }).then(r => r.data);
 
-export const getSubdomains = (projectId: string, params?: { status_code?: number; page?: number; limit?: number }) =>
+export const getSubdomains = (projectId: string, params?: { status_code?: number; page?: number; limit?: number; cursor?: string }) =>
   api.get(`/projects/${projectId}/subdomains`, { params }).then(r => r.data);
 
-export const getUrls = (projectId: string, params?: { attack_type?: string; subdomain?: string; page?: number }) =>
+export const getUrls = (projectId: string, params?: { attack_type?: string; subdomain?: string; page?: number; cursor?: string }) =>
   api.get(`/projects/${projectId}/urls`, { params }).then(r => r.data);
 
 // Attack URLs
@@ -62,7 +62,7 @@ export const getAttackUrls = (projectId: string, attackType?: string) =>
   api.get(`/projects/${projectId}/attack-urls`, { params: { attack_type: attackType } }).then(r => r.data);
 
 // Export
-export const exportData = (projectId: string, params?: { attack_type?: string; format?: string }) =>
+export const exportData = (projectId: string, params?: { attack_type?: string; format?: string; compress?: boolean }) =>
   api.get(`/projects/${projectId}/export`, { params, responseType: 'blob' }).then(r => r.data);
 
 // Health